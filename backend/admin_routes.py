@@ -14,19 +14,33 @@ from models import (
     Testimonial, TestimonialCreate, TestimonialUpdate,
     ServicePackage, PackageCreate, PackageUpdate,
     EmailTemplate, TemplateCreate, TemplateUpdate,
+    EmailCampaign, CampaignCreate,
+    AvailabilityRule, AvailabilityRuleCreate, AvailabilityRuleUpdate, BlackoutDate,
     SettingsUpdate,
     Partner, PartnerCreate, PartnerUpdate,
     Client, ClientCreate, ClientUpdate,
     ClientServiceCreate, ClientServiceUpdate, AdminClientServiceUpdate
 )
 from database import database
+from availability import AvailabilityError, availability
+from json_encoder import FastJSONResponse, FastJSONRoute
+from bson_json import RAW_BSON_LISTS, json_list_response, stream_json_list
+from catalog_cache import catalog_cache
+from catalog_import import CatalogDocument, export_catalog, import_catalog
+from email_campaigns import (
+    EMAIL_CAMPAIGN_CONCURRENCY, EMAIL_CAMPAIGN_RATE_LIMIT, CampaignError, campaign_runner
+)
+from email_outbox import email_outbox
+from email_service import email_service
+from email_templates import TemplateError, email_template_cache, validate_template
+from sitemap import sitemap_cache
 from admin_auth import verify_password, create_session, verify_session, delete_session
 import logging
 
 logger = logging.getLogger(__name__)
 
 # Create admin router
-admin_router = APIRouter(prefix="/api/admin", tags=["Admin"])
+admin_router = APIRouter(prefix="/api/admin", tags=["Admin"], default_response_class=FastJSONResponse, route_class=FastJSONRoute)
 
 # Dependency to verify admin session
 async def verify_admin_token(authorization: Optional[str] = Header(None)):
@@ -157,6 +171,72 @@ async def get_dashboard_stats(session: dict = Depends(verify_admin_token)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ===== CATALOG IMPORT / EXPORT =====
+
+@admin_router.get("/catalog/export")
+async def export_catalog_admin(session: dict = Depends(verify_admin_token)):
+    """Export all stages and services as one catalog document"""
+    try:
+        catalog = await export_catalog()
+        return {"success": True, "data": catalog}
+    except Exception as e:
+        logger.error(f"Error exporting catalog: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@admin_router.post("/catalog/import")
+async def import_catalog_admin(
+    catalog: CatalogDocument,
+    dry_run: bool = Query(False, description="Report the diff without writing"),
+    prune: bool = Query(True, description="Delete stored stages and services missing from the document"),
+    session: dict = Depends(verify_admin_token)
+):
+    """Diff a whole-catalog document against the database and apply only the changes"""
+    try:
+        report = await import_catalog(catalog, dry_run=dry_run, prune=prune)
+        if report["applied"]:
+            catalog_cache.invalidate()
+        logger.info(f"Catalog import (dry_run={dry_run}): {report}")
+        return {"success": True, "data": report}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error importing catalog: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# ===== EMAIL OUTBOX =====
+
+@admin_router.get("/email-outbox")
+async def get_email_outbox_admin(
+    status: Optional[str] = Query(None, description="pending, sending, sent, dead or skipped"),
+    limit: int = Query(100, ge=1, le=500),
+    session: dict = Depends(verify_admin_token)
+):
+    """List queued and delivered emails, newest first (bodies omitted)"""
+    try:
+        messages = await email_outbox.list_messages(status, limit)
+        return {"success": True, "data": messages}
+    except Exception as e:
+        logger.error(f"Error fetching email outbox: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@admin_router.post("/email-outbox/{message_id}/retry")
+async def retry_email_admin(message_id: str, session: dict = Depends(verify_admin_token)):
+    """Requeue a dead-lettered or skipped email"""
+    try:
+        if not await email_outbox.retry(message_id):
+            raise HTTPException(status_code=404, detail="No dead or skipped email with that id")
+        logger.info(f"Email requeued: {message_id}")
+        return {"success": True, "message": "Email requeued"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error requeueing email: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # ===== BLOGS =====
 
 @admin_router.get("/blogs")
@@ -168,6 +248,8 @@ async def get_all_blogs_admin(
 ):
     """Get all blogs (admin)"""
     try:
+        if RAW_BSON_LISTS:
+            return json_list_response(await database.get_all_blogs(published_only, skip, limit, raw=True))
         blogs = await database.get_all_blogs(published_only, skip, limit)
         return {"success": True, "data": blogs}
     except Exception as e:
@@ -183,6 +265,7 @@ async def create_blog_admin(blog: BlogCreate, session: dict = Depends(verify_adm
         blog_data = blog_obj.dict()
         
         created_blog = await database.create_blog(blog_data)
+        sitemap_cache.invalidate_blogs()
         logger.info(f"Blog created: {created_blog['id']}")
         return {"success": True, "data": created_blog}
     except Exception as e:
@@ -207,6 +290,7 @@ async def update_blog_admin(
         
         if not success:
             raise HTTPException(status_code=404, detail="Blog not found")
+        sitemap_cache.invalidate_blogs()
         
         # Fetch and return the updated blog
         updated_blog = await database.get_blog_by_id(blog_id)
@@ -226,6 +310,7 @@ async def delete_blog_admin(blog_id: str, session: dict = Depends(verify_admin_t
         success = await database.delete_blog(blog_id)
         if not success:
             raise HTTPException(status_code=404, detail="Blog not found")
+        sitemap_cache.invalidate_blogs()
         
         logger.info(f"Blog deleted: {blog_id}")
         return {"success": True, "message": "Blog deleted successfully"}
@@ -245,8 +330,7 @@ async def get_all_faqs_admin(
 ):
     """Get all FAQs (admin)"""
     try:
-        faqs = await database.get_all_faqs(published_only)
-        return {"success": True, "data": faqs}
+        return await stream_json_list(await database.get_all_faqs(published_only, stream=True))
     except Exception as e:
         logger.error(f"Error fetching FAQs: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -322,8 +406,7 @@ async def get_all_testimonials_admin(
 ):
     """Get all testimonials (admin)"""
     try:
-        testimonials = await database.get_all_testimonials(published_only)
-        return {"success": True, "data": testimonials}
+        return await stream_json_list(await database.get_all_testimonials(published_only, stream=True))
     except Exception as e:
         logger.error(f"Error fetching testimonials: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -405,8 +488,7 @@ async def get_all_packages_admin(
 ):
     """Get all service packages (admin)"""
     try:
-        packages = await database.get_all_packages(published_only)
-        return {"success": True, "data": packages}
+        return await stream_json_list(await database.get_all_packages(published_only, stream=True))
     except Exception as e:
         logger.error(f"Error fetching packages: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -485,8 +567,7 @@ async def delete_package_admin(
 async def get_all_templates_admin(session: dict = Depends(verify_admin_token)):
     """Get all email templates (admin)"""
     try:
-        templates = await database.get_all_templates()
-        return {"success": True, "data": templates}
+        return await stream_json_list(await database.get_all_templates(stream=True))
     except Exception as e:
         logger.error(f"Error fetching templates: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -499,12 +580,16 @@ async def create_template_admin(
 ):
     """Create a new email template"""
     try:
+        validate_template(template.template_type, template.subject, template.html_content, template.variables)
         template_obj = EmailTemplate(**template.dict())
         template_data = template_obj.dict()
         
         created_template = await database.create_template(template_data)
+        email_template_cache.invalidate()
         logger.info(f"Template created: {created_template['id']}")
         return {"success": True, "data": created_template}
+    except TemplateError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error creating template: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -522,11 +607,19 @@ async def update_template_admin(
         if not update_data:
             raise HTTPException(status_code=400, detail="No update data provided")
         
+        existing = await database.get_template_by_id(template_id)
+        if not existing:
+            raise HTTPException(status_code=404, detail="Template not found")
+        merged = {**existing, **update_data}
+        validate_template(merged['template_type'], merged.get('subject', ''),
+                          merged.get('html_content', ''), merged.get('variables') or [])
+        
         update_data['updated_at'] = datetime.utcnow().isoformat()
         success = await database.update_template(template_id, update_data)
         
         if not success:
             raise HTTPException(status_code=404, detail="Template not found")
+        email_template_cache.invalidate()
         
         # Fetch and return the updated template
         updated_template = await database.get_template_by_id(template_id)
@@ -534,6 +627,8 @@ async def update_template_admin(
         return {"success": True, "message": "Template updated successfully", "data": updated_template}
     except HTTPException:
         raise
+    except TemplateError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error updating template: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -549,6 +644,7 @@ async def delete_template_admin(
         success = await database.delete_template(template_id)
         if not success:
             raise HTTPException(status_code=404, detail="Template not found")
+        email_template_cache.invalidate()
         
         logger.info(f"Template deleted: {template_id}")
         return {"success": True, "message": "Template deleted successfully"}
@@ -559,6 +655,194 @@ async def delete_template_admin(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ===== EMAIL CAMPAIGNS =====
+
+@admin_router.get("/campaigns")
+async def get_campaigns_admin(
+    limit: int = Query(100, ge=1, le=500),
+    session: dict = Depends(verify_admin_token)
+):
+    """List email campaigns with their progress counters, newest first"""
+    try:
+        return {"success": True, "data": await campaign_runner.list_campaigns(limit)}
+    except Exception as e:
+        logger.error(f"Error fetching campaigns: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@admin_router.post("/campaigns")
+async def create_campaign_admin(campaign: CampaignCreate, session: dict = Depends(verify_admin_token)):
+    """Create a draft campaign; POST /campaigns/{id}/start sends it"""
+    try:
+        campaign_obj = EmailCampaign(
+            **campaign.dict(exclude={"rate_limit", "concurrency"}),
+            rate_limit=campaign.rate_limit or EMAIL_CAMPAIGN_RATE_LIMIT,
+            concurrency=campaign.concurrency or EMAIL_CAMPAIGN_CONCURRENCY,
+        )
+        created = await campaign_runner.create(campaign_obj.dict())
+        logger.info(f"Campaign created: {created['id']}")
+        return {"success": True, "data": created}
+    except (CampaignError, TemplateError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error creating campaign: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@admin_router.get("/campaigns/{campaign_id}")
+async def get_campaign_admin(campaign_id: str, session: dict = Depends(verify_admin_token)):
+    """Get a campaign with its progress counters"""
+    campaign = await campaign_runner.get(campaign_id)
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return {"success": True, "data": campaign}
+
+
+@admin_router.get("/campaigns/{campaign_id}/recipients")
+async def get_campaign_recipients_admin(
+    campaign_id: str,
+    status: Optional[str] = Query(None, description="pending, sent or failed"),
+    limit: int = Query(100, ge=1, le=500),
+    session: dict = Depends(verify_admin_token)
+):
+    """List a campaign's recipients, most recently updated first"""
+    try:
+        return {"success": True, "data": await campaign_runner.list_recipients(campaign_id, status, limit)}
+    except Exception as e:
+        logger.error(f"Error fetching campaign recipients: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@admin_router.post("/campaigns/{campaign_id}/{action}")
+async def control_campaign_admin(campaign_id: str, action: str, session: dict = Depends(verify_admin_token)):
+    """Start, pause or cancel a campaign"""
+    operations = {"start": campaign_runner.start, "pause": campaign_runner.pause, "cancel": campaign_runner.cancel}
+    if action not in operations:
+        raise HTTPException(status_code=404, detail="Unknown campaign action")
+    try:
+        if not await operations[action](campaign_id):
+            raise HTTPException(status_code=409, detail=f"Campaign not found or cannot {action} in its current state")
+        logger.info(f"Campaign {campaign_id}: {action}")
+        return {"success": True, "message": f"Campaign {action} requested"}
+    except HTTPException:
+        raise
+    except CampaignError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error on campaign {action}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# ===== AVAILABILITY RULES =====
+
+@admin_router.get("/availability/rules")
+async def get_availability_rules_admin(session: dict = Depends(verify_admin_token)):
+    """List weekly availability rules"""
+    try:
+        return {"success": True, "data": await availability.list_rules()}
+    except Exception as e:
+        logger.error(f"Error fetching availability rules: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@admin_router.post("/availability/rules")
+async def create_availability_rule_admin(
+    rule: AvailabilityRuleCreate,
+    session: dict = Depends(verify_admin_token)
+):
+    """Create a weekly availability rule; its slots are generated when listed"""
+    try:
+        created = await availability.create_rule(AvailabilityRule(**rule.dict()).dict())
+        logger.info(f"Availability rule created: {created['id']}")
+        return {"success": True, "data": created}
+    except AvailabilityError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error creating availability rule: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@admin_router.put("/availability/rules/{rule_id}")
+async def update_availability_rule_admin(
+    rule_id: str,
+    rule_update: AvailabilityRuleUpdate,
+    session: dict = Depends(verify_admin_token)
+):
+    """Update a weekly availability rule"""
+    try:
+        update_data = {k: v for k, v in rule_update.dict().items() if v is not None}
+        if not update_data:
+            raise HTTPException(status_code=400, detail="No update data provided")
+        
+        updated = await availability.update_rule(rule_id, update_data)
+        if updated is None:
+            raise HTTPException(status_code=404, detail="Availability rule not found")
+        
+        logger.info(f"Availability rule updated: {rule_id}")
+        return {"success": True, "data": updated}
+    except HTTPException:
+        raise
+    except AvailabilityError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error updating availability rule: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@admin_router.delete("/availability/rules/{rule_id}")
+async def delete_availability_rule_admin(rule_id: str, session: dict = Depends(verify_admin_token)):
+    """Delete a weekly availability rule; its unbooked future slots go with it"""
+    try:
+        if not await availability.delete_rule(rule_id):
+            raise HTTPException(status_code=404, detail="Availability rule not found")
+        logger.info(f"Availability rule deleted: {rule_id}")
+        return {"success": True, "message": "Availability rule deleted successfully"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error deleting availability rule: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@admin_router.get("/availability/blackouts")
+async def get_blackouts_admin(session: dict = Depends(verify_admin_token)):
+    """List blackout dates"""
+    try:
+        return {"success": True, "data": await availability.list_blackouts()}
+    except Exception as e:
+        logger.error(f"Error fetching blackout dates: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@admin_router.post("/availability/blackouts")
+async def add_blackout_admin(blackout: BlackoutDate, session: dict = Depends(verify_admin_token)):
+    """Block a date; rules generate no slots on it"""
+    try:
+        created = await availability.add_blackout(blackout.dict())
+        logger.info(f"Blackout date added: {blackout.date}")
+        return {"success": True, "data": created}
+    except AvailabilityError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error adding blackout date: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@admin_router.delete("/availability/blackouts/{day}")
+async def remove_blackout_admin(day: str, session: dict = Depends(verify_admin_token)):
+    """Unblock a date"""
+    try:
+        if not await availability.remove_blackout(day):
+            raise HTTPException(status_code=404, detail="Blackout date not found")
+        logger.info(f"Blackout date removed: {day}")
+        return {"success": True, "message": "Blackout date removed"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error removing blackout date: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # ===== SETTINGS =====
 
 @admin_router.get("/settings")
@@ -591,6 +875,9 @@ async def update_settings_admin(
         update_data['updated_at'] = datetime.utcnow().isoformat()
         success = await database.update_settings(update_data)
         
+        # Pick up SMTP changes now rather than after EMAIL_SETTINGS_TTL
+        await email_service.refresh_settings(force=True)
+        
         # Fetch and return the updated settings
         updated_settings = await database.get_settings()
         logger.info("Settings updated")
@@ -612,15 +899,14 @@ async def get_partners_admin(
         if category:
             if category not in ["execution", "referral", "both"]:
                 raise HTTPException(status_code=400, detail="Category must be 'execution', 'referral', or 'both'")
-            partners = await database.get_partners_by_category(category)
-        else:
-            # Get all partners
-            execution_partners = await database.get_partners_by_category("execution")
-            referral_partners = await database.get_partners_by_category("referral")
-            both_partners = await database.get_partners_by_category("both")
-            partners = execution_partners + referral_partners + both_partners
-        
-        return {"success": True, "data": partners}
+            return await stream_json_list(await database.get_partners_by_category(category, stream=True))
+        
+        # Get all partners, grouped by category
+        return await stream_json_list(
+            await database.get_partners_by_category("execution", stream=True),
+            await database.get_partners_by_category("referral", stream=True),
+            await database.get_partners_by_category("both", stream=True)
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -762,8 +1048,9 @@ async def get_partner_clients_admin(
 ):
     """Get all clients for a specific partner"""
     try:
-        clients = await database.get_clients_by_partner(partner_id)
-        return {"success": True, "data": clients}
+        return await stream_json_list(
+            await database.get_clients_by_partner(partner_id, raw=RAW_BSON_LISTS, stream=True)
+        )
     except Exception as e:
         logger.error(f"Error fetching partner clients: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
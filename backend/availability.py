@@ -0,0 +1,330 @@
+"""
+Weekly availability rules and lazy, bulk materialisation of the timeslots
+they describe.
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from pymongo.errors import BulkWriteError
+
+from database import database
+from http_cache import compute_etag
+from json_encoder import dumps
+
+logger = logging.getLogger(__name__)
+
+# Window materialised for an unfiltered slot listing, from today
+AVAILABILITY_HORIZON_DAYS = int(os.environ.get('AVAILABILITY_HORIZON_DAYS', '60'))
+# Dates further ahead than this are never materialised
+AVAILABILITY_MAX_DAYS = int(os.environ.get('AVAILABILITY_MAX_DAYS', '366'))
+
+SOURCE_RULE = "rule"
+
+# Months of calendar bodies kept in memory
+CALENDAR_CACHE_SIZE = 24
+
+
+class AvailabilityError(ValueError):
+    """An availability rule or blackout is malformed"""
+
+
+def _minutes(value: str) -> int:
+    try:
+        hours, minutes = value.split(':')
+        total = int(hours) * 60 + int(minutes)
+    except ValueError:
+        raise AvailabilityError(f"Invalid time '{value}', expected HH:MM")
+    if not 0 <= total <= 24 * 60:
+        raise AvailabilityError(f"Invalid time '{value}', expected HH:MM")
+    return total
+
+
+def parse_date(value: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise AvailabilityError(f"Invalid date '{value}', expected YYYY-MM-DD")
+
+
+def parse_month(value: str) -> Tuple[date, date]:
+    """First and last day of a YYYY-MM month"""
+    try:
+        year, month = (int(part) for part in value.split('-'))
+        first = date(year, month, 1)
+        # date(10000, 1, 1) is out of range, so 9999-12 is rejected here too
+        following = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    except (AttributeError, TypeError, ValueError):
+        raise AvailabilityError(f"Invalid month '{value}', expected YYYY-MM")
+    return first, following - timedelta(days=1)
+
+
+def validate_rule(rule: Dict[str, Any]):
+    """Raise AvailabilityError unless the rule can generate slots"""
+    if rule.get("weekday") not in range(7):
+        raise AvailabilityError("weekday must be 0 (Monday) to 6 (Sunday)")
+    if not 5 <= rule.get("slot_minutes", 0) <= 24 * 60:
+        raise AvailabilityError("slot_minutes must be between 5 and 1440")
+    if not rule.get("windows"):
+        raise AvailabilityError("At least one time window is required")
+    for window in rule["windows"]:
+        if _minutes(window["start"]) >= _minutes(window["end"]):
+            raise AvailabilityError(f"Window {window['start']}-{window['end']} ends before it starts")
+    for key in ("valid_from", "valid_to"):
+        if rule.get(key):
+            parse_date(rule[key])
+
+
+def rule_times(rule: Dict[str, Any]) -> List[str]:
+    """HH:MM start times of the slots a rule opens on each matching day"""
+    times = set()
+    step = rule["slot_minutes"]
+    for window in rule["windows"]:
+        start, end = _minutes(window["start"]), _minutes(window["end"])
+        for minute in range(start, end - step + 1, step):
+            times.add(f"{minute // 60:02d}:{minute % 60:02d}")
+    return sorted(times)
+
+
+def generate_slots(rules: Iterable[Dict[str, Any]], blackouts: Set[str],
+                   start: date, end: date) -> Dict[Tuple[str, str], str]:
+    """(date, time) -> rule_id for every slot the active rules open in [start, end]"""
+    by_weekday: Dict[int, List[Tuple[Dict[str, Any], List[str]]]] = {}
+    for rule in rules:
+        if rule.get("active", True):
+            by_weekday.setdefault(rule["weekday"], []).append((rule, rule_times(rule)))
+
+    slots: Dict[Tuple[str, str], str] = {}
+    day = start
+    while day <= end:
+        day_str = day.isoformat()
+        if day_str not in blackouts:
+            for rule, times in by_weekday.get(day.weekday(), ()):
+                if rule.get("valid_from") and day_str < rule["valid_from"]:
+                    continue
+                if rule.get("valid_to") and day_str > rule["valid_to"]:
+                    continue
+                for slot_time in times:
+                    slots.setdefault((day_str, slot_time), rule["id"])
+        day += timedelta(days=1)
+    return slots
+
+
+class AvailabilityManager:
+    """Turns availability rules into timeslot documents on demand.
+
+    Rules and blackout dates live in `availability_rules` and
+    `availability_blackouts` and are cached in memory; the admin routes call
+    ``invalidate()`` on every write and ``AVAILABILITY_CACHE_TTL`` bounds
+    staleness for other processes. Listing slots first calls
+    ``materialize(start, end)``, which inserts the missing slots for that
+    window with one insert_many; the unique (date, time) index on timeslots
+    makes concurrent materialisation and hand-made slots safe. Days already
+    materialised for the current rules are remembered and skipped.
+
+    Month calendars (open-slot counts per day) are cached as encoded bodies
+    until ``slots_changed()``, which every booking and slot write calls, or
+    for at most ``CALENDAR_CACHE_TTL`` seconds.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.ttl = float(os.environ.get('AVAILABILITY_CACHE_TTL', '300'))
+        self._lock = asyncio.Lock()
+        self._loaded_version = -1
+        self._loaded_at = 0.0
+        self._rules: List[Dict[str, Any]] = []
+        self._blackouts: Set[str] = set()
+        self._materialized: Set[str] = set()
+        self.slots_version = 0
+        self.calendar_ttl = float(os.environ.get('CALENDAR_CACHE_TTL', '30'))
+        self._calendars: Dict[Tuple[str, str], Tuple[int, float, bytes, str]] = {}
+
+    @property
+    def rules(self):
+        return database.db.availability_rules
+
+    @property
+    def blackouts(self):
+        return database.db.availability_blackouts
+
+    async def ensure_indexes(self):
+        await database.ensure_indexes(["availability_rules", "availability_blackouts"])
+
+    def invalidate(self):
+        """Drop cached rules and the record of materialised days"""
+        self.version += 1
+        self.slots_changed()
+        logger.info(f"Availability rules invalidated: version {self.version}")
+
+    def slots_changed(self):
+        """A slot was created, booked, freed or removed; cached calendars are stale"""
+        self.slots_version += 1
+
+    def _is_fresh(self) -> bool:
+        if self._loaded_version != self.version:
+            return False
+        if self.ttl > 0 and time.monotonic() - self._loaded_at > self.ttl:
+            return False
+        return True
+
+    async def _ensure_loaded(self):
+        if self._is_fresh():
+            return
+        version = self.version
+        self._rules = await self.rules.find({}, {"_id": 0}).to_list(length=None)
+        self._blackouts = {doc["date"] for doc in await self.blackouts.find({}, {"_id": 0, "date": 1}).to_list(length=None)}
+        self._materialized = set()
+        self._loaded_version = version
+        self._loaded_at = time.monotonic()
+
+    async def materialize(self, start: date, end: date) -> int:
+        """Insert the rule-generated slots missing in [start, end]; returns how many were created"""
+        if database.db is None:
+            await database.connect()
+        today = date.today()
+        start = max(start, today)
+        end = min(end, today + timedelta(days=AVAILABILITY_MAX_DAYS))
+        if start > end:
+            return 0
+
+        async with self._lock:
+            await self._ensure_loaded()
+            if not self._rules:
+                return 0
+            days = {(start + timedelta(days=n)).isoformat() for n in range((end - start).days + 1)}
+            if days <= self._materialized:
+                return 0
+
+            wanted = generate_slots(self._rules, self._blackouts, start, end)
+            existing = set()
+            if wanted:
+                cursor = database.db.timeslots.find(
+                    {"date": {"$gte": start.isoformat(), "$lte": end.isoformat()}},
+                    {"_id": 0, "date": 1, "time": 1}
+                )
+                existing = {(doc["date"], doc["time"]) async for doc in cursor}
+
+            now = datetime.utcnow().isoformat()
+            documents = [
+                {"id": str(uuid.uuid4()), "date": slot_date, "time": slot_time, "is_available": True,
+                 "source": SOURCE_RULE, "rule_id": rule_id, "created_at": now}
+                for (slot_date, slot_time), rule_id in sorted(wanted.items())
+                if (slot_date, slot_time) not in existing
+            ]
+            created = len(documents)
+            if documents:
+                try:
+                    await database.db.timeslots.insert_many(documents, ordered=False)
+                except BulkWriteError as e:
+                    # Another process materialised some of them first
+                    errors = e.details.get("writeErrors", [])
+                    if any(error.get("code") != 11000 for error in errors):
+                        raise
+                    created -= len(errors)
+                self.slots_changed()
+                logger.info(f"Materialised {created} timeslots for {start.isoformat()}..{end.isoformat()}")
+            self._materialized |= days
+            return created
+
+    async def materialize_for(self, day: Optional[str] = None) -> int:
+        """Materialise the window a slot listing covers: one day, or the default horizon"""
+        if day:
+            start = parse_date(day)
+            return await self.materialize(start, start)
+        today = date.today()
+        return await self.materialize(today, today + timedelta(days=AVAILABILITY_HORIZON_DAYS))
+
+    async def discard_generated(self) -> int:
+        """Delete unbooked rule-generated slots from today on, after rules or blackouts change.
+
+        Booked slots are kept; the next listing regenerates the rest.
+        """
+        result = await database.db.timeslots.delete_many({
+            "source": SOURCE_RULE, "is_available": True, "date": {"$gte": date.today().isoformat()}
+        })
+        self.invalidate()
+        return result.deleted_count
+
+    async def calendar_month(self, month: str) -> Tuple[bytes, str]:
+        """Encoded {month, days: {date: open slots}, total} and its ETag.
+
+        Counts cover today onwards and come from one aggregation over the
+        (is_available, date, time) index.
+        """
+        first, last = parse_month(month)
+        today = date.today().isoformat()
+        key = (month, today)
+        cached = self._calendars.get(key)
+        if (cached is not None and cached[0] == self.slots_version
+                and (self.calendar_ttl <= 0 or time.monotonic() - cached[1] < self.calendar_ttl)):
+            return cached[2], cached[3]
+
+        await self.materialize(first, last)
+        version = self.slots_version
+        start = max(first.isoformat(), today)
+        pipeline = [
+            {"$match": {"is_available": True, "date": {"$gte": start, "$lte": last.isoformat()}}},
+            {"$group": {"_id": "$date", "open": {"$sum": 1}}},
+            {"$sort": {"_id": 1}},
+        ]
+        days = {doc["_id"]: doc["open"] async for doc in database.db.timeslots.aggregate(pipeline)}
+        body = dumps({"success": True, "data": {"month": month, "days": days, "total": sum(days.values())}})
+        etag = compute_etag(body)
+
+        if version == self.slots_version:
+            if len(self._calendars) >= CALENDAR_CACHE_SIZE:
+                self._calendars.pop(next(iter(self._calendars)))
+            self._calendars[key] = (version, time.monotonic(), body, etag)
+        return body, etag
+
+    # ----- admin operations -----
+
+    async def list_rules(self) -> List[Dict[str, Any]]:
+        return await self.rules.find({}, {"_id": 0}).sort([("weekday", 1), ("created_at", 1)]).to_list(length=None)
+
+    async def create_rule(self, rule_data: Dict[str, Any]) -> Dict[str, Any]:
+        validate_rule(rule_data)
+        await self.rules.insert_one(rule_data)
+        rule_data.pop("_id", None)
+        await self.discard_generated()
+        return rule_data
+
+    async def update_rule(self, rule_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        existing = await self.rules.find_one({"id": rule_id}, {"_id": 0})
+        if not existing:
+            return None
+        merged = {**existing, **update_data}
+        validate_rule(merged)
+        await self.rules.update_one({"id": rule_id}, {"$set": update_data})
+        await self.discard_generated()
+        return merged
+
+    async def delete_rule(self, rule_id: str) -> bool:
+        result = await self.rules.delete_one({"id": rule_id})
+        if result.deleted_count:
+            await self.discard_generated()
+        return result.deleted_count > 0
+
+    async def list_blackouts(self) -> List[Dict[str, Any]]:
+        return await self.blackouts.find({}, {"_id": 0}).sort("date", 1).to_list(length=None)
+
+    async def add_blackout(self, blackout: Dict[str, Any]) -> Dict[str, Any]:
+        parse_date(blackout["date"])
+        await self.blackouts.update_one({"date": blackout["date"]}, {"$set": blackout}, upsert=True)
+        await self.discard_generated()
+        return blackout
+
+    async def remove_blackout(self, day: str) -> bool:
+        result = await self.blackouts.delete_one({"date": day})
+        if result.deleted_count:
+            await self.discard_generated()
+        return result.deleted_count > 0
+
+
+# Singleton instance
+availability = AvailabilityManager()
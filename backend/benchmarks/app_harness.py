@@ -0,0 +1,35 @@
+"""
+Helpers for benchmarks that drive the real app over HTTP: run it under
+uvicorn in a background thread and summarise latencies.
+"""
+import socket
+import threading
+import time
+
+import uvicorn
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def start_app(port: int) -> uvicorn.Server:
+    """Start server.app on 127.0.0.1:port; set the app's environment first"""
+    # Imported here: settings are read from the environment at import time
+    from server import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=port, log_level='warning'))
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.monotonic() + 30
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("App did not start within 30s")
+        time.sleep(0.05)
+    return server
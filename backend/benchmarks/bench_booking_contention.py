@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Concurrency stress test for POST /api/booking: many clients race for one
+timeslot, and exactly one of them must win.
+
+Each round creates a fresh slot, then releases --clients requests for it at
+the same instant through a barrier. The round passes when exactly one
+request gets 200, all others get 400 "no longer available", and the
+database holds exactly one booking for the slot. Latency under contention is
+reported for winners and losers separately. The exit status is 1 if any round
+fails.
+
+Needs a local MongoDB it may write to: the --db-name database is dropped at
+the end. Email goes to a temporary maildir, so nothing is sent.
+
+Run: python benchmarks/bench_booking_contention.py --mongo-url mongodb://localhost:27017
+         [--clients 300] [--rounds 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+# Ensure backend package path is on sys.path when running from repo root
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+import requests
+from pymongo import MongoClient
+
+from app_harness import free_port, percentile, start_app
+
+
+def run_round(number: int, base_url: str, db, clients: int) -> bool:
+    timeslot_id = str(uuid.uuid4())
+    db.timeslots.insert_one({
+        "id": timeslot_id, "date": "2030-01-01", "time": f"{number % 24:02d}:00",
+        "is_available": True, "created_at": datetime.utcnow().isoformat(),
+    })
+    barrier = threading.Barrier(clients)
+    session = requests.Session()
+    session.mount('http://', requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=clients))
+
+    def book(n: int):
+        payload = {
+            "full_name": f"Racer {n}", "email": f"racer{n}@example.com", "phone": "9999999999",
+            "business_type": "startup", "service_interest": "GST Registration", "timeslot_id": timeslot_id,
+        }
+        barrier.wait()
+        start = time.perf_counter()
+        response = session.post(base_url + "/api/booking", json=payload, timeout=120)
+        return response.status_code, (time.perf_counter() - start) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        results = list(executor.map(book, range(clients)))
+    elapsed = time.perf_counter() - started
+
+    statuses = Counter(status for status, _ in results)
+    bookings = db.bookings.count_documents({"timeslot_id": timeslot_id})
+    slot = db.timeslots.find_one({"id": timeslot_id})
+    ok = (statuses[200] == 1 and statuses[400] == clients - 1 and bookings == 1
+          and slot is not None and not slot["is_available"])
+
+    winners = [ms for status, ms in results if status == 200]
+    losers = [ms for status, ms in results if status != 200]
+    print(f"\n[round {number}] {clients} clients, {elapsed:.2f}s: "
+          f"{', '.join(f'{status} x{count}' for status, count in sorted(statuses.items()))}, "
+          f"{bookings} booking(s) stored -> {'OK' if ok else 'FAIL'}")
+    if winners:
+        print(f"  winner  {winners[0]:7.1f} ms")
+    if losers:
+        print(f"  losers  p50 {statistics.median(losers):7.1f} ms  p95 {percentile(losers, 95):7.1f} ms  "
+              f"p99 {percentile(losers, 99):7.1f} ms  max {max(losers):7.1f} ms")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", default=os.environ.get("BENCH_MONGO_URL"),
+                        help="MongoDB to use (or BENCH_MONGO_URL); never defaults to the app's database")
+    parser.add_argument("--db-name", default="hdmonks_booking_bench")
+    parser.add_argument("--clients", type=int, default=300)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    if not args.mongo_url:
+        parser.error("--mongo-url (or BENCH_MONGO_URL) is required")
+
+    os.environ.update({
+        "MONGO_URL": args.mongo_url,
+        "DB_NAME": args.db_name,
+        "EMAIL_TRANSPORT": "maildir",
+        "EMAIL_MAILDIR": tempfile.mkdtemp(prefix="booking-bench-"),
+    })
+
+    client = MongoClient(args.mongo_url)
+    db = client[args.db_name]
+    port = free_port()
+    server = start_app(port)
+
+    try:
+        passed = [run_round(n, f"http://127.0.0.1:{port}", db, args.clients) for n in range(1, args.rounds + 1)]
+    finally:
+        server.should_exit = True
+        time.sleep(0.5)
+        client.drop_database(args.db_name)
+
+    print(f"\n{sum(passed)}/{len(passed)} rounds had exactly one winner")
+    if not all(passed):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
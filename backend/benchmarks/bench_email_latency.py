@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+End-to-end latency of POST /api/contact and POST /api/booking against fast,
+slow and failing mail servers.
+
+The app runs under uvicorn in this process, with its SMTP settings pointed at
+the in-process SMTP sink. For each scenario the sink's reply latency or
+failure mode is switched and the same request mix is replayed over HTTP.
+Request latency should not depend on the mail server, since the routes only
+enqueue to the outbox. Delivery time (until the sink has every message) and
+the outbox state show what the mail server costs.
+
+Needs a MongoDB it may write to: the --db-name database is dropped at the
+end. --max-p95-ms turns the run into a regression gate: the exit status is 1
+if any scenario's request p95 exceeds it.
+
+Run: python benchmarks/bench_email_latency.py --mongo-url mongodb://localhost:27017
+         [--requests 200] [--concurrency 10] [--slow-ms 250] [--max-p95-ms 250]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+# Ensure backend package path is on sys.path when running from repo root
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+import requests
+from pymongo import MongoClient
+
+from app_harness import free_port, percentile, start_app
+from smtp_sink import SINK_OK, SINK_REJECT, SMTPSink
+
+SCENARIOS = ("fast", "slow", "failing")
+MINUTES_PER_DAY = 24 * 60
+
+
+def make_requests(db, count: int, scenario: int):
+    """Half contact inquiries, half bookings (each on its own new timeslot).
+
+    Slots are one minute apart on days reserved for the scenario, so no two
+    scenarios collide on the unique (date, time) index.
+    """
+    days = (count // 2) // MINUTES_PER_DAY + 1
+    first_day = date(2030, 1, 1) + timedelta(days=scenario * days)
+    timeslots = [
+        {"id": str(uuid.uuid4()), "date": (first_day + timedelta(days=n // MINUTES_PER_DAY)).isoformat(),
+         "time": f"{n // 60 % 24:02d}:{n % 60:02d}", "is_available": True,
+         "created_at": datetime.utcnow().isoformat()}
+        for n in range(count // 2)
+    ]
+    if timeslots:
+        db.timeslots.insert_many(timeslots)
+    work = []
+    for n in range(count):
+        if n % 2 == 0:
+            work.append(("/api/contact", {
+                "full_name": f"Bench Contact {n}", "email": f"contact{n}@example.com",
+                "phone": "9999999999", "message": "Benchmark inquiry", "service_interest": "GST Registration",
+            }))
+        else:
+            work.append(("/api/booking", {
+                "full_name": f"Bench Booking {n}", "email": f"booking{n}@example.com", "phone": "9999999999",
+                "business_type": "startup", "service_interest": "GST Registration",
+                "timeslot_id": timeslots[n // 2]["id"],
+            }))
+    return work
+
+
+def run_scenario(name: str, base_url: str, work, concurrency: int, sink: SMTPSink, db, timeout: float):
+    sink.reset()
+    db.email_outbox.delete_many({})
+    latencies = {"/api/contact": [], "/api/booking": []}
+    errors = 0
+    session = requests.Session()
+    session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=concurrency))
+
+    def call(item):
+        path, payload = item
+        start = time.perf_counter()
+        response = session.post(base_url + path, json=payload, timeout=60)
+        return path, time.perf_counter() - start, response.status_code
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for path, elapsed, status in executor.map(call, work):
+            latencies[path].append(elapsed * 1000)
+            errors += status != 200
+    requests_done = time.monotonic()
+
+    expected = 2 * (len(work) - errors)
+    delivered_all = sink.failure == SINK_OK and sink.wait_for(expected, timeout)
+    drained = time.monotonic()
+
+    print(f"\n[{name}] {len(work)} requests, {errors} errors, {time.monotonic() - started:.1f}s")
+    for path, values in latencies.items():
+        if values:
+            print(f"  {path:<14} p50 {statistics.median(values):7.1f} ms  p95 {percentile(values, 95):7.1f} ms  "
+                  f"p99 {percentile(values, 99):7.1f} ms  max {max(values):7.1f} ms")
+    received = len(sink.messages)
+    if delivered_all:
+        print(f"  delivered {received}/{expected} emails {drained - requests_done:.2f}s after the last request "
+              f"({received / max(drained - started, 1e-9):.1f} msg/s end to end)")
+    else:
+        print(f"  delivered {received}/{expected} emails")
+    counts = {row["_id"]: row["count"] for row in db.email_outbox.aggregate(
+        [{"$group": {"_id": "$status", "count": {"$sum": 1}}}]
+    )}
+    print(f"  outbox: {', '.join(f'{status} {count}' for status, count in sorted(counts.items())) or 'empty'}")
+    return max(percentile(values, 95) for values in latencies.values() if values)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", default=os.environ.get("BENCH_MONGO_URL"),
+                        help="MongoDB to use (or BENCH_MONGO_URL); never defaults to the app's database")
+    parser.add_argument("--db-name", default="hdmonks_email_bench")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--slow-ms", type=float, default=250.0, help="sink reply latency in the slow scenario")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--delivery-timeout", type=float, default=60.0)
+    parser.add_argument("--max-p95-ms", type=float, default=None, help="fail if a request p95 exceeds this")
+    args = parser.parse_args()
+    if not args.mongo_url:
+        parser.error("--mongo-url (or BENCH_MONGO_URL) is required")
+
+    sink = SMTPSink().start()
+    os.environ.update({
+        "MONGO_URL": args.mongo_url,
+        "DB_NAME": args.db_name,
+        "SMTP_SERVER": "127.0.0.1",
+        "SMTP_PORT": str(sink.port),
+        "SMTP_USERNAME": "bench",
+        "SMTP_PASSWORD": "bench",
+        "SMTP_STARTTLS": "false",
+        "EMAIL_TRANSPORT": "smtp",
+    })
+
+    client = MongoClient(args.mongo_url)
+    db = client[args.db_name]
+    port = free_port()
+    server = start_app(port)
+    base_url = f"http://127.0.0.1:{port}"
+
+    worst_p95 = 0.0
+    try:
+        for number, name in enumerate(args.scenarios.split(",")):
+            sink.latency = args.slow_ms / 1000 if name == "slow" else 0.0
+            sink.failure = SINK_REJECT if name == "failing" else SINK_OK
+            work = make_requests(db, args.requests, number)
+            worst_p95 = max(worst_p95, run_scenario(
+                name, base_url, work, args.concurrency, sink, db, args.delivery_timeout
+            ))
+    finally:
+        server.should_exit = True
+        time.sleep(0.5)
+        client.drop_database(args.db_name)
+        sink.shutdown()
+
+    if args.max_p95_ms is not None:
+        if worst_p95 > args.max_p95_ms:
+            print(f"\nFAIL: request p95 {worst_p95:.1f} ms exceeds {args.max_p95_ms:g} ms")
+            sys.exit(1)
+        print(f"\nOK: request p95 {worst_p95:.1f} ms within {args.max_p95_ms:g} ms")
+
+
+if __name__ == "__main__":
+    main()
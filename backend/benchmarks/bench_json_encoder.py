@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark response encoding: the old serialize_mongo + jsonable_encoder +
+JSONResponse path against the shared single-pass encoder (json_encoder.dumps),
+on a large stage list and a partner's client list.
+
+Run: python benchmarks/bench_json_encoder.py [--stages 6] [--services 10] [--clients 500] [--iterations 500]
+"""
+import argparse
+import sys
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+# Ensure backend package path is on sys.path when running from repo root
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+import json_encoder
+from json_encoder import FastJSONResponse
+from bench_stages_payload import build_catalog, serialize_mongo, timeit
+
+
+def build_clients(count: int, services_per_client: int = 5):
+    """Client documents as read from MongoDB: native datetimes, _id still present"""
+    clients = []
+    for n in range(count):
+        clients.append({
+            "_id": ObjectId(),
+            "id": str(uuid.uuid4()),
+            "partner_id": str(uuid.uuid4()),
+            "execution_partner_id": str(uuid.uuid4()),
+            "referral_partner_id": None,
+            "full_name": f"Client {n}",
+            "email": f"client{n}@example.com",
+            "phone": "+91-9000000000",
+            "company": f"Company {n} Pvt Ltd",
+            "closed_cost": 125000.0,
+            "services": [
+                {
+                    "id": str(uuid.uuid4()),
+                    "service_id": f"service-{s}",
+                    "service_name": f"Service {s}",
+                    "price": 25000.0,
+                    "purchase_date": datetime.utcnow(),
+                    "metadata": {"notes": "Follow up next quarter", "source": "referral"},
+                    "breakdown_percentages": {"referral_percent": 10, "execution_percent": 80, "admin_percent": 10},
+                }
+                for s in range(services_per_client)
+            ],
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow(),
+        })
+    return clients
+
+
+def old_path(payload):
+    """What the routes did before: serialize_mongo, jsonable_encoder, JSONResponse.render"""
+    return JSONResponse(content=jsonable_encoder(serialize_mongo(payload))).body
+
+
+def new_path(payload):
+    return FastJSONResponse(payload).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--stages", type=int, default=6)
+    parser.add_argument("--services", type=int, default=10)
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    backend = "orjson" if json_encoder.orjson is not None else "stdlib json"
+    print(f"Encoder backend: {backend}")
+
+    workloads = [
+        (f"stages ({args.stages} x {args.services} services)",
+         {"success": True, "data": build_catalog(args.stages, args.services)}),
+        (f"clients ({args.clients})",
+         {"success": True, "data": build_clients(args.clients)}),
+    ]
+    for label, payload in workloads:
+        print()
+        print(f"{label}: {len(new_path(payload))} bytes")
+        before = timeit("serialize_mongo + jsonable_encoder", lambda: old_path(payload), args.iterations)
+        after = timeit("json_encoder.dumps", lambda: new_path(payload), args.iterations)
+        print(f"Speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
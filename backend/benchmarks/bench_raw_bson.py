@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark bson_json.raw_json_array's per-document transcoding: python-bsonjs
+against bson.decode + json_encoder.dumps, on a partner's client list as it is
+stored (ISO string dates, `_id` projected out).
+
+Run: python benchmarks/bench_raw_bson.py [--clients 500] [--iterations 200]
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Ensure backend package path is on sys.path when running from repo root
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+import bson
+from bson.raw_bson import RawBSONDocument
+
+import bson_json
+import json_encoder
+from bench_json_encoder import build_clients
+from bench_stages_payload import timeit
+
+
+def stored_clients(count: int):
+    """Raw documents as a RAW_CODEC_OPTIONS cursor yields them"""
+    documents = json.loads(json_encoder.dumps(build_clients(count)))
+    for document in documents:
+        document.pop("_id")
+    return [RawBSONDocument(bson.encode(document)) for document in documents]
+
+
+def transcode(documents):
+    return b'[' + b','.join(bson_json.raw_to_json(document) for document in documents) + b']'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    backend = "orjson" if json_encoder.orjson is not None else "stdlib json"
+    print(f"Encoder backend: {backend}")
+    documents = stored_clients(args.clients)
+    print(f"clients ({args.clients}): {sum(len(document.raw) for document in documents)} BSON bytes")
+
+    bsonjs, enabled = bson_json.bsonjs, bson_json.BSONJS_TRANSCODE
+    try:
+        bson_json.BSONJS_TRANSCODE = False
+        decoded = timeit("bson.decode + json_encoder.dumps", lambda: transcode(documents), args.iterations)
+        if bsonjs is None:
+            print("python-bsonjs is not installed")
+            return
+        expected = json.loads(transcode(documents))
+        bson_json.BSONJS_TRANSCODE = True
+        assert json.loads(transcode(documents)) == expected
+        transcoded = timeit("bsonjs.dumps", lambda: transcode(documents), args.iterations)
+        print(f"bsonjs speedup: {decoded / transcoded:.2f}x")
+    finally:
+        bson_json.BSONJS_TRANSCODE = enabled
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark email delivery: a new SMTP connection per message (connect, EHLO,
+AUTH, send, QUIT, as EmailService used to do) against the pooled connections
+of SMTPConnectionPool, using the in-process SMTP sink.
+
+The sink answers every command after --rtt-ms milliseconds to model the round
+trip to a real provider. It does not speak TLS, so the STARTTLS round trip and
+handshake the old path also paid are not included; the real gap is larger.
+
+Run: python benchmarks/bench_smtp_pool.py [--messages 200] [--rtt-ms 20] [--pool-size 2]
+"""
+import argparse
+import smtplib
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.mime.text import MIMEText
+from pathlib import Path
+
+# Ensure backend package path is on sys.path when running from repo root
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+from smtp_pool import SMTPConnectionPool
+from smtp_sink import SMTPSink
+
+
+def build_message(n: int) -> MIMEText:
+    msg = MIMEText(f"<p>Message {n}</p>", 'html')
+    msg['From'] = "noreply@example.com"
+    msg['To'] = f"client{n}@example.com"
+    msg['Subject'] = f"Booking Confirmation #{n}"
+    return msg
+
+
+def send_per_connection(port: int, msg: MIMEText):
+    """The old EmailService.send_email path, minus STARTTLS"""
+    with smtplib.SMTP('127.0.0.1', port) as server:
+        server.login("user", "secret")
+        server.send_message(msg)
+
+
+def run(label: str, send, messages: int, workers: int):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(send, range(messages)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:8.2f} s  {messages / elapsed:8.1f} msg/s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--rtt-ms", type=float, default=20.0)
+    parser.add_argument("--pool-size", type=int, default=2)
+    args = parser.parse_args()
+
+    server = SMTPSink(latency=args.rtt_ms / 1000).start()
+    print(f"{args.messages} messages, {args.rtt_ms:g} ms per SMTP round trip, {args.pool_size} sender(s)")
+    print()
+
+    old = run("connection per message",
+              lambda n: send_per_connection(server.port, build_message(n)),
+              args.messages, args.pool_size)
+    old_connections, server.connections = server.connections, 0
+
+    pool = SMTPConnectionPool('127.0.0.1', server.port, "user", "secret",
+                              starttls=False, max_size=args.pool_size)
+    new = run("pooled connections",
+              lambda n: pool.send(build_message(n)),
+              args.messages, args.pool_size)
+    pool.close()
+
+    print()
+    print(f"Connections opened: {old_connections} -> {server.connections}")
+    print(f"Speedup: {old / new:.1f}x")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark the /api/stages response path: per-request encoding vs. the
+pre-encoded catalog snapshot.
+
+Run: python benchmarks/bench_stages_payload.py [--stages 6] [--services 10] [--iterations 2000]
+"""
+import argparse
+import sys
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+# Ensure backend package path is on sys.path when running from repo root
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from catalog_cache import EncodedBody
+
+
+def serialize_mongo(document):
+    """The per-request ObjectId pass server.py used to run on every read"""
+    if isinstance(document, list):
+        return [serialize_mongo(doc) for doc in document]
+
+    if isinstance(document, dict):
+        new_doc = {}
+        for k, v in document.items():
+            if isinstance(v, ObjectId):
+                new_doc[k] = str(v)
+            else:
+                new_doc[k] = serialize_mongo(v) if isinstance(v, (dict, list)) else v
+        return new_doc
+
+    return document
+
+
+def build_catalog(stage_count: int, services_per_stage: int):
+    """Build a synthetic catalog shaped like the seeded stages"""
+    stages = []
+    for stage_id in range(1, stage_count + 1):
+        services = []
+        for n in range(services_per_stage):
+            service_id = f"service-{stage_id}-{n}"
+            services.append({
+                "id": f"{service_id}-1",
+                "service_id": service_id,
+                "name": f"Service {stage_id}.{n}",
+                "description": "End-to-end support for this stage of your business " * 2,
+                "icon": "Rocket",
+                "details": "Detailed explanation of the service offering. " * 20,
+                "relevant_for": ["startup", "msme"],
+                "price": "On request",
+                "duration": "2-4 weeks",
+                "features": [f"Feature {i}" for i in range(8)],
+                "content_sections": [
+                    {"id": str(uuid.uuid4()), "heading": f"Section {i}", "content": "SEO content paragraph. " * 40, "order": i}
+                    for i in range(4)
+                ],
+                "created_at": datetime.utcnow().isoformat(),
+                "updated_at": datetime.utcnow().isoformat(),
+            })
+        stages.append({
+            "id": stage_id,
+            "title": f"Stage {stage_id}",
+            "subtitle": "Subtitle",
+            "phase": "Foundation",
+            "services": services,
+            "created_at": datetime.utcnow().isoformat(),
+            "updated_at": datetime.utcnow().isoformat(),
+        })
+    return stages
+
+
+def current_path(stages):
+    """What the route did before: serialize_mongo, jsonable_encoder, JSONResponse.render"""
+    data = serialize_mongo(stages)
+    return JSONResponse(content=jsonable_encoder({"success": True, "data": data})).body
+
+
+def snapshot_path(snapshot, accept_encoding):
+    body, _ = snapshot.negotiate(accept_encoding)
+    return body
+
+
+def timeit(label, fn, iterations):
+    fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - start
+    per_call_us = elapsed / iterations * 1e6
+    print(f"{label:<32} {per_call_us:>10.1f} us/request  {iterations / elapsed:>12.0f} req/s")
+    return per_call_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--stages", type=int, default=6)
+    parser.add_argument("--services", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    stages = build_catalog(args.stages, args.services)
+
+    start = time.perf_counter()
+    snapshot = EncodedBody({"success": True, "data": stages}, compress=True)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    print(f"Catalog: {args.stages} stages x {args.services} services")
+    print(f"Snapshot build (once per catalog change): {build_ms:.1f} ms")
+    print(f"Body sizes: identity={len(snapshot.body)} gzip={len(snapshot.gzip_body)} "
+          f"br={len(snapshot.br_body) if snapshot.br_body is not None else 'n/a'} bytes")
+    print()
+
+    baseline = timeit("serialize + encode per request", lambda: current_path(stages), args.iterations)
+    snap = timeit("pre-encoded snapshot (identity)", lambda: snapshot_path(snapshot, ""), args.iterations)
+    timeit("pre-encoded snapshot (br/gzip)", lambda: snapshot_path(snapshot, "gzip, deflate, br"), args.iterations)
+    print()
+    print(f"Speedup: {baseline / snap:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Booking reminders: a periodic scan queues a reminder email for every
+confirmed booking starting within the next BOOKING_REMINDER_LEAD_HOURS.
+
+Each pass reads due bookings in batches with one indexed range query per
+batch, renders their reminders and hands them to the email outbox, whose
+workers deliver them with retries. A reminder's outbox id is derived from
+its booking, so a booking is reminded once even when several schedulers
+(app processes, or this file run as a worker) scan the same window.
+Slot dates and times are read as BUSINESS_TIMEZONE wall-clock times.
+
+Run: python booking_reminders.py [--once]
+Set BOOKING_REMINDERS_ENABLED=false on the app when reminders run here instead.
+"""
+import argparse
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from database import database
+from email_outbox import email_outbox
+from email_service import email_service
+from email_templates import email_template_cache
+
+logger = logging.getLogger(__name__)
+
+BOOKING_REMINDERS_ENABLED = os.environ.get('BOOKING_REMINDERS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+# Bookings starting within this many hours get their reminder
+BOOKING_REMINDER_LEAD_HOURS = float(os.environ.get('BOOKING_REMINDER_LEAD_HOURS', '24'))
+# Seconds between scans
+BOOKING_REMINDER_INTERVAL = float(os.environ.get('BOOKING_REMINDER_INTERVAL', '300'))
+BOOKING_REMINDER_BATCH_SIZE = int(os.environ.get('BOOKING_REMINDER_BATCH_SIZE', '500'))
+# Timezone of the stored slot dates and times, whatever the server's clock is set to
+BUSINESS_TIMEZONE = ZoneInfo(os.environ.get('BUSINESS_TIMEZONE', 'Asia/Kolkata'))
+
+OUTBOX_KIND = "booking_reminder"
+
+
+def reminder_outbox_id(booking_id: str) -> str:
+    return f"reminder:{booking_id}"
+
+
+def reminder_window(now: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+    """Start and end of the reminder window as BUSINESS_TIMEZONE wall-clock times.
+
+    `now` is an aware datetime (the current time by default); naive values
+    are taken as UTC.
+    """
+    now = now or datetime.now(timezone.utc)
+    if now.tzinfo is None:
+        now = now.replace(tzinfo=timezone.utc)
+    end = now + timedelta(hours=BOOKING_REMINDER_LEAD_HOURS)
+    return now.astimezone(BUSINESS_TIMEZONE), end.astimezone(BUSINESS_TIMEZONE)
+
+
+def due_query(start: datetime, end: datetime) -> Dict[str, Any]:
+    """Confirmed, not yet reminded bookings whose date and time fall in [start, end].
+
+    Bookings store the local date and time of their slot as separate
+    strings, so the window is split into per-day ranges that each map onto
+    the (status, reminder_sent_at, date, time) index.
+    """
+    first_day, first_time = start.strftime('%Y-%m-%d'), start.strftime('%H:%M')
+    last_day, last_time = end.strftime('%Y-%m-%d'), end.strftime('%H:%M')
+    if first_day == last_day:
+        window = [{"date": first_day, "time": {"$gte": first_time, "$lte": last_time}}]
+    else:
+        window = [
+            {"date": first_day, "time": {"$gte": first_time}},
+            {"date": {"$gt": first_day, "$lt": last_day}},
+            {"date": last_day, "time": {"$lte": last_time}},
+        ]
+    return {"status": "confirmed", "reminder_sent_at": None, "$or": window}
+
+
+class BookingReminderScheduler:
+    """Queues booking reminders every BOOKING_REMINDER_INTERVAL seconds"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def bookings(self):
+        return database.db.bookings
+
+    async def run_once(self, now: Optional[datetime] = None) -> int:
+        """Queue reminders for every booking due at `now` (aware; the current
+        time by default); returns how many were queued"""
+        if database.db is None:
+            await database.connect()
+        query = due_query(*reminder_window(now))
+        templates = await email_template_cache.get_snapshot()
+        queued = 0
+        while True:
+            # Reminded bookings drop out of the query, so each batch starts where the last ended
+            bookings = await self.bookings.find(query, {"_id": 0}).sort(
+                [("date", 1), ("time", 1)]
+            ).limit(BOOKING_REMINDER_BATCH_SIZE).to_list(length=None)
+            if not bookings:
+                break
+            queued += len(await self._queue(bookings, templates))
+            result = await self.bookings.update_many(
+                {"id": {"$in": [booking["id"] for booking in bookings]}, "reminder_sent_at": None},
+                {"$set": {"reminder_sent_at": datetime.utcnow().isoformat()}}
+            )
+            if len(bookings) < BOOKING_REMINDER_BATCH_SIZE or result.modified_count == 0:
+                break
+        if queued:
+            logger.info(f"Queued {queued} booking reminder(s)")
+        return queued
+
+    async def _queue(self, bookings: List[Dict[str, Any]], templates) -> List[str]:
+        """Put the bookings' reminders in the outbox, skipping any already queued"""
+        messages = [
+            {**email_service.build_booking_reminder_message(booking, templates),
+             "id": reminder_outbox_id(booking["id"]), "booking_id": booking["id"]}
+            for booking in bookings
+        ]
+        return await email_outbox.enqueue(messages, OUTBOX_KIND, dedupe=True)
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Booking reminder scan failed: {str(e)}")
+            await asyncio.sleep(BOOKING_REMINDER_INTERVAL)
+
+    async def start(self):
+        """Start scanning in the background (called on app startup)"""
+        if self._task is not None or not BOOKING_REMINDERS_ENABLED:
+            return
+        self._task = asyncio.create_task(self._loop())
+        logger.info(f"Booking reminders scheduled every {BOOKING_REMINDER_INTERVAL:g}s")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+
+# Global booking reminder scheduler instance
+booking_reminders = BookingReminderScheduler()
+
+
+async def main(args):
+    await database.connect()
+    await database.ensure_indexes(["bookings", "email_outbox"])
+    try:
+        if args.once:
+            print(f"Queued {await booking_reminders.run_once()} booking reminder(s)")
+            return
+        await booking_reminders._loop()
+    finally:
+        await database.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--once", action="store_true", help="run a single scan and exit")
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(parser.parse_args()))
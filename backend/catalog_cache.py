@@ -0,0 +1,342 @@
+"""
+In-memory cache of the public service catalog (stages and their services)
+"""
+import asyncio
+import gzip
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple, Type, get_args
+
+from pydantic import BaseModel
+
+from catalog_search import CatalogSearchIndex
+from database import database
+from http_cache import accepted_encodings, compute_etag
+from json_encoder import dumps
+from models import ContentSection, Service, Stage
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+
+class EncodedBody:
+    """Immutable pre-encoded JSON response body, its ETag and optional compressed variants"""
+
+    __slots__ = ('body', 'etag', 'gzip_body', 'br_body')
+
+    def __init__(self, payload: Any, compress: bool = False):
+        self.body = dumps(payload)
+        self.etag = compute_etag(self.body)
+        self.gzip_body = gzip.compress(self.body, compresslevel=9) if compress else None
+        self.br_body = brotli.compress(self.body) if compress and brotli is not None else None
+
+    def negotiate(self, accept_encoding: str) -> Tuple[bytes, Optional[str]]:
+        """Pick the smallest variant the client accepts; returns (body, content_encoding)"""
+        accepted = accepted_encodings(accept_encoding or '')
+        if self.br_body is not None and 'br' in accepted:
+            return self.br_body, 'br'
+        if self.gzip_body is not None and 'gzip' in accepted:
+            return self.gzip_body, 'gzip'
+        return self.body, None
+
+
+Fieldset = Optional[Tuple[str, ...]]
+
+
+def parse_fieldset(value: Optional[str]) -> Fieldset:
+    """Parse a ``?fields=`` / ``?exclude=`` value such as ``title,services.name`` into a sorted tuple"""
+    if not value:
+        return None
+    paths = {path.strip() for path in value.split(',') if path.strip()}
+    return tuple(sorted(paths)) or None
+
+
+class FieldsetError(ValueError):
+    """A ?fields= / ?exclude= path that names no field of the catalog models or documents"""
+
+
+def field_paths(value: Any, prefix: str = '') -> Set[str]:
+    """Every dotted path in a document, descending into nested dicts and lists of dicts"""
+    paths: Set[str] = set()
+    if isinstance(value, list):
+        for item in value:
+            paths |= field_paths(item, prefix)
+    elif isinstance(value, dict):
+        for key, child in value.items():
+            path = f"{prefix}{key}"
+            paths.add(path)
+            paths |= field_paths(child, path + '.')
+    return paths
+
+
+def model_paths(model: Type[BaseModel], prefix: str = '') -> Set[str]:
+    """Every dotted path a model declares, descending into nested models
+    (also inside List[...] and Optional[...])"""
+    paths: Set[str] = set()
+    for name, field in model.model_fields.items():
+        path = f"{prefix}{name}"
+        paths.add(path)
+        pending = [field.annotation]
+        while pending:
+            annotation = pending.pop()
+            if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+                paths |= model_paths(annotation, path + '.')
+            else:
+                pending.extend(get_args(annotation))
+    return paths
+
+
+# Service stores content sections as plain dicts shaped like ContentSection
+SERVICE_PATHS = model_paths(Service) | model_paths(ContentSection, 'content_sections.')
+STAGE_PATHS = model_paths(Stage) | {f"services.{path}" for path in SERVICE_PATHS}
+
+
+def _tree_paths(tree: Dict[str, Any], prefix: str = '') -> List[str]:
+    paths = []
+    for key, subtree in tree.items():
+        if subtree is True:
+            paths.append(prefix + key)
+        else:
+            paths.extend(_tree_paths(subtree, f"{prefix}{key}."))
+    return paths
+
+
+def _overlaps(path: str, other: str) -> bool:
+    return path == other or path.startswith(other + '.') or other.startswith(path + '.')
+
+
+def normalize_projection(fields: Fieldset, exclude: Fieldset,
+                         known: Set[str]) -> Tuple[Fieldset, Fieldset]:
+    """The projection that actually applies, in one canonical form.
+
+    Raises FieldsetError for paths not in `known`. Paths covered by a parent
+    (``services`` and ``services.name``) collapse into the parent, and
+    exclusions outside the selected fields are dropped, so equivalent
+    queries share one cached body.
+    """
+    unknown = sorted(path for path in (fields or ()) + (exclude or ()) if path not in known)
+    if unknown:
+        raise FieldsetError(f"Unknown field(s): {', '.join(unknown)}")
+    if fields:
+        fields = tuple(sorted(_tree_paths(_path_tree(fields))))
+    if exclude:
+        exclude = tuple(sorted(
+            path for path in _tree_paths(_path_tree(exclude))
+            if not fields or any(_overlaps(path, field) for field in fields)
+        ))
+    return fields or None, exclude or None
+
+
+def _path_tree(paths: Tuple[str, ...]) -> Dict[str, Any]:
+    """Turn dotted paths into a nested dict; a leaf (True) selects the whole value"""
+    tree: Dict[str, Any] = {}
+    for path in paths:
+        node = tree
+        parts = path.split('.')
+        for part in parts[:-1]:
+            child = node.get(part)
+            if child is True:
+                break
+            node = node.setdefault(part, {})
+        else:
+            node[parts[-1]] = True
+    return tree
+
+
+def _include(value: Any, tree: Dict[str, Any]) -> Any:
+    if isinstance(value, list):
+        return [_include(item, tree) for item in value]
+    if not isinstance(value, dict):
+        return value
+    projected = {}
+    for key, subtree in tree.items():
+        if key in value:
+            projected[key] = value[key] if subtree is True else _include(value[key], subtree)
+    return projected
+
+
+def _exclude(value: Any, tree: Dict[str, Any]) -> Any:
+    if isinstance(value, list):
+        return [_exclude(item, tree) for item in value]
+    if not isinstance(value, dict):
+        return value
+    projected = {}
+    for key, item in value.items():
+        subtree = tree.get(key)
+        if subtree is True:
+            continue
+        projected[key] = item if subtree is None else _exclude(item, subtree)
+    return projected
+
+
+def project_document(value: Any, fields: Fieldset = None, exclude: Fieldset = None) -> Any:
+    """Apply an inclusion and/or exclusion projection to a document or list of documents.
+
+    Dotted paths descend into nested documents and into every element of
+    nested lists, so ``services.name`` keeps the name of each service.
+    """
+    if fields:
+        value = _include(value, _path_tree(fields))
+    if exclude:
+        value = _exclude(value, _path_tree(exclude))
+    return value
+
+
+class CatalogSnapshot:
+    """Response bodies for one catalog version.
+
+    The full /api/stages body is rendered eagerly with gzip and brotli
+    variants; single stage and service bodies and sparse fieldsets are
+    rendered on first request, uncompressed (CompressionMiddleware compresses
+    them at its normal levels), and kept until the catalog changes.
+    """
+
+    # Cap on memoised bodies so arbitrary ?fields= values cannot grow memory
+    MAX_BODIES = 256
+
+    def __init__(self, version: int, stages: List[Dict[str, Any]],
+                 stages_by_id: Dict[int, Dict[str, Any]],
+                 services_by_id: Dict[str, Dict[str, Any]]):
+        self.version = version
+        self.stages = EncodedBody({"success": True, "data": stages}, compress=True)
+        self._stages_list = stages
+        self._stages_by_id = stages_by_id
+        self._services_by_id = services_by_id
+        self._bodies: Dict[Tuple[Any, ...], EncodedBody] = {}
+        # Valid ?fields= / ?exclude= paths: the model fields, plus any extra
+        # fields stored documents carry
+        self._stage_paths = STAGE_PATHS | field_paths(stages)
+        self._service_paths = SERVICE_PATHS | field_paths(list(services_by_id.values()))
+
+    def _encoded(self, key: Tuple[Any, ...], document: Any, fields: Fieldset, exclude: Fieldset) -> EncodedBody:
+        encoded = self._bodies.get(key)
+        if encoded is None:
+            data = project_document(document, fields, exclude)
+            encoded = EncodedBody({"success": True, "data": data})
+            if len(self._bodies) < self.MAX_BODIES:
+                self._bodies[key] = encoded
+        return encoded
+
+    def stages_list(self, fields: Fieldset = None, exclude: Fieldset = None) -> EncodedBody:
+        fields, exclude = normalize_projection(fields, exclude, self._stage_paths)
+        if not fields and not exclude:
+            return self.stages
+        return self._encoded(('stages', fields, exclude), self._stages_list, fields, exclude)
+
+    def stage(self, stage_id: int, fields: Fieldset = None, exclude: Fieldset = None) -> Optional[EncodedBody]:
+        fields, exclude = normalize_projection(fields, exclude, self._stage_paths)
+        stage = self._stages_by_id.get(stage_id)
+        if stage is None:
+            return None
+        return self._encoded(('stage', stage_id, fields, exclude), stage, fields, exclude)
+
+    def service(self, service_id: str, fields: Fieldset = None, exclude: Fieldset = None) -> Optional[EncodedBody]:
+        fields, exclude = normalize_projection(fields, exclude, self._service_paths)
+        service = self._services_by_id.get(service_id)
+        if service is None:
+            return None
+        return self._encoded(('service', service_id, fields, exclude), service, fields, exclude)
+
+
+class CatalogCache:
+    """Versioned copy of the stages collection with a service_id index.
+
+    The catalog only changes through the admin stage/service routes, so reads
+    are served from memory and every admin write calls ``invalidate()``.
+    ``CATALOG_CACHE_TTL`` (seconds, 0 disables) bounds staleness for writes made
+    by other processes such as migration scripts or additional workers.
+    Returned documents are shared between requests and must not be mutated.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.ttl = float(os.environ.get('CATALOG_CACHE_TTL', '300'))
+        self._lock = asyncio.Lock()
+        self._loaded_version = -1
+        self._loaded_at = 0.0
+        self._stages: List[Dict[str, Any]] = []
+        self._stages_by_id: Dict[int, Dict[str, Any]] = {}
+        self._services_by_id: Dict[str, Dict[str, Any]] = {}
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self.search_index = CatalogSearchIndex()
+
+    def _is_fresh(self) -> bool:
+        if self._loaded_version != self.version:
+            return False
+        if self.ttl > 0 and time.monotonic() - self._loaded_at > self.ttl:
+            return False
+        return True
+
+    async def _ensure_loaded(self):
+        """Load the catalog from MongoDB if the cached copy is missing or stale"""
+        if self._is_fresh():
+            return
+
+        async with self._lock:
+            if self._is_fresh():
+                return
+
+            # Retry if an admin write invalidated the catalog while we were reading
+            while True:
+                version = self.version
+                stages = await database.get_all_stages()
+                if version == self.version:
+                    break
+
+            stages_by_id = {}
+            services_by_id = {}
+            for stage in stages:
+                stages_by_id[stage['id']] = stage
+                for service in stage.get('services') or []:
+                    services_by_id.setdefault(service.get('service_id'), service)
+
+            self._stages = stages
+            self._stages_by_id = stages_by_id
+            self._services_by_id = services_by_id
+            self._snapshot = CatalogSnapshot(version, stages, stages_by_id, services_by_id)
+            reindexed, removed = self.search_index.sync(stages)
+            self._loaded_version = version
+            self._loaded_at = time.monotonic()
+            logger.info(
+                f"Catalog cache loaded: version {version}, {len(stages)} stages, {len(services_by_id)} services "
+                f"({reindexed} search documents re-indexed, {removed} removed)"
+            )
+
+    def invalidate(self):
+        """Drop the cached catalog; the next read reloads it"""
+        self.version += 1
+        logger.info(f"Catalog cache invalidated: version {self.version}")
+
+    async def get_all_stages(self) -> List[Dict[str, Any]]:
+        """Get all stages with their services"""
+        await self._ensure_loaded()
+        return self._stages
+
+    async def get_snapshot(self) -> CatalogSnapshot:
+        """Get the pre-encoded response bodies for the current catalog"""
+        await self._ensure_loaded()
+        return self._snapshot
+
+    async def get_stage_by_id(self, stage_id: int) -> Optional[Dict[str, Any]]:
+        """Get a specific stage by ID"""
+        await self._ensure_loaded()
+        return self._stages_by_id.get(stage_id)
+
+    async def get_service_by_service_id(self, service_id: str) -> Optional[Dict[str, Any]]:
+        """Get a service by service_id across all stages"""
+        await self._ensure_loaded()
+        return self._services_by_id.get(service_id)
+
+    async def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Full-text search over stage titles and service content"""
+        await self._ensure_loaded()
+        return self.search_index.search(query, limit)
+
+
+# Singleton instance
+catalog_cache = CatalogCache()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Whole-catalog import/export: diff a catalog document against the stored
+stages and services and apply only the differences, one bulk_write per
+collection.
+
+The document has the same shape as the /api/stages data (and as the export):
+    {"stages": [{"id": 1, "title": ..., "services": [{"service_id": ..., ...}]}]}
+
+Run:
+    python catalog_import.py export catalog.json
+    python catalog_import.py import catalog.json [--dry-run] [--no-prune]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+from pydantic import BaseModel
+from pymongo import DeleteMany, DeleteOne, InsertOne, UpdateOne
+
+# Add parent directory to path so we can import database
+sys.path.insert(0, str(Path(__file__).parent))
+
+from database import database
+from models import Service, StageCreate
+
+logger = logging.getLogger(__name__)
+
+# Bookkeeping fields that never count as a content change
+_IGNORED_FIELDS = {"_id", "created_at", "updated_at", "stage_id", "position", "services"}
+
+
+class CatalogDocument(BaseModel):
+    stages: List[StageCreate] = []
+
+
+def _changed_fields(incoming: Dict[str, Any], stored: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        key: value for key, value in incoming.items()
+        if key not in _IGNORED_FIELDS and stored.get(key) != value
+    }
+
+
+async def export_catalog() -> Dict[str, Any]:
+    """Export all stages with their nested services"""
+    return {"stages": await database.get_all_stages()}
+
+
+async def plan_catalog_import(document: CatalogDocument, prune: bool = True) -> Dict[str, Any]:
+    """Diff a catalog document against MongoDB.
+
+    Returns the bulk operations for each collection plus a human-readable
+    report. Only fields present in the document are compared, so an export
+    re-imported unchanged produces no operations.
+    """
+    if database.db is None:
+        await database.connect()
+
+    stage_ids = [stage.id for stage in document.stages]
+    if len(stage_ids) != len(set(stage_ids)):
+        raise ValueError("Duplicate stage id in catalog document")
+    incoming_service_ids = [
+        service.service_id
+        for stage in document.stages for service in stage.services if service.service_id
+    ]
+    if len(incoming_service_ids) != len(set(incoming_service_ids)):
+        raise ValueError("Duplicate service_id in catalog document")
+
+    stored_stages = {
+        stage["id"]: stage
+        async for stage in database.db.stages.find({}, {"_id": 0, "services": 0})
+    }
+    stored_services = {
+        service["service_id"]: service
+        async for service in database.db.services.find({}, {"_id": 0})
+    }
+
+    now = datetime.utcnow().isoformat()
+    stage_ops: List[Any] = []
+    service_ops: List[Any] = []
+    report: Dict[str, Any] = {
+        "stages": {"insert": [], "update": [], "delete": [], "unchanged": 0},
+        "services": {"insert": [], "update": [], "delete": [], "unchanged": 0},
+    }
+
+    seen_service_ids = set()
+    for stage in document.stages:
+        stage_fields = stage.dict(exclude_unset=True, exclude={"services"})
+        stored_stage = stored_stages.get(stage.id)
+        if stored_stage is None:
+            stage_ops.append(InsertOne({**stage_fields, "created_at": now, "updated_at": now}))
+            report["stages"]["insert"].append(stage.id)
+        else:
+            changes = _changed_fields(stage_fields, stored_stage)
+            if changes:
+                stage_ops.append(UpdateOne({"id": stage.id}, {"$set": {**changes, "updated_at": now}}))
+                report["stages"]["update"].append({"id": stage.id, "fields": sorted(changes)})
+            else:
+                report["stages"]["unchanged"] += 1
+
+        for position, service in enumerate(stage.services):
+            stored_service = stored_services.get(service.service_id) if service.service_id else None
+            if stored_service is None:
+                service_data = database._sanitize_service(
+                    database._serialize_datetime(Service(**service.dict(exclude_none=True)).dict())
+                )
+                service_data.update({"stage_id": stage.id, "position": position, "created_at": now, "updated_at": now})
+                service_ops.append(InsertOne(service_data))
+                seen_service_ids.add(service_data["service_id"])
+                report["services"]["insert"].append(service_data["service_id"])
+                continue
+
+            seen_service_ids.add(service.service_id)
+            service_fields = database._sanitize_service_update(service.dict(exclude_unset=True))
+            changes = _changed_fields(service_fields, stored_service)
+            if stored_service.get("stage_id") != stage.id:
+                changes["stage_id"] = stage.id
+            if stored_service.get("position") != position:
+                changes["position"] = position
+            if changes:
+                service_ops.append(UpdateOne({"service_id": service.service_id}, {"$set": {**changes, "updated_at": now}}))
+                report["services"]["update"].append({"service_id": service.service_id, "fields": sorted(changes)})
+            else:
+                report["services"]["unchanged"] += 1
+
+    if prune:
+        removed_stage_ids = [stage_id for stage_id in stored_stages if stage_id not in set(stage_ids)]
+        for stage_id in removed_stage_ids:
+            stage_ops.append(DeleteOne({"id": stage_id}))
+        report["stages"]["delete"] = removed_stage_ids
+
+        removed_service_ids = [service_id for service_id in stored_services if service_id not in seen_service_ids]
+        if removed_service_ids:
+            service_ops.append(DeleteMany({"service_id": {"$in": removed_service_ids}}))
+        report["services"]["delete"] = removed_service_ids
+
+    return {"stage_ops": stage_ops, "service_ops": service_ops, "report": report}
+
+
+async def import_catalog(document: CatalogDocument, dry_run: bool = False, prune: bool = True) -> Dict[str, Any]:
+    """Apply a catalog document; returns the diff report with an `applied` flag"""
+    plan = await plan_catalog_import(document, prune=prune)
+    report = plan["report"]
+    report["dry_run"] = dry_run
+    report["applied"] = False
+
+    if dry_run or not (plan["stage_ops"] or plan["service_ops"]):
+        return report
+
+    # Stages first so new services never point at a missing stage
+    if plan["stage_ops"]:
+        await database.db.stages.bulk_write(plan["stage_ops"], ordered=False)
+    if plan["service_ops"]:
+        await database.db.services.bulk_write(plan["service_ops"], ordered=False)
+
+    report["applied"] = True
+    return report
+
+
+async def _main(args) -> int:
+    await database.connect()
+    try:
+        if args.command == "export":
+            catalog = await export_catalog()
+            Path(args.path).write_text(json.dumps(catalog, indent=2, default=str))
+            print(f"Exported {len(catalog['stages'])} stages to {args.path}")
+            return 0
+
+        document = CatalogDocument(**json.loads(Path(args.path).read_text()))
+        report = await import_catalog(document, dry_run=args.dry_run, prune=not args.no_prune)
+        print(json.dumps(report, indent=2))
+        return 0
+    finally:
+        await database.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    parser = argparse.ArgumentParser(description="Import or export the whole service catalog")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Write the stored catalog to a JSON file")
+    export_parser.add_argument("path")
+
+    import_parser = subparsers.add_parser("import", help="Apply a catalog JSON file")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--dry-run", action="store_true", help="Report the diff without writing")
+    import_parser.add_argument("--no-prune", action="store_true",
+                               help="Keep stored stages and services that are missing from the file")
+
+    sys.exit(asyncio.run(_main(parser.parse_args())))
@@ -0,0 +1,213 @@
+"""
+In-memory full-text search over the service catalog
+"""
+import bisect
+import hashlib
+import json
+import math
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from how in into is it of on or our the to we with you your".split()
+)
+
+# Relative weight of each field when counting term frequency
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "title": 3.0,
+    "stage": 2.0,
+    "subtitle": 1.5,
+    "description": 1.5,
+    "features": 1.0,
+    "details": 1.0,
+    "content_sections": 1.0,
+}
+
+# Terms that only match a query token as a prefix score less than exact matches
+PREFIX_MATCH_WEIGHT = 0.7
+MAX_PREFIX_EXPANSIONS = 50
+
+
+def _stem(token: str) -> str:
+    """Very light plural folding so 'services' and 'service' share a term"""
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, strip HTML tags, split on non-word characters and drop stopwords"""
+    if not text:
+        return []
+    text = _TAG_RE.sub(' ', text).lower()
+    return [_stem(token) for token in _TOKEN_RE.findall(text) if token not in STOPWORDS]
+
+
+def _text_of(value: Any) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict):
+        return ' '.join(_text_of(v) for k, v in value.items() if k in ('heading', 'content'))
+    if isinstance(value, (list, tuple)):
+        return ' '.join(_text_of(item) for item in value)
+    return str(value)
+
+
+class CatalogSearchIndex:
+    """Inverted index over stages and services ranked with BM25.
+
+    ``sync()`` is called with the full catalog whenever the catalog cache
+    reloads; only documents whose searchable text changed are re-indexed.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._doc_terms: Dict[str, Dict[str, float]] = {}
+        self._doc_lengths: Dict[str, float] = {}
+        self._fingerprints: Dict[str, str] = {}
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._total_length = 0.0
+        self._sorted_terms: Optional[List[str]] = None
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    # ----- indexing -----
+
+    @staticmethod
+    def _documents(stages: Iterable[Dict[str, Any]]):
+        """Yield (key, fields, result) for every stage and service in the catalog"""
+        for stage in stages:
+            yield (
+                f"stage:{stage.get('id')}",
+                {"title": stage.get('title'), "subtitle": stage.get('subtitle')},
+                {
+                    "type": "stage",
+                    "id": stage.get('id'),
+                    "title": stage.get('title'),
+                    "subtitle": stage.get('subtitle'),
+                },
+            )
+            for service in stage.get('services') or []:
+                yield (
+                    f"service:{service.get('service_id')}",
+                    {
+                        "name": service.get('name'),
+                        "stage": stage.get('title'),
+                        "description": service.get('description'),
+                        "details": service.get('details'),
+                        "features": service.get('features'),
+                        "content_sections": service.get('content_sections'),
+                    },
+                    {
+                        "type": "service",
+                        "service_id": service.get('service_id'),
+                        "name": service.get('name'),
+                        "description": service.get('description'),
+                        "icon": service.get('icon'),
+                        "stage_id": stage.get('id'),
+                        "stage_title": stage.get('title'),
+                    },
+                )
+
+    def _add(self, key: str, fields: Dict[str, Any]):
+        terms: Dict[str, float] = {}
+        for field, value in fields.items():
+            weight = FIELD_WEIGHTS.get(field, 1.0)
+            for token in tokenize(_text_of(value)):
+                terms[token] = terms.get(token, 0.0) + weight
+        for term, tf in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._sorted_terms = None
+            postings[key] = tf
+        length = sum(terms.values())
+        self._doc_terms[key] = terms
+        self._doc_lengths[key] = length
+        self._total_length += length
+
+    def _remove(self, key: str):
+        for term in self._doc_terms.pop(key, {}):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(key, None)
+            if not postings:
+                del self._postings[term]
+                self._sorted_terms = None
+        self._total_length -= self._doc_lengths.pop(key, 0.0)
+        self._fingerprints.pop(key, None)
+        self._results.pop(key, None)
+
+    def sync(self, stages: List[Dict[str, Any]]) -> Tuple[int, int]:
+        """Bring the index in line with the catalog; returns (documents re-indexed, documents removed)"""
+        seen = set()
+        changed = 0
+        for key, fields, result in self._documents(stages):
+            seen.add(key)
+            fingerprint = hashlib.sha1(
+                json.dumps(fields, sort_keys=True, default=str).encode('utf-8')
+            ).hexdigest()
+            self._results[key] = result
+            if self._fingerprints.get(key) == fingerprint:
+                continue
+            if key in self._doc_terms:
+                self._remove(key)
+                self._results[key] = result
+            self._add(key, fields)
+            self._fingerprints[key] = fingerprint
+            changed += 1
+
+        stale = [key for key in self._doc_terms if key not in seen]
+        for key in stale:
+            self._remove(key)
+        return changed, len(stale)
+
+    # ----- querying -----
+
+    def _expand(self, token: str) -> Dict[str, float]:
+        """Map a query token to index terms: the exact term plus terms it prefixes"""
+        matches: Dict[str, float] = {}
+        if token in self._postings:
+            matches[token] = 1.0
+        if len(token) < 2:
+            return matches
+
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self._postings)
+        terms = self._sorted_terms
+        start = bisect.bisect_left(terms, token)
+        for term in terms[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not term.startswith(token):
+                break
+            matches.setdefault(term, PREFIX_MATCH_WEIGHT)
+        return matches
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Return the best matching stages and services, highest score first"""
+        doc_count = len(self._doc_terms)
+        if not doc_count:
+            return []
+        avg_length = self._total_length / doc_count or 1.0
+
+        scores: Dict[str, float] = {}
+        for token in dict.fromkeys(tokenize(query)):
+            for term, match_weight in self._expand(token).items():
+                postings = self._postings[term]
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for key, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[key] / avg_length)
+                    score = match_weight * idf * tf * (self.k1 + 1) / (tf + norm)
+                    scores[key] = scores.get(key, 0.0) + score
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [{**self._results[key], "score": round(score, 4)} for key, score in ranked]
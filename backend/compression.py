@@ -0,0 +1,272 @@
+"""
+Response compression (gzip / brotli) as pure ASGI middleware
+"""
+import gzip
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from http_cache import accepted_encodings
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Bodies smaller than this go out as-is: the framing overhead outweighs the saving
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+# 1 (fast) .. 9 (small) for gzip, 0 .. 11 for brotli
+COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', '6'))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', '5'))
+# Compressed bodies of responses that carry an ETag are kept and reused
+COMPRESSION_CACHE_MAX_BYTES = int(os.environ.get('COMPRESSION_CACHE_MAX_BYTES', str(16 * 1024 * 1024)))
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/xml",
+    "application/javascript",
+    "text/",
+)
+
+
+class CompressedBodyCache:
+    """LRU of compressed bodies keyed by (ETag, content-coding), bounded by total size"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, str]) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key: Tuple[str, str], body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._entries[key] = body
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL)
+
+
+class _StreamCompressor:
+    """Incremental compressor for responses sent in several body messages"""
+
+    def __init__(self, encoding: str):
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+            self._flush = self._compressor.flush
+            self._finish = self._compressor.finish
+            self._write = self._compressor.process
+        else:
+            # wbits=31 writes a gzip header and trailer around the deflate stream
+            self._compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+            self._flush = lambda: self._compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._compressor.flush
+            self._write = self._compressor.compress
+
+    def write(self, chunk: bytes) -> bytes:
+        # Flush each chunk so streamed responses reach the client without delay
+        return self._write(chunk) + self._flush()
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[str]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value.decode('latin-1')
+    return None
+
+
+def _is_compressible(headers: List[Tuple[bytes, bytes]]) -> bool:
+    if _header(headers, b'content-encoding'):
+        return False
+    if 'no-transform' in (_header(headers, b'cache-control') or '').lower():
+        return False
+    content_type = (_header(headers, b'content-type') or '').lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def _vary_headers(headers: List[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+    """Make sure the response varies on Accept-Encoding, whatever we decide"""
+    vary = _header(headers, b'vary')
+    if vary is None:
+        return headers + [(b'vary', b'Accept-Encoding')]
+    if 'accept-encoding' in vary.lower() or vary.strip() == '*':
+        return headers
+    return [
+        (key, (value.decode('latin-1') + ', Accept-Encoding').encode('latin-1') if key.lower() == b'vary' else value)
+        for key, value in headers
+    ]
+
+
+def _encoded_headers(headers: List[Tuple[bytes, bytes]], encoding: str,
+                     content_length: Optional[int]) -> List[Tuple[bytes, bytes]]:
+    encoded = []
+    for key, value in headers:
+        name = key.lower()
+        if name == b'content-length':
+            continue
+        if name == b'etag':
+            # Same convention as http_cache: one strong ETag per content-coding
+            etag = value.decode('latin-1')
+            if etag.endswith('"'):
+                value = (etag[:-1] + '-' + encoding + '"').encode('latin-1')
+        encoded.append((key, value))
+    encoded.append((b'content-encoding', encoding.encode('latin-1')))
+    if content_length is not None:
+        encoded.append((b'content-length', str(content_length).encode('latin-1')))
+    return encoded
+
+
+class CompressionMiddleware:
+    """Compress JSON/XML/text responses for clients that accept brotli or gzip.
+
+    Responses that already have a Content-Encoding (the precompressed catalog
+    bodies) are passed through. Compressed bodies of responses with an ETag are
+    cached, so repeat requests for an unchanged resource skip the compressor.
+    """
+
+    def __init__(self, app, minimum_size: int = None, cache: CompressedBodyCache = None):
+        self.app = app
+        self.minimum_size = COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+        self.cache = cache or CompressedBodyCache(COMPRESSION_CACHE_MAX_BYTES)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = self._negotiate(scope)
+        if encoding is None:
+            async def send_identity(message):
+                # Shared caches must not hand this copy to clients that accept compression
+                if message["type"] == "http.response.start" and _is_compressible(message.get("headers") or []):
+                    message = {**message, "headers": _vary_headers(list(message.get("headers") or []))}
+                await send(message)
+
+            await self.app(scope, receive, send_identity)
+            return
+
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+    @staticmethod
+    def _negotiate(scope) -> Optional[str]:
+        accept_encoding = ''
+        for key, value in scope.get("headers") or []:
+            if key == b'accept-encoding':
+                accept_encoding = value.decode('latin-1')
+                break
+        accepted = accepted_encodings(accept_encoding)
+        if brotli is not None and 'br' in accepted:
+            return 'br'
+        if 'gzip' in accepted:
+            return 'gzip'
+        return None
+
+
+class _CompressionResponder:
+    """Per-request send() wrapper; holds the start message until the body size is known"""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self._start: Optional[Dict] = None
+        self._buffer: List[bytes] = []
+        self._buffered = 0
+        self._compressor: Optional[_StreamCompressor] = None
+        self._passthrough = False
+
+    async def send(self, message):
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            self._start = message
+            return
+        if message_type != "http.response.body" or self._passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self._compressor is not None:
+            chunk = self._compressor.write(body) if body else b""
+            if not more_body:
+                chunk += self._compressor.finish()
+            await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+            return
+
+        start = self._start
+        headers = list(start.get("headers") or [])
+        if start["status"] in (204, 206, 304) or not _is_compressible(headers):
+            self._passthrough = True
+            await self._send({**start, "headers": _vary_headers(headers)})
+            await self._send(message)
+            return
+
+        # Collect leading chunks until we know the body is worth compressing
+        if body:
+            self._buffer.append(body)
+            self._buffered += len(body)
+        if more_body and self._buffered < self.middleware.minimum_size:
+            return
+        body = b"".join(self._buffer)
+        self._buffer = []
+        headers = _vary_headers(headers)
+
+        if not more_body and len(body) < self.middleware.minimum_size:
+            self._passthrough = True
+            await self._send({**start, "headers": headers})
+            await self._send({"type": "http.response.body", "body": body})
+            return
+
+        if more_body:
+            # Streamed response: compress chunk by chunk, length is unknown up front
+            self._compressor = _StreamCompressor(self.encoding)
+            await self._send({**start, "headers": _encoded_headers(headers, self.encoding, None)})
+            await self._send({"type": "http.response.body", "body": self._compressor.write(body), "more_body": True})
+            return
+
+        compressed = self._compress_whole(body, _header(headers, b'etag'))
+        await self._send({**start, "headers": _encoded_headers(headers, self.encoding, len(compressed))})
+        await self._send({"type": "http.response.body", "body": compressed})
+
+    def _compress_whole(self, body: bytes, etag: Optional[str]) -> bytes:
+        cache = self.middleware.cache
+        # Only strong ETags identify the exact bytes
+        key = (etag, self.encoding) if etag and not etag.startswith('W/') else None
+        if key is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+        compressed = _compress(body, self.encoding)
+        if key is not None:
+            cache.put(key, compressed)
+        return compressed
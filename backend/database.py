@@ -1,10 +1,16 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 import os
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union
 from datetime import datetime
 import logging
 import uuid
 
+from bson_json import RAW_CODEC_OPTIONS, raw_json_array, raw_to_json
+from indexes import ensure_indexes
+from pagination import KEYSET_SORT, after_cursor_query, created_at_range_query, encode_page_cursor
+
 logger = logging.getLogger(__name__)
 
 
@@ -36,6 +42,13 @@ class Database:
             self.client.close()
             logger.info("MongoDB connection closed")
     
+    def _collection(self, name: str, raw: bool = False):
+        """Collection handle; raw=True reads RawBSONDocument instead of dicts"""
+        collection = self.db[name]
+        if raw:
+            return collection.with_options(codec_options=RAW_CODEC_OPTIONS)
+        return collection
+    
     # Helper method to serialize datetime
     def _serialize_datetime(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Convert datetime objects to ISO format strings"""
@@ -47,26 +60,121 @@ class Database:
             return data.isoformat()
         return data
     
+    # Services are normalised when written so catalog reads can return stored
+    # documents untouched; fix_services_migration.py repairs older documents.
+    DEFAULT_RELEVANT_FOR = ['startup', 'msme']
+    
+    def _normalize_relevant_for(self, relevant_for: Any) -> List[str]:
+        """Coerce relevant_for into a non-empty list"""
+        if isinstance(relevant_for, str):
+            relevant_for = [relevant_for]
+        if not isinstance(relevant_for, list) or len(relevant_for) == 0:
+            return list(self.DEFAULT_RELEVANT_FOR)
+        return relevant_for
+    
     def _sanitize_service(self, service: Dict[str, Any]) -> Dict[str, Any]:
-        """Ensure service has required fields with valid data"""
-        # Generate id if missing
-        if not service.get('id'):
-            service['id'] = service.get('service_id', str(uuid.uuid4()))
+        """Ensure a service document has required fields with valid data before it is stored"""
         # Ensure service_id exists
         if not service.get('service_id'):
             service['service_id'] = str(uuid.uuid4())
+        # Generate a unique id for the service (used as React key)
+        if not service.get('id'):
+            service['id'] = f"{service['service_id']}-{str(uuid.uuid4())[:8]}"
         # Ensure relevant_for is a valid list with default if empty
-        if not isinstance(service.get('relevant_for'), list) or len(service.get('relevant_for', [])) == 0:
-            service['relevant_for'] = ['startup', 'msme']
+        service['relevant_for'] = self._normalize_relevant_for(service.get('relevant_for'))
         return service
     
-    def _sanitize_stage(self, stage: Dict[str, Any]) -> Dict[str, Any]:
-        """Ensure all services in stage have required fields"""
-        if 'services' in stage and isinstance(stage['services'], list):
-            stage['services'] = [self._sanitize_service(s) for s in stage['services']]
-        return stage
+    def _sanitize_service_update(self, update_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply the same rules as _sanitize_service to the fields of a partial update"""
+        if 'relevant_for' in update_data:
+            update_data['relevant_for'] = self._normalize_relevant_for(update_data['relevant_for'])
+        return update_data
     
     # ===== STAGE OPERATIONS =====
+    #
+    # Services live in their own `services` collection, one document per
+    # service with its parent `stage_id` and a `position` within the stage.
+    # Stage reads join them back so callers still see the nested shape.
+    
+    # Fields that only exist on the flattened service documents
+    _SERVICE_PROJECTION = {"_id": 0, "stage_id": 0, "position": 0}
+    
+    def _embedded_services(self, stage: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Services still embedded in a stage document that migrate_services_collection.py
+        has not flattened yet; returned as stored so their ids stay stable between reads"""
+        return [
+            {**service, 'relevant_for': self._normalize_relevant_for(service.get('relevant_for'))}
+            for service in stage.pop('services', None) or []
+        ]
+    
+    async def count_unmigrated_stages(self) -> int:
+        """Stages that still embed their services (run migrate_services_collection.py)"""
+        if self.db is None:
+            await self.connect()
+        return await self.db.stages.count_documents({"services.0": {"$exists": True}})
+    
+    async def ensure_indexes(self, collections: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Create the registered indexes (see indexes.INDEXES) this database lacks"""
+        if self.db is None:
+            await self.connect()
+        return await ensure_indexes(self.db, collections)
+    
+    async def ensure_catalog_indexes(self):
+        """Create the indexes backing the flattened services collection; raises
+        if one cannot be built (duplicate service_ids from the embedded layout)"""
+        result = await self.ensure_indexes(["stages", "services"])
+        if result["failed"]:
+            raise RuntimeError(f"Cannot create catalog indexes: {result['failed']}")
+    
+    # Filtered admin lists are counted up to this many documents; beyond it
+    # the total is reported as at least this number
+    PAGE_COUNT_LIMIT = 10000
+    
+    async def _keyset_page(self, name: str, query: Dict[str, Any], cursor: Optional[str],
+                           skip: int, limit: int, raw: bool) -> Dict[str, Any]:
+        """One page of a collection under KEYSET_SORT.
+
+        Returns the items (a JSON array when raw), the cursor of the next page
+        (None on the last page) and an estimated total for the filter.
+        """
+        if self.db is None:
+            await self.connect()
+        
+        page_query = query
+        if cursor:
+            after = after_cursor_query(cursor)
+            page_query = {"$and": [query, after]} if query else after
+        
+        find = self._collection(name, raw).find(page_query, {"_id": 0}).sort(KEYSET_SORT)
+        if skip and not cursor:
+            # Offset paging is still accepted, but costs O(skip) on the server
+            find = find.skip(skip)
+        documents = await find.limit(limit + 1).to_list(length=None)
+        
+        next_cursor = None
+        if len(documents) > limit:
+            documents = documents[:limit]
+            last = documents[-1]
+            next_cursor = encode_page_cursor(last.get('created_at'), last.get('id'))
+        
+        collection = self.db[name]
+        if query:
+            estimated_total = await collection.count_documents(query, limit=self.PAGE_COUNT_LIMIT)
+        else:
+            estimated_total = await collection.estimated_document_count()
+        
+        if raw:
+            items = b'[' + b','.join(raw_to_json(document) for document in documents) + b']'
+        else:
+            items = documents
+        return {"items": items, "next_cursor": next_cursor, "estimated_total": estimated_total}
+    
+    @staticmethod
+    def _admin_list_query(status: Optional[str], date_from: Optional[str], date_to: Optional[str]) -> Dict[str, Any]:
+        query = created_at_range_query(date_from, date_to)
+        if status:
+            query["status"] = status
+        return query
     
     async def get_all_stages(self) -> List[Dict[str, Any]]:
         """Get all stages with their services"""
@@ -76,8 +184,13 @@ class Database:
         cursor = self.db.stages.find({}, {"_id": 0}).sort("id", 1)
         stages = await cursor.to_list(length=None)
         
-        # Sanitize all stages to ensure services have required fields
-        stages = [self._sanitize_stage(stage) for stage in stages]
+        services_by_stage: Dict[int, List[Dict[str, Any]]] = {}
+        cursor = self.db.services.find({}, {"_id": 0, "position": 0}).sort([("stage_id", 1), ("position", 1)])
+        async for service in cursor:
+            services_by_stage.setdefault(service.pop("stage_id"), []).append(service)
+        
+        for stage in stages:
+            stage['services'] = services_by_stage.get(stage['id']) or self._embedded_services(stage)
         
         return stages
     
@@ -88,9 +201,9 @@ class Database:
         
         stage = await self.db.stages.find_one({"id": stage_id}, {"_id": 0})
         
-        # Sanitize stage to ensure services have required fields
         if stage:
-            stage = self._sanitize_stage(stage)
+            cursor = self.db.services.find({"stage_id": stage_id}, self._SERVICE_PROJECTION).sort("position", 1)
+            stage['services'] = await cursor.to_list(length=None) or self._embedded_services(stage)
         
         return stage
     
@@ -102,7 +215,29 @@ class Database:
         # Convert datetime objects to ISO strings for MongoDB
         stage_data = self._serialize_datetime(stage_data)
         
-        await self.db.stages.insert_one(stage_data)
+        services = [self._sanitize_service(service) for service in stage_data.get('services') or []]
+        stage_data['services'] = services
+        
+        # Refuse duplicate service_ids up front rather than leave a stage with some of its services
+        service_ids = [service['service_id'] for service in services]
+        if len(set(service_ids)) != len(service_ids) or (
+                service_ids and await self.db.services.count_documents({"service_id": {"$in": service_ids}}, limit=1)):
+            raise DuplicateKeyError("A service with this service_id already exists", 11000)
+        
+        stage_doc = {k: v for k, v in stage_data.items() if k != 'services'}
+        await self.db.stages.insert_one(stage_doc)
+        
+        if services:
+            try:
+                await self.db.services.insert_many([
+                    {**service, "stage_id": stage_data['id'], "position": position}
+                    for position, service in enumerate(services)
+                ])
+            except Exception:
+                # A concurrent write took a service_id after the check; undo the stage
+                await self.db.services.delete_many({"stage_id": stage_data['id'], "service_id": {"$in": service_ids}})
+                await self.db.stages.delete_one({"id": stage_data['id']})
+                raise
         return stage_data
     
     async def update_stage(self, stage_id: int, update_data: Dict[str, Any]) -> bool:
@@ -119,11 +254,13 @@ class Database:
         return result.modified_count > 0
     
     async def delete_stage(self, stage_id: int) -> bool:
-        """Delete a stage"""
+        """Delete a stage and its services"""
         if self.db is None:
             await self.connect()
         
         result = await self.db.stages.delete_one({"id": stage_id})
+        if result.deleted_count > 0:
+            await self.db.services.delete_many({"stage_id": stage_id})
         return result.deleted_count > 0
     
     # ===== SERVICE OPERATIONS =====
@@ -133,45 +270,38 @@ class Database:
         if self.db is None:
             await self.connect()
         
-        stage = await self.db.stages.find_one(
-            {"services.service_id": service_id},
-            {"_id": 0, "services.$": 1}
-        )
-        
-        if stage and "services" in stage and len(stage["services"]) > 0:
-            service = stage["services"][0]
-            # Sanitize to ensure required fields
-            return self._sanitize_service(service)
-        return None
+        return await self.db.services.find_one({"service_id": service_id}, self._SERVICE_PROJECTION)
     
-    async def add_service_to_stage(self, stage_id: int, service_data: Dict[str, Any]) -> bool:
-        """Add a service to a stage"""
+    async def add_service_to_stage(self, stage_id: int, service_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Add a service to the end of a stage; returns the stored service or None if the stage is missing"""
         if self.db is None:
             await self.connect()
         
-        service_data = self._serialize_datetime(service_data)
+        if not await self.db.stages.count_documents({"id": stage_id}, limit=1):
+            return None
         
-        result = await self.db.stages.update_one(
-            {"id": stage_id},
-            {"$push": {"services": service_data}}
+        service_data = self._sanitize_service(self._serialize_datetime(service_data))
+        
+        last = await self.db.services.find_one(
+            {"stage_id": stage_id},
+            {"position": 1},
+            sort=[("position", -1)]
         )
-        return result.modified_count > 0
+        position = last["position"] + 1 if last else 0
+        
+        await self.db.services.insert_one({**service_data, "stage_id": stage_id, "position": position})
+        return service_data
     
     async def update_service_in_stage(self, stage_id: int, service_id: str, update_data: Dict[str, Any]) -> bool:
         """Update a service within a stage"""
         if self.db is None:
             await self.connect()
         
-        update_data = self._serialize_datetime(update_data)
-        
-        # Create update query for nested service
-        update_query = {}
-        for key, value in update_data.items():
-            update_query[f"services.$.{key}"] = value
+        update_data = self._sanitize_service_update(self._serialize_datetime(update_data))
         
-        result = await self.db.stages.update_one(
-            {"id": stage_id, "services.service_id": service_id},
-            {"$set": update_query}
+        result = await self.db.services.update_one(
+            {"stage_id": stage_id, "service_id": service_id},
+            {"$set": update_data}
         )
         return result.modified_count > 0
     
@@ -180,11 +310,8 @@ class Database:
         if self.db is None:
             await self.connect()
         
-        result = await self.db.stages.update_one(
-            {"id": stage_id},
-            {"$pull": {"services": {"service_id": service_id}}}
-        )
-        return result.modified_count > 0
+        result = await self.db.services.delete_one({"stage_id": stage_id, "service_id": service_id})
+        return result.deleted_count > 0
     
     # ===== CONTACT INQUIRY OPERATIONS =====
     
@@ -207,6 +334,13 @@ class Database:
         inquiries = await cursor.to_list(length=None)
         return inquiries
     
+    async def get_inquiries_page(self, status: Optional[str] = None, date_from: Optional[str] = None,
+                                 date_to: Optional[str] = None, cursor: Optional[str] = None,
+                                 skip: int = 0, limit: int = 100, raw: bool = False) -> Dict[str, Any]:
+        """Newest-first page of contact inquiries; raises ValueError for a bad cursor or date"""
+        query = self._admin_list_query(status, date_from, date_to)
+        return await self._keyset_page('contact_inquiries', query, cursor, skip, limit, raw)
+    
     async def update_inquiry_status(self, inquiry_id: str, status: str) -> bool:
         """Update inquiry status"""
         if self.db is None:
@@ -220,8 +354,8 @@ class Database:
     
     # ===== TIME SLOT OPERATIONS =====
     
-    async def get_available_timeslots(self, date: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Get available time slots"""
+    async def get_available_timeslots(self, date: Optional[str] = None, stream: bool = False):
+        """Get available time slots (stream=True returns the open cursor)"""
         if self.db is None:
             await self.connect()
         
@@ -230,6 +364,8 @@ class Database:
             query["date"] = date
         
         cursor = self.db.timeslots.find(query, {"_id": 0}).sort([("date", 1), ("time", 1)])
+        if stream:
+            return cursor
         timeslots = await cursor.to_list(length=None)
         return timeslots
     
@@ -251,6 +387,33 @@ class Database:
         await self.db.timeslots.insert_one(timeslot_data)
         return timeslot_data
     
+    async def claim_timeslot(self, timeslot_id: str, booking_id: str) -> Optional[Dict[str, Any]]:
+        """Atomically mark an available timeslot as booked by `booking_id`.
+
+        Returns the claimed timeslot, or None if it does not exist or is already
+        taken; of any number of concurrent claims on one slot exactly one wins.
+        """
+        if self.db is None:
+            await self.connect()
+        
+        return await self.db.timeslots.find_one_and_update(
+            {"id": timeslot_id, "is_available": True},
+            {"$set": {"is_available": False, "booking_id": booking_id}},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+    
+    async def release_timeslot(self, timeslot_id: str, booking_id: str) -> bool:
+        """Undo claim_timeslot, only if the slot is still held by `booking_id`"""
+        if self.db is None:
+            await self.connect()
+        
+        result = await self.db.timeslots.update_one(
+            {"id": timeslot_id, "booking_id": booking_id},
+            {"$set": {"is_available": True}, "$unset": {"booking_id": ""}}
+        )
+        return result.modified_count > 0
+    
     async def mark_timeslot_unavailable(self, timeslot_id: str) -> bool:
         """Mark a timeslot as unavailable"""
         if self.db is None:
@@ -295,6 +458,13 @@ class Database:
         await self.db.bookings.insert_one(booking_data)
         return booking_data
     
+    async def get_bookings_page(self, status: Optional[str] = None, date_from: Optional[str] = None,
+                                date_to: Optional[str] = None, cursor: Optional[str] = None,
+                                skip: int = 0, limit: int = 100, raw: bool = False) -> Dict[str, Any]:
+        """Newest-first page of consultation bookings; raises ValueError for a bad cursor or date"""
+        query = self._admin_list_query(status, date_from, date_to)
+        return await self._keyset_page('bookings', query, cursor, skip, limit, raw)
+    
     async def get_all_bookings(self, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
         """Get all consultation bookings"""
         if self.db is None:
@@ -325,12 +495,26 @@ class Database:
         return admin_data
 
     # ===== BLOGS =====
-    async def get_all_blogs(self, published_only: bool = False, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
-        """Get all blogs"""
+    async def get_all_blogs(self, published_only: bool = False, skip: int = 0, limit: int = 100,
+                            raw: bool = False) -> Union[List[Dict[str, Any]], bytes]:
+        """Get all blogs (raw=True returns them as a JSON array)"""
         query = {"published": True} if published_only else {}
        # blogs = await self.db.blogs.find(query).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
        # return blogs
-        return await self.db.blogs.find(query, {"_id": 0}).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
+        cursor = self._collection('blogs', raw).find(query, {"_id": 0}).sort("created_at", -1).skip(skip).limit(limit)
+        if raw:
+            return await raw_json_array(cursor)
+        return await cursor.to_list(limit)
+    
+    async def get_published_blog_sitemap_entries(self) -> List[Dict[str, Any]]:
+        """Get slug and timestamps of published blogs (without their content)"""
+        if self.db is None:
+            await self.connect()
+        cursor = self.db.blogs.find(
+            {"published": True},
+            {"_id": 0, "slug": 1, "updated_at": 1, "created_at": 1}
+        ).sort("created_at", -1)
+        return await cursor.to_list(length=None)
     
     async def get_blog_by_id(self, blog_id: str) -> Optional[Dict[str, Any]]:
         """Get blog by ID"""
@@ -371,12 +555,15 @@ class Database:
         return result.modified_count > 0
 
     # ===== FAQs =====
-    async def get_all_faqs(self, published_only: bool = False) -> List[Dict[str, Any]]:
-        """Get all FAQs"""
+    async def get_all_faqs(self, published_only: bool = False, stream: bool = False):
+        """Get all FAQs (stream=True returns the open cursor)"""
         query = {"published": True} if published_only else {}
        # faqs = await self.db.faqs.find(query).sort("order", 1).to_list(1000)
        # return faqs
-        return await self.db.faqs.find(query, {"_id": 0}).sort("order", 1).to_list(1000)
+        cursor = self.db.faqs.find(query, {"_id": 0}).sort("order", 1)
+        if stream:
+            return cursor
+        return await cursor.to_list(length=None)
     
     async def get_faq_by_id(self, faq_id: str) -> Optional[Dict[str, Any]]:
         """Get FAQ by ID"""
@@ -403,12 +590,15 @@ class Database:
         return result.deleted_count > 0
 
     # ===== TESTIMONIALS =====
-    async def get_all_testimonials(self, published_only: bool = False) -> List[Dict[str, Any]]:
-        """Get all testimonials"""
+    async def get_all_testimonials(self, published_only: bool = False, stream: bool = False):
+        """Get all testimonials (stream=True returns the open cursor)"""
         query = {"published": True} if published_only else {}
        # testimonials = await self.db.testimonials.find(query).sort("created_at", -1).to_list(1000)
        # return testimonials
-        return await self.db.testimonials.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
+        cursor = self.db.testimonials.find(query, {"_id": 0}).sort("created_at", -1)
+        if stream:
+            return cursor
+        return await cursor.to_list(length=None)
      
     async def get_testimonial_by_id(self, testimonial_id: str) -> Optional[Dict[str, Any]]:
         """Get testimonial by ID"""
@@ -435,12 +625,15 @@ class Database:
         return result.deleted_count > 0
 
     # ===== SERVICE PACKAGES =====
-    async def get_all_packages(self, published_only: bool = False) -> List[Dict[str, Any]]:
-        """Get all service packages"""
+    async def get_all_packages(self, published_only: bool = False, stream: bool = False):
+        """Get all service packages (stream=True returns the open cursor)"""
         query = {"published": True} if published_only else {}
         #packages = await self.db.packages.find(query).sort("created_at", -1).to_list(1000)
        # return packages
-        return await self.db.packages.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
+        cursor = self.db.packages.find(query, {"_id": 0}).sort("created_at", -1)
+        if stream:
+            return cursor
+        return await cursor.to_list(length=None)
     
     async def get_package_by_id(self, package_id: str) -> Optional[Dict[str, Any]]:
         """Get package by ID"""
@@ -467,11 +660,14 @@ class Database:
         return result.deleted_count > 0
 
     # ===== EMAIL TEMPLATES =====
-    async def get_all_templates(self) -> List[Dict[str, Any]]:
-        """Get all email templates"""
+    async def get_all_templates(self, stream: bool = False):
+        """Get all email templates (stream=True returns the open cursor)"""
         #templates = await self.db.email_templates.find().sort("template_type", 1).to_list(1000)
        # return templates
-        return await self.db.email_templates.find({}, {"_id": 0}).sort("template_type", 1).to_list(1000)
+        cursor = self.db.email_templates.find({}, {"_id": 0}).sort("template_type", 1)
+        if stream:
+            return cursor
+        return await cursor.to_list(length=None)
     
     async def get_template_by_id(self, template_id: str) -> Optional[Dict[str, Any]]:
         """Get template by ID"""
@@ -543,7 +739,7 @@ class Database:
                 "count": {"$sum": 1}
             }}
         ]
-        event_types = await self.db.analytics.aggregate(pipeline).to_list(1000)
+        event_types = await self.db.analytics.aggregate(pipeline).to_list(length=None)
         
         return {
             "total_events": total_events,
@@ -563,10 +759,14 @@ class Database:
         partner_data['_id'] = str(result.inserted_id)
         return partner_data
 
-    async def get_partners_by_category(self, category: str) -> List[Dict[str, Any]]:
+    async def get_partners_by_category(self, category: str, stream: bool = False):
+        """Partners in a category, newest first (stream=True returns the open cursor)"""
         if self.db is None:
             await self.connect()
-        return await self.db.partners.find({"category": category}, {"_id": 0}).sort("created_at", -1).to_list(1000)
+        cursor = self.db.partners.find({"category": category}, {"_id": 0}).sort("created_at", -1)
+        if stream:
+            return cursor
+        return await cursor.to_list(length=None)
 
     async def get_partner_by_id(self, partner_id: str) -> Optional[Dict[str, Any]]:
         if self.db is None:
@@ -593,7 +793,12 @@ class Database:
         await self.db.clients.insert_one(client_data)
         return client_data
 
-    async def get_clients_by_partner(self, partner_id: str) -> List[Dict[str, Any]]:
+    async def get_clients_by_partner(self, partner_id: str, raw: bool = False, stream: bool = False):
+        """Clients a partner owns, executes or referred.
+
+        raw=True reads RawBSONDocument; stream=True returns the open cursor
+        instead of a list (or, with raw, a JSON array).
+        """
         if self.db is None:
             await self.connect()
         query = {
@@ -603,7 +808,12 @@ class Database:
                 {"referral_partner_id": partner_id}
             ]
         }
-        return await self.db.clients.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
+        cursor = self._collection('clients', raw).find(query, {"_id": 0}).sort("created_at", -1)
+        if stream:
+            return cursor
+        if raw:
+            return await raw_json_array(cursor)
+        return await cursor.to_list(length=None)
 
     async def get_client_by_id(self, client_id: str) -> Optional[Dict[str, Any]]:
         if self.db is None:
@@ -740,6 +950,13 @@ class Database:
         logger.info(f"Update result - matched: {result.matched_count}, modified: {result.modified_count}")
         return result.modified_count > 0
 
+    _REVENUE_PROJECTION = {
+        "_id": 0, "id": 1, "full_name": 1, "closed_cost": 1,
+        "partner_id": 1, "execution_partner_id": 1, "referral_partner_id": 1,
+        "services.service_id": 1, "services.service_name": 1,
+        "services.price": 1, "services.breakdown_percentages": 1,
+    }
+
     async def get_revenue_by_partner(self, partner_id: str) -> Dict[str, Any]:
         if self.db is None:
             await self.connect()
@@ -747,13 +964,14 @@ class Database:
         # Get full client data where partner is execution/referral or owner
         partner = await self.get_partner_by_id(partner_id)
         partner_category = (partner.get("category") or "").lower() if partner else ""
-        clients = await self.db.clients.find({
+        # Walk the clients one batch at a time, fetching only the fields the summary uses
+        clients = self.db.clients.find({
             "$or": [
                 {"partner_id": partner_id},
                 {"execution_partner_id": partner_id},
                 {"referral_partner_id": partner_id}
             ]
-        }).to_list(None)
+        }, self._REVENUE_PROJECTION)
         
         total_revenue = 0
         total_partner_revenue = 0
@@ -761,7 +979,7 @@ class Database:
         total_execution_revenue = 0
         by_client = []
         
-        for client in clients:
+        async for client in clients:
             client_total = 0
             client_referral = 0
             client_execution = 0
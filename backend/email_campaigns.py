@@ -0,0 +1,413 @@
+"""
+Bulk email campaigns: stream recipients from a collection, render a stored
+template for each one and send in batches over a dedicated transport.
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from database import database
+from email_service import email_service
+from email_templates import CompiledTemplate, TemplateError
+from pagination import KEYSET_SORT, created_at_range_query
+
+logger = logging.getLogger(__name__)
+
+EMAIL_CAMPAIGN_BATCH_SIZE = int(os.environ.get('EMAIL_CAMPAIGN_BATCH_SIZE', '100'))
+# Defaults for campaigns that do not set their own; both are also upper bounds
+EMAIL_CAMPAIGN_RATE_LIMIT = float(os.environ.get('EMAIL_CAMPAIGN_RATE_LIMIT', '10'))
+EMAIL_CAMPAIGN_CONCURRENCY = int(os.environ.get('EMAIL_CAMPAIGN_CONCURRENCY', '2'))
+EMAIL_CAMPAIGN_MAX_RATE_LIMIT = float(os.environ.get('EMAIL_CAMPAIGN_MAX_RATE_LIMIT', '50'))
+EMAIL_CAMPAIGN_MAX_CONCURRENCY = int(os.environ.get('EMAIL_CAMPAIGN_MAX_CONCURRENCY', '4'))
+# A running campaign whose process died is taken over after this long
+EMAIL_CAMPAIGN_LEASE_SECONDS = float(os.environ.get('EMAIL_CAMPAIGN_LEASE_SECONDS', '120'))
+
+STATUS_DRAFT = "draft"
+STATUS_RUNNING = "running"
+STATUS_PAUSED = "paused"
+STATUS_COMPLETED = "completed"
+STATUS_CANCELLED = "cancelled"
+STATUS_FAILED = "failed"
+
+RECIPIENT_PENDING = "pending"
+RECIPIENT_SENT = "sent"
+RECIPIENT_FAILED = "failed"
+
+# Collections a campaign can mail, and the field holding the recipient's name
+AUDIENCE_SOURCES = {
+    "clients": "full_name",
+    "contact_inquiries": "full_name",
+    "bookings": "full_name",
+    "partners": "name",
+}
+
+# Variables available to campaign templates
+RECIPIENT_VARIABLES = ('name', 'email', 'phone', 'company')
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+class CampaignError(ValueError):
+    """A campaign cannot be created or started as requested"""
+
+
+class RateLimiter:
+    """Spaces acquisitions at least 1/rate seconds apart"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            now = time.monotonic()
+            if self._next > now:
+                await asyncio.sleep(self._next - now)
+                now = self._next
+            self._next = now + self.interval
+
+
+def audience_query(audience: Dict[str, Any]) -> Dict[str, Any]:
+    """Mongo filter for a campaign audience; raises CampaignError for a bad one"""
+    if audience.get("source") not in AUDIENCE_SOURCES:
+        raise CampaignError(f"Audience source must be one of: {', '.join(AUDIENCE_SOURCES)}")
+    query: Dict[str, Any] = {"email": {"$nin": [None, ""]}}
+    if audience.get("status"):
+        query["status"] = audience["status"]
+    try:
+        query.update(created_at_range_query(audience.get("date_from"), audience.get("date_to")))
+    except ValueError as e:
+        raise CampaignError(str(e))
+    return query
+
+
+def recipient_context(document: Dict[str, Any], name_field: str) -> Dict[str, Any]:
+    return {
+        "name": document.get(name_field) or document.get("full_name") or document.get("name") or "",
+        "email": document["email"],
+        "phone": document.get("phone") or "",
+        "company": document.get("company") or "",
+    }
+
+
+def compile_campaign_template(document: Dict[str, Any]) -> CompiledTemplate:
+    """Compile a stored template for campaign use; raises TemplateError"""
+    template = CompiledTemplate.from_document(document)
+    unknown = set(template.variables) - set(RECIPIENT_VARIABLES)
+    if unknown:
+        raise TemplateError(
+            f"Campaign templates can only use: {', '.join(RECIPIENT_VARIABLES)} "
+            f"(template declares {', '.join(sorted(unknown))})"
+        )
+    return template
+
+
+class CampaignRunner:
+    """Sends campaigns stored in `email_campaigns`.
+
+    Recipients are read from the audience collection in KEYSET_SORT order and
+    the position after each batch is saved on the campaign with its counters,
+    so a paused, interrupted or taken-over campaign resumes where it stopped.
+    `email_campaign_recipients` has one document per (campaign, address):
+    duplicate addresses are skipped, and an address already sent or failed
+    is never mailed twice. Sends go through the campaign's own SMTP pool (or
+    maildir) and thread pool, limited to `concurrency` connections and `rate_limit`
+    messages per second, so transactional mail and request handling are not
+    starved.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # Identifies this process's leases
+        self.owner = str(uuid.uuid4())
+
+    @property
+    def campaigns(self):
+        return database.db.email_campaigns
+
+    @property
+    def recipients(self):
+        return database.db.email_campaign_recipients
+
+    async def ensure_indexes(self):
+        await database.ensure_indexes(["email_campaigns", "email_campaign_recipients"])
+
+    # ----- admin operations -----
+
+    async def create(self, campaign_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate and store a draft campaign"""
+        if database.db is None:
+            await database.connect()
+        audience_query(campaign_data["audience"])
+        template = await database.get_template_by_id(campaign_data["template_id"])
+        if not template:
+            raise CampaignError("Template not found")
+        compile_campaign_template(template)
+
+        await self.campaigns.insert_one(campaign_data)
+        campaign_data.pop("_id", None)
+        return campaign_data
+
+    async def get(self, campaign_id: str) -> Optional[Dict[str, Any]]:
+        return await self.campaigns.find_one({"id": campaign_id}, {"_id": 0})
+
+    async def list_campaigns(self, limit: int = 100) -> List[Dict[str, Any]]:
+        cursor = self.campaigns.find({}, {"_id": 0, "position": 0}).sort("created_at", -1).limit(limit)
+        return await cursor.to_list(length=None)
+
+    async def list_recipients(self, campaign_id: str, status: Optional[str] = None,
+                              limit: int = 100) -> List[Dict[str, Any]]:
+        query: Dict[str, Any] = {"campaign_id": campaign_id}
+        if status:
+            query["status"] = status
+        cursor = self.recipients.find(query, {"_id": 0}).sort("updated_at", -1).limit(limit)
+        return await cursor.to_list(length=None)
+
+    async def start(self, campaign_id: str) -> bool:
+        """Start a draft or resume a paused or failed campaign; False if it is in none of those states"""
+        await email_service.refresh_settings()
+        if not email_service.is_configured:
+            raise CampaignError("Email service is not configured")
+        result = await self.campaigns.update_one(
+            {"id": campaign_id, "status": {"$in": [STATUS_DRAFT, STATUS_PAUSED, STATUS_FAILED]}},
+            {"$set": {"status": STATUS_RUNNING, "last_error": None, "updated_at": _now()}, "$unset": {"lease_until": ""}}
+        )
+        if not result.modified_count:
+            return False
+        self._spawn(campaign_id)
+        return True
+
+    async def pause(self, campaign_id: str) -> bool:
+        """Stop a running campaign after its current batch"""
+        return await self._stop(campaign_id, STATUS_PAUSED, [STATUS_RUNNING])
+
+    async def cancel(self, campaign_id: str) -> bool:
+        """Stop a campaign for good"""
+        return await self._stop(campaign_id, STATUS_CANCELLED, [STATUS_DRAFT, STATUS_RUNNING, STATUS_PAUSED])
+
+    async def _stop(self, campaign_id: str, status: str, from_statuses: List[str]) -> bool:
+        result = await self.campaigns.update_one(
+            {"id": campaign_id, "status": {"$in": from_statuses}},
+            {"$set": {"status": status, "updated_at": _now()}}
+        )
+        return result.modified_count > 0
+
+    # ----- running -----
+
+    def _spawn(self, campaign_id: str):
+        task = self._tasks.get(campaign_id)
+        if task is None or task.done():
+            self._tasks[campaign_id] = asyncio.create_task(self._run(campaign_id))
+
+    async def _claim(self, campaign_id: str) -> Optional[Dict[str, Any]]:
+        """Take or renew the lease on a running campaign"""
+        now = datetime.utcnow()
+        return await self.campaigns.find_one_and_update(
+            {"id": campaign_id, "status": STATUS_RUNNING, "$or": [
+                {"lease_until": {"$exists": False}},
+                {"lease_until": {"$lt": now.isoformat()}},
+                {"lease_owner": self.owner},
+            ]},
+            {"$set": {
+                "lease_until": (now + timedelta(seconds=EMAIL_CAMPAIGN_LEASE_SECONDS)).isoformat(),
+                "lease_owner": self.owner,
+            }},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _keep_lease(self, campaign_id: str):
+        """Renew the lease while a batch is sending, so one slow batch cannot
+        outlast EMAIL_CAMPAIGN_LEASE_SECONDS; stops once the lease is gone
+        (paused, cancelled or taken over), which the next batch boundary acts on"""
+        while True:
+            await asyncio.sleep(EMAIL_CAMPAIGN_LEASE_SECONDS / 3)
+            try:
+                if await self._claim(campaign_id) is None:
+                    return
+            except Exception as e:
+                logger.warning(f"Campaign {campaign_id}: lease renewal failed: {str(e)}")
+
+    async def _run(self, campaign_id: str):
+        campaign = await self._claim(campaign_id)
+        if campaign is None:
+            return
+        lease_keeper = asyncio.create_task(self._keep_lease(campaign_id))
+
+        concurrency = max(1, min(campaign.get("concurrency") or EMAIL_CAMPAIGN_CONCURRENCY,
+                                 EMAIL_CAMPAIGN_MAX_CONCURRENCY))
+        rate = min(campaign.get("rate_limit") or EMAIL_CAMPAIGN_RATE_LIMIT, EMAIL_CAMPAIGN_MAX_RATE_LIMIT)
+        await email_service.refresh_settings()
+        transport = email_service.create_transport(concurrency)
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"campaign-{campaign_id[:8]}")
+        try:
+            template_document = await database.get_template_by_id(campaign["template_id"])
+            if not template_document:
+                raise CampaignError("Template not found")
+            template = compile_campaign_template(template_document)
+            if not campaign.get("started_at"):
+                await self.campaigns.update_one({"id": campaign_id}, {"$set": {"started_at": _now()}})
+            logger.info(f"Campaign {campaign_id} running: {concurrency} connection(s), {rate:g} msg/s")
+            await self._send_all(campaign, template, transport, executor, RateLimiter(rate), concurrency)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Campaign {campaign_id} failed: {str(e)}")
+            await self.campaigns.update_one(
+                {"id": campaign_id, "status": STATUS_RUNNING},
+                {"$set": {"status": STATUS_FAILED, "last_error": str(e), "updated_at": _now()}}
+            )
+        finally:
+            lease_keeper.cancel()
+            executor.shutdown(wait=False)
+            await asyncio.to_thread(transport.close)
+            # Only our own lease: another process may have taken the campaign over
+            await self.campaigns.update_one(
+                {"id": campaign_id, "lease_owner": self.owner},
+                {"$unset": {"lease_until": "", "lease_owner": ""}}
+            )
+            self._tasks.pop(campaign_id, None)
+
+    async def _send_all(self, campaign: Dict[str, Any], template: CompiledTemplate, transport,
+                        executor: ThreadPoolExecutor, limiter: RateLimiter, concurrency: int):
+        campaign_id = campaign["id"]
+        source = campaign["audience"]["source"]
+        name_field = AUDIENCE_SOURCES[source]
+        query = audience_query(campaign["audience"])
+        position = campaign.get("position")
+        if position:
+            created_at, doc_id = position
+            query = {"$and": [query, {"$or": [
+                {"created_at": {"$lt": created_at}},
+                {"created_at": created_at, "id": {"$lt": doc_id}},
+            ]}]}
+
+        projection = {"_id": 0, "id": 1, "created_at": 1, "email": 1, "phone": 1, "company": 1, name_field: 1}
+        cursor = database.db[source].find(query, projection).sort(KEYSET_SORT).batch_size(EMAIL_CAMPAIGN_BATCH_SIZE)
+        slots = asyncio.Semaphore(concurrency)
+        loop = asyncio.get_running_loop()
+
+        async def send(recipient: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+            async with slots:
+                await limiter.acquire()
+                subject, body = template.render(recipient)
+                try:
+                    await loop.run_in_executor(
+                        executor, email_service.deliver, recipient["email"], subject, body, True, transport
+                    )
+                    return recipient["email"], None
+                except Exception as e:
+                    return recipient["email"], str(e)
+
+        batch: List[Dict[str, Any]] = []
+        async for document in cursor:
+            batch.append(document)
+            if len(batch) >= EMAIL_CAMPAIGN_BATCH_SIZE:
+                if not await self._send_batch(campaign_id, batch, name_field, send):
+                    return
+                batch = []
+        if batch and not await self._send_batch(campaign_id, batch, name_field, send):
+            return
+
+        await self.campaigns.update_one(
+            {"id": campaign_id, "status": STATUS_RUNNING},
+            {"$set": {"status": STATUS_COMPLETED, "finished_at": _now(), "updated_at": _now()}}
+        )
+        logger.info(f"Campaign {campaign_id} completed")
+
+    async def _send_batch(self, campaign_id: str, documents: List[Dict[str, Any]], name_field: str, send) -> bool:
+        """Send one batch and save progress; False if the campaign should stop"""
+        started = time.monotonic()
+
+        # One recipient per address within the batch, then drop addresses already handled
+        contexts: Dict[str, Dict[str, Any]] = {}
+        for document in documents:
+            context = recipient_context(document, name_field)
+            contexts.setdefault(context["email"].strip().lower(), context)
+        done = await self.recipients.distinct("email", {
+            "campaign_id": campaign_id, "email": {"$in": list(contexts)},
+            "status": {"$in": [RECIPIENT_SENT, RECIPIENT_FAILED]},
+        })
+        for email in done:
+            contexts.pop(email, None)
+        skipped = len(documents) - len(contexts)
+
+        # Record before sending so an interrupted batch is known (pending) on resume
+        if contexts:
+            now = _now()
+            try:
+                await self.recipients.insert_many([
+                    {"campaign_id": campaign_id, "email": email, "status": RECIPIENT_PENDING,
+                     "error": None, "created_at": now, "updated_at": now}
+                    for email in contexts
+                ], ordered=False)
+            except BulkWriteError:
+                pass  # pending from an interrupted run; sent again
+
+        results = await asyncio.gather(*(send(context) for context in contexts.values()))
+
+        now = _now()
+        if results:
+            await self.recipients.bulk_write([
+                UpdateOne(
+                    {"campaign_id": campaign_id, "email": email.strip().lower()},
+                    {"$set": {"status": RECIPIENT_FAILED if error else RECIPIENT_SENT, "error": error, "updated_at": now}}
+                )
+                for email, error in results
+            ], ordered=False)
+        failed = sum(1 for _, error in results if error)
+        sent = len(results) - failed
+        elapsed = time.monotonic() - started
+
+        last = documents[-1]
+        campaign = await self.campaigns.find_one_and_update(
+            {"id": campaign_id},
+            {
+                "$set": {
+                    "position": [last.get("created_at"), last.get("id")],
+                    "messages_per_second": round(len(results) / elapsed, 2) if elapsed > 0 else 0.0,
+                    "updated_at": now,
+                },
+                "$inc": {"sent": sent, "failed": failed, "skipped": skipped, "elapsed_seconds": elapsed},
+            },
+            projection={"_id": 0, "status": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        logger.info(f"Campaign {campaign_id}: batch of {len(documents)}, {sent} sent, {failed} failed, "
+                    f"{skipped} skipped in {elapsed:.1f}s")
+        if failed:
+            logger.warning(f"Campaign {campaign_id}: {failed} send(s) failed, e.g. {next(e for _, e in results if e)}")
+
+        # Paused or cancelled by an admin, or the lease was lost to another process
+        if campaign is None or campaign["status"] != STATUS_RUNNING:
+            return False
+        return await self._claim(campaign_id) is not None
+
+    async def resume_running(self):
+        """Pick up campaigns left running by a previous process (called on app startup)"""
+        await self.ensure_indexes()
+        async for campaign in self.campaigns.find({"status": STATUS_RUNNING}, {"_id": 0, "id": 1}):
+            self._spawn(campaign["id"])
+
+    async def stop(self):
+        """Cancel running campaigns in this process; they resume on next startup"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = {}
+
+
+# Singleton instance
+campaign_runner = CampaignRunner()
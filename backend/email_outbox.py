@@ -0,0 +1,245 @@
+"""
+Durable email outbox: requests enqueue messages in MongoDB and background
+workers deliver them over SMTP, with retries, backoff and dead-lettering.
+"""
+import asyncio
+import logging
+import os
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+
+from database import database
+from email_service import email_service
+
+logger = logging.getLogger(__name__)
+
+EMAIL_OUTBOX_WORKERS = int(os.environ.get('EMAIL_OUTBOX_WORKERS', '2'))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('EMAIL_OUTBOX_MAX_ATTEMPTS', '6'))
+# Retry n waits base * 2^(n-1) seconds (with jitter), capped at max
+EMAIL_OUTBOX_BACKOFF_BASE = float(os.environ.get('EMAIL_OUTBOX_BACKOFF_BASE', '30'))
+EMAIL_OUTBOX_BACKOFF_MAX = float(os.environ.get('EMAIL_OUTBOX_BACKOFF_MAX', '3600'))
+# Idle workers look for due retries this often; new messages wake them at once
+EMAIL_OUTBOX_POLL_INTERVAL = float(os.environ.get('EMAIL_OUTBOX_POLL_INTERVAL', '10'))
+# A message claimed by a worker that died is picked up again after this long
+EMAIL_OUTBOX_LEASE_SECONDS = float(os.environ.get('EMAIL_OUTBOX_LEASE_SECONDS', '300'))
+
+STATUS_PENDING = "pending"
+STATUS_SENDING = "sending"
+STATUS_SENT = "sent"
+STATUS_DEAD = "dead"
+STATUS_SKIPPED = "skipped"
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+def backoff_seconds(attempts: int) -> float:
+    """Delay before retrying a message that has failed `attempts` times"""
+    delay = min(EMAIL_OUTBOX_BACKOFF_BASE * (2 ** (attempts - 1)), EMAIL_OUTBOX_BACKOFF_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+class EmailOutbox:
+    """Queue of outgoing emails in the `email_outbox` collection.
+
+    Each document is one message (to_email, subject, body, is_html), so a
+    retry never resends the recipients that already got theirs.
+    """
+
+    def __init__(self):
+        self._wakeup = asyncio.Event()
+        self._workers: List[asyncio.Task] = []
+
+    @property
+    def collection(self):
+        return database.db.email_outbox
+
+    async def ensure_indexes(self):
+        await database.ensure_indexes(["email_outbox"])
+
+    async def enqueue(self, messages: List[Dict[str, Any]], kind: str, dedupe: bool = False) -> List[str]:
+        """Store messages for delivery and wake a worker; returns their outbox ids.
+
+        With dedupe=True messages carry their own `id`, and those already in
+        the outbox are skipped (and left out of the returned ids), so
+        enqueueing the same message twice delivers it once.
+        """
+        if not messages:
+            return []
+        if database.db is None:
+            await database.connect()
+
+        now = _now()
+        documents = [
+            {
+                "id": str(uuid.uuid4()),
+                "kind": kind,
+                **message,
+                "status": STATUS_PENDING,
+                "attempts": 0,
+                "next_attempt_at": now,
+                "last_error": None,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for message in messages
+        ]
+        if not dedupe:
+            await self.collection.insert_many(documents)
+        else:
+            try:
+                await self.collection.insert_many(documents, ordered=False)
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                if any(error.get("code") != 11000 for error in errors):
+                    raise
+                skipped = {error["index"] for error in errors}
+                documents = [document for n, document in enumerate(documents) if n not in skipped]
+        if documents:
+            self._wakeup.set()
+        return [document["id"] for document in documents]
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        """Atomically take the oldest due message, or one whose lease has expired.
+
+        Each claim gets a fresh `lease` token; the final update only applies
+        while that token is still on the message, so a worker whose lease
+        expired cannot overwrite the outcome of the worker that took over.
+        """
+        now = datetime.utcnow()
+        message = await self.collection.find_one_and_update(
+            {"$or": [
+                {"status": STATUS_PENDING, "next_attempt_at": {"$lte": now.isoformat()}},
+                {"status": STATUS_SENDING, "locked_until": {"$lt": now.isoformat()}},
+            ]},
+            {
+                "$set": {
+                    "status": STATUS_SENDING,
+                    "locked_until": (now + timedelta(seconds=EMAIL_OUTBOX_LEASE_SECONDS)).isoformat(),
+                    "lease": str(uuid.uuid4()),
+                    "updated_at": now.isoformat(),
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+        if message is not None:
+            message.pop("_id", None)
+        return message
+
+    async def _deliver(self, message: Dict[str, Any]):
+        try:
+            # A settings read that fails is retried like a failed send
+            await email_service.refresh_settings()
+            configured = email_service.is_configured
+            if configured:
+                # smtplib blocks; keep it off the event loop
+                await asyncio.to_thread(
+                    email_service.deliver,
+                    message["to_email"], message["subject"], message["body"], message.get("is_html", False)
+                )
+        except Exception as e:
+            await self._fail(message, str(e))
+            return
+        if not configured:
+            logger.info(f"EMAIL (not sent - not configured): To: {message['to_email']}, Subject: {message['subject']}")
+            await self._finish(message, STATUS_SKIPPED)
+            return
+        await self._finish(message, STATUS_SENT)
+
+    async def _release(self, message: Dict[str, Any], update: Dict[str, Any]):
+        """Apply the outcome of a claim, unless the lease has passed to another worker"""
+        result = await self.collection.update_one(
+            {"id": message["id"], "status": STATUS_SENDING, "lease": message["lease"]},
+            {"$set": update, "$unset": {"locked_until": "", "lease": ""}}
+        )
+        if not result.matched_count:
+            logger.warning(f"Email {message['id']}: lease expired before delivery finished; outcome left to its new owner")
+
+    async def _finish(self, message: Dict[str, Any], status: str):
+        now = _now()
+        await self._release(
+            message, {"status": status, "sent_at": now if status == STATUS_SENT else None, "updated_at": now}
+        )
+
+    async def _fail(self, message: Dict[str, Any], error: str):
+        attempts = message["attempts"]
+        update: Dict[str, Any] = {"last_error": error, "updated_at": _now()}
+        if attempts >= EMAIL_OUTBOX_MAX_ATTEMPTS:
+            update["status"] = STATUS_DEAD
+            logger.error(f"Email {message['id']} to {message['to_email']} dead-lettered after {attempts} attempts: {error}")
+        else:
+            delay = backoff_seconds(attempts)
+            update["status"] = STATUS_PENDING
+            update["next_attempt_at"] = (datetime.utcnow() + timedelta(seconds=delay)).isoformat()
+            logger.warning(f"Email {message['id']} to {message['to_email']} failed (attempt {attempts}), retrying in {delay:.0f}s: {error}")
+        await self._release(message, update)
+
+    async def process_due(self) -> int:
+        """Deliver messages until none are due; returns how many were attempted"""
+        processed = 0
+        while True:
+            message = await self._claim()
+            if message is None:
+                return processed
+            await self._deliver(message)
+            processed += 1
+
+    async def _worker(self, number: int):
+        while True:
+            # Clear first so a message enqueued while we drain still wakes us
+            self._wakeup.clear()
+            try:
+                await self.process_due()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Email outbox worker {number} error: {str(e)}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=EMAIL_OUTBOX_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def start(self):
+        """Create indexes and start the delivery workers (called on app startup)"""
+        if self._workers:
+            return
+        await self.ensure_indexes()
+        self._wakeup = asyncio.Event()
+        self._workers = [
+            asyncio.create_task(self._worker(number)) for number in range(max(1, EMAIL_OUTBOX_WORKERS))
+        ]
+        logger.info(f"Email outbox started with {len(self._workers)} worker(s)")
+
+    async def stop(self):
+        """Cancel the workers; a message mid-delivery is retried after its lease expires"""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def list_messages(self, status: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        query = {"status": status} if status else {}
+        cursor = self.collection.find(query, {"_id": 0, "body": 0}).sort("created_at", -1).limit(limit)
+        return await cursor.to_list(length=None)
+
+    async def retry(self, message_id: str) -> bool:
+        """Put a dead (or skipped) message back in the queue"""
+        result = await self.collection.update_one(
+            {"id": message_id, "status": {"$in": [STATUS_DEAD, STATUS_SKIPPED]}},
+            {"$set": {"status": STATUS_PENDING, "attempts": 0, "next_attempt_at": _now(), "updated_at": _now()}}
+        )
+        if result.modified_count:
+            self._wakeup.set()
+        return result.modified_count > 0
+
+
+# Singleton instance
+email_outbox = EmailOutbox()
@@ -1,28 +1,144 @@
-import smtplib
+import asyncio
 import os
+import threading
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 import logging
 
+from database import database
+from email_templates import TemplateSet, email_template_cache
+from mail_transports import FaultInjectingTransport, MaildirTransport
+from smtp_pool import SMTPConnectionPool
+
 logger = logging.getLogger(__name__)
 
 
 class EmailService:
+    """Sends email over the configured transport.
+
+    SMTP settings come from the environment and can be overridden by the
+    smtp_* and recipient_email fields of the Settings document. The document
+    is re-read at most every EMAIL_SETTINGS_TTL seconds (and right away when
+    an admin saves it), and the shared transport is only rebuilt when the
+    connection settings actually change.
+    """
+
     def __init__(self):
-        self.smtp_server = os.environ.get('SMTP_SERVER', 'smtp.gmail.com')
-        self.smtp_port = int(os.environ.get('SMTP_PORT', '587'))
-        self.smtp_username = os.environ.get('SMTP_USERNAME', '')
-        self.smtp_password = os.environ.get('SMTP_PASSWORD', '')
-        self.from_email = os.environ.get('FROM_EMAIL', self.smtp_username)
-        self.admin_email = os.environ.get('ADMIN_EMAIL', 'admin@hdmonks.com')
-        
-        # Check if email is configured
-        self.is_configured = bool(self.smtp_username and self.smtp_password)
+        self.env_smtp_server = os.environ.get('SMTP_SERVER', 'smtp.gmail.com')
+        self.env_smtp_port = int(os.environ.get('SMTP_PORT', '587'))
+        self.env_smtp_username = os.environ.get('SMTP_USERNAME', '')
+        self.env_smtp_password = os.environ.get('SMTP_PASSWORD', '')
+        self.env_from_email = os.environ.get('FROM_EMAIL', '')
+        self.env_admin_email = os.environ.get('ADMIN_EMAIL', 'admin@hdmonks.com')
+        self.smtp_starttls = os.environ.get('SMTP_STARTTLS', 'true').lower() not in ('0', 'false', 'no')
+        self.pool_size = int(os.environ.get('SMTP_POOL_SIZE', '2'))
+        self.idle_timeout = float(os.environ.get('SMTP_IDLE_TIMEOUT', '60'))
+        # 'smtp', or 'maildir' to write messages to EMAIL_MAILDIR instead of sending them
+        self.transport_name = os.environ.get('EMAIL_TRANSPORT', 'smtp').lower()
+        self.maildir = os.environ.get('EMAIL_MAILDIR', 'maildir')
+        # Fault injection for benchmarks and local testing
+        self.inject_latency = float(os.environ.get('EMAIL_INJECT_LATENCY_MS', '0')) / 1000
+        self.inject_jitter = float(os.environ.get('EMAIL_INJECT_JITTER_MS', '0')) / 1000
+        self.inject_failure_rate = float(os.environ.get('EMAIL_INJECT_FAILURE_RATE', '0'))
+        self.settings_ttl = float(os.environ.get('EMAIL_SETTINGS_TTL', '60'))
+        self._settings_loaded_at: Optional[float] = None
+        self._transport = None
+        self._transport_lock = threading.Lock()
+        
+        self._apply({})
         
         if not self.is_configured:
             logger.warning("Email service not configured. Email notifications will be logged only.")
     
+    def _connection_settings(self):
+        return (self.smtp_server, self.smtp_port, self.smtp_username, self.smtp_password)
+    
+    def _apply(self, settings: Dict[str, Any]):
+        """Overlay non-empty Settings fields on the environment defaults"""
+        self.smtp_server = settings.get('smtp_host') or self.env_smtp_server
+        self.smtp_port = int(settings.get('smtp_port') or self.env_smtp_port)
+        self.smtp_username = settings.get('smtp_user') or self.env_smtp_username
+        self.smtp_password = settings.get('smtp_password') or self.env_smtp_password
+        self.from_email = self.env_from_email or self.smtp_username
+        self.admin_email = settings.get('recipient_email') or self.env_admin_email
+        
+        # Check if email is configured
+        self.is_configured = self.transport_name == 'maildir' or bool(self.smtp_username and self.smtp_password)
+    
+    def apply_settings(self, settings: Optional[Dict[str, Any]]):
+        """Use SMTP settings from a Settings document.
+
+        Returns the transport replaced because the connection settings changed
+        (the caller closes it), or None if the current one is still valid.
+        """
+        self._settings_loaded_at = time.monotonic()
+        with self._transport_lock:
+            before = self._connection_settings()
+            self._apply(settings or {})
+            if self._connection_settings() == before:
+                return None
+            replaced, self._transport = self._transport, None
+        logger.info(f"SMTP settings changed: now {self.smtp_server}:{self.smtp_port} as {self.smtp_username or '(no login)'}")
+        return replaced
+    
+    async def refresh_settings(self, force: bool = False):
+        """Re-read the Settings document if the cached copy is older than EMAIL_SETTINGS_TTL"""
+        if not force and self._settings_loaded_at is not None and (
+                self.settings_ttl <= 0 or time.monotonic() - self._settings_loaded_at < self.settings_ttl):
+            return
+        if database.db is None:
+            await database.connect()
+        replaced = self.apply_settings(await database.get_settings())
+        if replaced is not None:
+            # Idle connections are closed now, busy ones when their send finishes
+            await asyncio.to_thread(replaced.close)
+    
+    def create_transport(self, max_size: int):
+        """A new transport for the configured EMAIL_TRANSPORT: an SMTP connection
+        pool of up to `max_size` connections, or a maildir writer"""
+        if self.transport_name == 'maildir':
+            transport = MaildirTransport(self.maildir)
+        else:
+            transport = SMTPConnectionPool(
+                self.smtp_server, self.smtp_port, self.smtp_username, self.smtp_password,
+                starttls=self.smtp_starttls, max_size=max_size, idle_timeout=self.idle_timeout
+            )
+        if self.inject_latency or self.inject_jitter or self.inject_failure_rate:
+            transport = FaultInjectingTransport(
+                transport, self.inject_latency, self.inject_jitter, self.inject_failure_rate
+            )
+        return transport
+    
+    @property
+    def transport(self):
+        """Shared transport, created on first use"""
+        if self._transport is None:
+            with self._transport_lock:
+                if self._transport is None:
+                    self._transport = self.create_transport(self.pool_size)
+        return self._transport
+    
+    def close(self):
+        """Close the shared transport (pooled SMTP connections)"""
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+    
+    def deliver(self, to_email: str, subject: str, body: str, is_html: bool = False, transport=None):
+        """Send an email over `transport` (the shared one by default); blocking, and raises on failure"""
+        msg = MIMEMultipart()
+        msg['From'] = self.from_email
+        msg['To'] = to_email
+        msg['Subject'] = subject
+        
+        msg.attach(MIMEText(body, 'html' if is_html else 'plain'))
+        
+        (transport or self.transport).send(msg)
+        
+        logger.info(f"Email sent successfully to {to_email}")
+    
     def send_email(self, to_email: str, subject: str, body: str, is_html: bool = False) -> bool:
         """Send an email"""
         if not self.is_configured:
@@ -30,121 +146,94 @@ class EmailService:
             return False
         
         try:
-            msg = MIMEMultipart()
-            msg['From'] = self.from_email
-            msg['To'] = to_email
-            msg['Subject'] = subject
-            
-            msg.attach(MIMEText(body, 'html' if is_html else 'plain'))
-            
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_username, self.smtp_password)
-                server.send_message(msg)
-            
-            logger.info(f"Email sent successfully to {to_email}")
+            self.deliver(to_email, subject, body, is_html)
             return True
             
         except Exception as e:
             logger.error(f"Failed to send email to {to_email}: {str(e)}")
             return False
     
+    def send_messages(self, messages: List[Dict[str, Any]]) -> bool:
+        """Send messages built by the build_* methods; True if any was sent"""
+        sent = False
+        for message in messages:
+            sent = self.send_email(**message) or sent
+        return sent
+    
+    @staticmethod
+    def _message(to_email: str, subject: str, body: str) -> Dict[str, Any]:
+        return {"to_email": to_email, "subject": subject, "body": body, "is_html": True}
+    
+    @staticmethod
+    def _render(templates: Optional[TemplateSet], template_type: str, to_email: str,
+                context: Dict[str, Any]) -> Dict[str, Any]:
+        # Without a snapshot use whatever was loaded last, so rendering stays free of DB calls
+        subject, body = (templates or email_template_cache.snapshot).render(template_type, context)
+        return EmailService._message(to_email, subject, body)
+    
+    @staticmethod
+    def inquiry_context(inquiry: Dict[str, Any]) -> Dict[str, Any]:
+        """Variables available to contact templates"""
+        return {
+            "name": inquiry.get("full_name") or inquiry.get("name", "Customer"),
+            "email": inquiry['email'],
+            "phone": inquiry.get('phone') or 'Not provided',
+            "company": inquiry.get('company') or 'Not provided',
+            "service_interest": inquiry.get('service_interest') or 'Not specified',
+            "message": inquiry['message'],
+            "submitted_at": inquiry['created_at'],
+            "inquiry_id": inquiry.get('id', ''),
+        }
+    
+    @staticmethod
+    def booking_context(booking: Dict[str, Any]) -> Dict[str, Any]:
+        """Variables available to booking and reminder templates"""
+        return {
+            "name": booking.get("full_name") or booking.get("name", "Customer"),
+            "email": booking['email'],
+            "phone": booking.get('phone') or 'Not provided',
+            "company": booking.get('company') or 'Not provided',
+            "service_interest": booking.get('service_interest') or 'Not specified',
+            "message": booking.get('message') or 'No additional message',
+            "date": booking['date'],
+            "time": booking['time'],
+            "booking_id": booking.get('id', ''),
+        }
+    
+    def build_contact_inquiry_messages(self, inquiry: Dict[str, Any],
+                                       templates: Optional[TemplateSet] = None) -> List[Dict[str, Any]]:
+        """Admin notification and customer confirmation for a new contact inquiry"""
+        context = self.inquiry_context(inquiry)
+        return [
+            self._render(templates, 'contact_admin', self.admin_email, context),
+            self._render(templates, 'contact', inquiry['email'], context),
+        ]
+    
     def send_contact_inquiry_notification(self, inquiry: Dict[str, Any]) -> bool:
         """Send notification email for new contact inquiry"""
-        subject = f"New Contact Inquiry from {inquiry['name']}"
-        
-        body = f"""
-        <h2>New Contact Inquiry</h2>
-        <p><strong>Name:</strong> {inquiry['name']}</p>
-        <p><strong>Email:</strong> {inquiry['email']}</p>
-        <p><strong>Phone:</strong> {inquiry.get('phone', 'Not provided')}</p>
-        <p><strong>Company:</strong> {inquiry.get('company', 'Not provided')}</p>
-        <p><strong>Service Interest:</strong> {inquiry.get('service_interest', 'Not specified')}</p>
-        <p><strong>Message:</strong></p>
-        <p>{inquiry['message']}</p>
-        <p><strong>Submitted:</strong> {inquiry['created_at']}</p>
-        """
-        
-        # Send to admin
-        admin_sent = self.send_email(self.admin_email, subject, body, is_html=True)
-        
-        # Send confirmation to customer
-        customer_subject = "Thank you for contacting HD MONKS"
-        customer_body = f"""
-        <h2>Thank you for your inquiry!</h2>
-        <p>Dear {inquiry['name']},</p>
-        <p>We have received your inquiry and will get back to you within 24 hours.</p>
-        <p><strong>Your message:</strong></p>
-        <p>{inquiry['message']}</p>
-        <p>Best regards,<br>HD MONKS Team</p>
-        """
-        
-        customer_sent = self.send_email(inquiry['email'], customer_subject, customer_body, is_html=True)
-        
-        return admin_sent or customer_sent
+        return self.send_messages(self.build_contact_inquiry_messages(inquiry))
+    
+    def build_booking_confirmation_messages(self, booking: Dict[str, Any],
+                                            templates: Optional[TemplateSet] = None) -> List[Dict[str, Any]]:
+        """Admin notification and customer confirmation for a consultation booking"""
+        context = self.booking_context(booking)
+        return [
+            self._render(templates, 'booking_admin', self.admin_email, context),
+            self._render(templates, 'booking', booking['email'], context),
+        ]
     
     def send_booking_confirmation(self, booking: Dict[str, Any]) -> bool:
         """Send confirmation email for consultation booking"""
-        customer_name = booking.get("full_name") or booking.get("name", "Customer")
-        subject = f"Consultation Booking Confirmed - {booking['date']} at {booking['time']}"
-        
-        # Send to admin
-        admin_body = f"""
-        <h2>New Consultation Booking</h2>
-        <p><strong>Name:</strong> {customer_name}</p>
-        <p><strong>Email:</strong> {booking['email']}</p>
-        <p><strong>Phone:</strong> {booking['phone']}</p>
-        <p><strong>Company:</strong> {booking.get('company', 'Not provided')}</p>
-        <p><strong>Service Interest:</strong> {booking['service_interest']}</p>
-        <p><strong>Date & Time:</strong> {booking['date']} at {booking['time']}</p>
-        <p><strong>Message:</strong> {booking.get('message', 'No additional message')}</p>
-        <p><strong>Booking ID:</strong> {booking['id']}</p>
-        """
-        
-        admin_sent = self.send_email(self.admin_email, f"New Booking: {subject}", admin_body, is_html=True)
-        
-        # Send confirmation to customer
-        customer_body = f"""
-        <h2>Consultation Booking Confirmed</h2>
-        <p>Dear {customer_name},</p>
-        <p>Your consultation has been successfully booked!</p>
-        
-        <h3>Booking Details:</h3>
-        <p><strong>Date:</strong> {booking['date']}</p>
-        <p><strong>Time:</strong> {booking['time']}</p>
-        <p><strong>Service:</strong> {booking['service_interest']}</p>
-        <p><strong>Booking ID:</strong> {booking['id']}</p>
-        
-        <p>We will send you a meeting link closer to the appointment date.</p>
-        <p>If you need to reschedule or cancel, please contact us as soon as possible.</p>
-        
-        <p>Best regards,<br>HD MONKS Team</p>
-        """
-        
-        customer_sent = self.send_email(booking['email'], subject, customer_body, is_html=True)
-        
-        return admin_sent or customer_sent
+        return self.send_messages(self.build_booking_confirmation_messages(booking))
+    
+    def build_booking_reminder_message(self, booking: Dict[str, Any],
+                                       templates: Optional[TemplateSet] = None) -> Dict[str, Any]:
+        """Reminder for an upcoming consultation"""
+        return self._render(templates, 'reminder', booking['email'], self.booking_context(booking))
     
     def send_booking_reminder(self, booking: Dict[str, Any]) -> bool:
         """Send reminder email for upcoming consultation"""
-        subject = f"Reminder: Your consultation tomorrow at {booking['time']}"
-        
-        body = f"""
-        <h2>Consultation Reminder</h2>
-        <p>Dear {booking['name']},</p>
-        <p>This is a reminder that you have a consultation scheduled for tomorrow:</p>
-        
-        <h3>Booking Details:</h3>
-        <p><strong>Date:</strong> {booking['date']}</p>
-        <p><strong>Time:</strong> {booking['time']}</p>
-        <p><strong>Service:</strong> {booking['service_interest']}</p>
-        
-        <p>We look forward to speaking with you!</p>
-        
-        <p>Best regards,<br>HD MONKS Team</p>
-        """
-        
-        return self.send_email(booking['email'], subject, body, is_html=True)
+        return self.send_email(**self.build_booking_reminder_message(booking))
 
 
 # Global email service instance
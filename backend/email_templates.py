@@ -0,0 +1,274 @@
+"""
+Compiled email templates loaded from the `email_templates` collection
+"""
+import asyncio
+import html
+import logging
+import os
+import re
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from database import database
+
+logger = logging.getLogger(__name__)
+
+# {{ variable }} placeholders; names are identifiers
+PLACEHOLDER = re.compile(r'\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}')
+
+# Variables EmailService supplies for each template type it renders.
+# Other types (newsletter, ...) may declare any variables.
+TEMPLATE_VARIABLES: Dict[str, Tuple[str, ...]] = {
+    'contact': ('name', 'email', 'phone', 'company', 'service_interest', 'message', 'submitted_at', 'inquiry_id'),
+    'contact_admin': ('name', 'email', 'phone', 'company', 'service_interest', 'message', 'submitted_at', 'inquiry_id'),
+    'booking': ('name', 'email', 'phone', 'company', 'service_interest', 'message', 'date', 'time', 'booking_id'),
+    'booking_admin': ('name', 'email', 'phone', 'company', 'service_interest', 'message', 'date', 'time', 'booking_id'),
+    'reminder': ('name', 'email', 'phone', 'company', 'service_interest', 'message', 'date', 'time', 'booking_id'),
+}
+
+
+class TemplateError(ValueError):
+    """A template uses undeclared variables or declares ones its type does not provide"""
+
+
+class CompiledTemplate:
+    """Subject and HTML body split once into literal and placeholder parts.
+
+    Rendering is a join over the parts. Values are HTML-escaped in the body
+    and inserted as-is in the subject.
+    """
+
+    __slots__ = ('template_type', 'name', 'variables', '_subject', '_body')
+
+    def __init__(self, template_type: str, subject: str, html_content: str,
+                 variables: Iterable[str] = (), name: str = ''):
+        self.template_type = template_type
+        self.name = name or template_type
+        self.variables = tuple(variables)
+        self._subject = self._compile(subject)
+        self._body = self._compile(html_content)
+
+    @staticmethod
+    def _compile(source: str) -> List[Tuple[bool, str]]:
+        """List of (is_placeholder, literal text or variable name)"""
+        parts = []
+        position = 0
+        for match in PLACEHOLDER.finditer(source):
+            if match.start() > position:
+                parts.append((False, source[position:match.start()]))
+            parts.append((True, match.group(1)))
+            position = match.end()
+        if position < len(source):
+            parts.append((False, source[position:]))
+        return parts
+
+    def placeholders(self) -> set:
+        return {value for is_placeholder, value in self._subject + self._body if is_placeholder}
+
+    def validate(self):
+        """Raise TemplateError if placeholders and declared variables disagree"""
+        undeclared = self.placeholders() - set(self.variables)
+        if undeclared:
+            raise TemplateError(f"Template uses undeclared variables: {', '.join(sorted(undeclared))}")
+        provided = TEMPLATE_VARIABLES.get(self.template_type)
+        if provided is not None:
+            unknown = set(self.variables) - set(provided)
+            if unknown:
+                raise TemplateError(
+                    f"Variables not available for '{self.template_type}' templates: {', '.join(sorted(unknown))} "
+                    f"(available: {', '.join(provided)})"
+                )
+
+    @staticmethod
+    def _render(parts: List[Tuple[bool, str]], context: Dict[str, Any], escape: bool) -> str:
+        rendered = []
+        for is_placeholder, value in parts:
+            if not is_placeholder:
+                rendered.append(value)
+                continue
+            text = context.get(value)
+            text = '' if text is None else str(text)
+            rendered.append(html.escape(text) if escape else text)
+        return ''.join(rendered)
+
+    def render(self, context: Dict[str, Any]) -> Tuple[str, str]:
+        """Render (subject, html_body); missing variables render empty"""
+        return self._render(self._subject, context, False), self._render(self._body, context, True)
+
+    @classmethod
+    def from_document(cls, document: Dict[str, Any]) -> 'CompiledTemplate':
+        template = cls(
+            document['template_type'], document.get('subject', ''), document.get('html_content', ''),
+            document.get('variables') or (), document.get('name', '')
+        )
+        template.validate()
+        return template
+
+
+def validate_template(template_type: str, subject: str, html_content: str, variables: Iterable[str]):
+    """Compile and validate template fields; raises TemplateError"""
+    CompiledTemplate(template_type, subject, html_content, variables).validate()
+
+
+def _default(template_type: str, subject: str, html_content: str) -> CompiledTemplate:
+    return CompiledTemplate(template_type, subject, html_content, TEMPLATE_VARIABLES[template_type])
+
+
+# Built-in templates used when the collection has no (valid) template of a type
+DEFAULT_TEMPLATES: Dict[str, CompiledTemplate] = {
+    'contact_admin': _default('contact_admin', "New Contact Inquiry from {{ name }}", """
+        <h2>New Contact Inquiry</h2>
+        <p><strong>Name:</strong> {{ name }}</p>
+        <p><strong>Email:</strong> {{ email }}</p>
+        <p><strong>Phone:</strong> {{ phone }}</p>
+        <p><strong>Company:</strong> {{ company }}</p>
+        <p><strong>Service Interest:</strong> {{ service_interest }}</p>
+        <p><strong>Message:</strong></p>
+        <p>{{ message }}</p>
+        <p><strong>Submitted:</strong> {{ submitted_at }}</p>
+        """),
+    'contact': _default('contact', "Thank you for contacting HD MONKS", """
+        <h2>Thank you for your inquiry!</h2>
+        <p>Dear {{ name }},</p>
+        <p>We have received your inquiry and will get back to you within 24 hours.</p>
+        <p><strong>Your message:</strong></p>
+        <p>{{ message }}</p>
+        <p>Best regards,<br>HD MONKS Team</p>
+        """),
+    'booking_admin': _default('booking_admin', "New Booking: Consultation Booking Confirmed - {{ date }} at {{ time }}", """
+        <h2>New Consultation Booking</h2>
+        <p><strong>Name:</strong> {{ name }}</p>
+        <p><strong>Email:</strong> {{ email }}</p>
+        <p><strong>Phone:</strong> {{ phone }}</p>
+        <p><strong>Company:</strong> {{ company }}</p>
+        <p><strong>Service Interest:</strong> {{ service_interest }}</p>
+        <p><strong>Date & Time:</strong> {{ date }} at {{ time }}</p>
+        <p><strong>Message:</strong> {{ message }}</p>
+        <p><strong>Booking ID:</strong> {{ booking_id }}</p>
+        """),
+    'booking': _default('booking', "Consultation Booking Confirmed - {{ date }} at {{ time }}", """
+        <h2>Consultation Booking Confirmed</h2>
+        <p>Dear {{ name }},</p>
+        <p>Your consultation has been successfully booked!</p>
+
+        <h3>Booking Details:</h3>
+        <p><strong>Date:</strong> {{ date }}</p>
+        <p><strong>Time:</strong> {{ time }}</p>
+        <p><strong>Service:</strong> {{ service_interest }}</p>
+        <p><strong>Booking ID:</strong> {{ booking_id }}</p>
+
+        <p>We will send you a meeting link closer to the appointment date.</p>
+        <p>If you need to reschedule or cancel, please contact us as soon as possible.</p>
+
+        <p>Best regards,<br>HD MONKS Team</p>
+        """),
+    'reminder': _default('reminder', "Reminder: Your consultation on {{ date }} at {{ time }}", """
+        <h2>Consultation Reminder</h2>
+        <p>Dear {{ name }},</p>
+        <p>This is a reminder of your upcoming consultation:</p>
+
+        <h3>Booking Details:</h3>
+        <p><strong>Date:</strong> {{ date }}</p>
+        <p><strong>Time:</strong> {{ time }}</p>
+        <p><strong>Service:</strong> {{ service_interest }}</p>
+
+        <p>We look forward to speaking with you!</p>
+
+        <p>Best regards,<br>HD MONKS Team</p>
+        """),
+}
+
+
+class TemplateSet:
+    """Compiled templates for one version of the collection, by template_type"""
+
+    def __init__(self, version: int, templates: Dict[str, CompiledTemplate]):
+        self.version = version
+        self._templates = templates
+
+    def get(self, template_type: str) -> Optional[CompiledTemplate]:
+        """Stored template of a type, else the built-in default, else None"""
+        return self._templates.get(template_type) or DEFAULT_TEMPLATES.get(template_type)
+
+    def render(self, template_type: str, context: Dict[str, Any]) -> Tuple[str, str]:
+        """Render (subject, html_body); raises KeyError for an unknown type"""
+        template = self.get(template_type)
+        if template is None:
+            raise KeyError(f"No email template of type '{template_type}'")
+        return template.render(context)
+
+
+class EmailTemplateCache:
+    """Compiled copy of the email_templates collection.
+
+    All templates are read in one query and compiled when the cache is first
+    used or after ``invalidate()``, which the admin template routes call on
+    every write; rendering an email never touches MongoDB.
+    ``EMAIL_TEMPLATE_CACHE_TTL`` (seconds, 0 disables) bounds staleness for
+    writes made by other processes. When several templates share a type the
+    first one in template_type order wins; invalid stored templates are
+    skipped with an error and the built-in default is used instead.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.ttl = float(os.environ.get('EMAIL_TEMPLATE_CACHE_TTL', '300'))
+        self._lock = asyncio.Lock()
+        self._loaded_version = -1
+        self._loaded_at = 0.0
+        self._snapshot = TemplateSet(-1, {})
+
+    def _is_fresh(self) -> bool:
+        if self._loaded_version != self.version:
+            return False
+        if self.ttl > 0 and time.monotonic() - self._loaded_at > self.ttl:
+            return False
+        return True
+
+    async def _ensure_loaded(self):
+        if self._is_fresh():
+            return
+
+        async with self._lock:
+            if self._is_fresh():
+                return
+
+            while True:
+                version = self.version
+                documents = await database.get_all_templates()
+                if version == self.version:
+                    break
+
+            templates: Dict[str, CompiledTemplate] = {}
+            for document in documents:
+                template_type = document.get('template_type')
+                if not template_type or template_type in templates:
+                    continue
+                try:
+                    templates[template_type] = CompiledTemplate.from_document(document)
+                except (TemplateError, KeyError) as e:
+                    logger.error(f"Skipping invalid email template {document.get('id')}: {str(e)}")
+
+            self._snapshot = TemplateSet(version, templates)
+            self._loaded_version = version
+            self._loaded_at = time.monotonic()
+            logger.info(f"Email template cache loaded: version {version}, {len(templates)} templates")
+
+    def invalidate(self):
+        """Drop the compiled templates; the next read reloads them"""
+        self.version += 1
+        logger.info(f"Email template cache invalidated: version {self.version}")
+
+    @property
+    def snapshot(self) -> TemplateSet:
+        """Last loaded templates without checking freshness (built-in defaults before the first load)"""
+        return self._snapshot
+
+    async def get_snapshot(self) -> TemplateSet:
+        """Current compiled templates, reloading them if stale"""
+        await self._ensure_loaded()
+        return self._snapshot
+
+
+# Singleton instance
+email_template_cache = EmailTemplateCache()
@@ -1,13 +1,21 @@
 #!/usr/bin/env python3
 """
-Migration script to fix services with missing or invalid relevant_for fields
-Run this after deployment to ensure all services are properly formatted
+Migration script to normalise stored services (missing id / service_id,
+missing or invalid relevant_for fields) in one bulk write.
+Run this after deployment: catalog reads no longer repair documents on the
+fly, they return what is stored.
+
+Run: python fix_services_migration.py [--dry-run]
 """
 
+import argparse
 import asyncio
 import sys
+from datetime import datetime
 from pathlib import Path
 
+from pymongo import UpdateOne
+
 # Add parent directory to path so we can import database
 sys.path.insert(0, str(Path(__file__).parent))
 
@@ -21,65 +29,52 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-async def fix_services_relevant_for():
-    """Fix all services with missing or invalid relevant_for fields"""
-    
+async def fix_services(dry_run: bool = False):
+    """Normalise every service document that does not match the write-time rules"""
+
     try:
         # Connect to database
         await database.connect()
         logger.info("Connected to MongoDB")
-        
-        # Get all stages
-        stages = await database.get_all_stages()
-        logger.info(f"Found {len(stages)} stages")
-        
-        fixed_count = 0
-        
-        for stage in stages:
-            if not stage.get('services'):
+
+        cursor = database.db.services.find({}, {"_id": 1, "id": 1, "service_id": 1, "relevant_for": 1})
+
+        operations = []
+        scanned = 0
+        async for service in cursor:
+            scanned += 1
+            original = {k: service.get(k) for k in ("id", "service_id", "relevant_for")}
+            fixed = database._sanitize_service(dict(original))
+            changes = {k: v for k, v in fixed.items() if original.get(k) != v}
+            if not changes:
                 continue
-            
-            services_to_update = []
-            
-            for service in stage['services']:
-                # Check if service needs fixing
-                if not isinstance(service.get('relevant_for'), list) or not service.get('relevant_for'):
-                    logger.warning(
-                        f"Stage {stage['id']}: Service {service.get('service_id')} has invalid relevant_for: {service.get('relevant_for')}"
-                    )
-                    services_to_update.append(service['service_id'])
-                    fixed_count += 1
-            
-            # Update services
-            for service_id in services_to_update:
-                logger.info(f"Fixing service {service_id} in stage {stage['id']}")
-                
-                update_data = {
-                    'relevant_for': ['startup', 'msme'],
-                    'updated_at': __import__('datetime').datetime.utcnow().isoformat()
-                }
-                
-                result = await database.db.stages.update_one(
-                    {"id": stage['id'], "services.service_id": service_id},
-                    {"$set": {"services.$.relevant_for": update_data['relevant_for'],
-                              "services.$.updated_at": update_data['updated_at']}}
-                )
-                
-                if result.modified_count > 0:
-                    logger.info(f"✓ Fixed service {service_id}")
-                else:
-                    logger.warning(f"✗ Failed to fix service {service_id}")
-        
-        logger.info(f"Migration complete! Fixed {fixed_count} services")
-        
+
+            logger.warning(f"Service {service.get('service_id')}: fixing {sorted(changes)}")
+            changes['updated_at'] = datetime.utcnow().isoformat()
+            operations.append(UpdateOne({"_id": service["_id"]}, {"$set": changes}))
+
+        logger.info(f"Scanned {scanned} services, {len(operations)} need fixing")
+
+        if operations and not dry_run:
+            result = await database.db.services.bulk_write(operations, ordered=False)
+            logger.info(f"✓ Fixed {result.modified_count} services")
+        elif dry_run:
+            logger.info("Dry run: no changes written")
+
+        logger.info("Migration complete!")
+
     except Exception as e:
         logger.error(f"Migration failed: {str(e)}")
         raise
-    
+
     finally:
         await database.close()
         logger.info("Disconnected from MongoDB")
 
 
 if __name__ == "__main__":
-    asyncio.run(fix_services_relevant_for())
+    parser = argparse.ArgumentParser(description="Normalise stored services")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    args = parser.parse_args()
+
+    asyncio.run(fix_services(dry_run=args.dry_run))
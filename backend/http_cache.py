@@ -0,0 +1,91 @@
+"""
+HTTP validators (ETag / If-None-Match) and Cache-Control for public read endpoints
+"""
+import hashlib
+import os
+from typing import Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+# Browsers and CDNs may reuse a response for max-age seconds, then keep serving
+# it for up to stale-while-revalidate seconds while revalidating in the background
+PUBLIC_CACHE_MAX_AGE = int(os.environ.get('PUBLIC_CACHE_MAX_AGE', '60'))
+PUBLIC_CACHE_STALE_WHILE_REVALIDATE = int(os.environ.get('PUBLIC_CACHE_STALE_WHILE_REVALIDATE', '600'))
+
+
+def compute_etag(body: bytes) -> str:
+    """Strong ETag derived from the identity-encoded response body"""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def public_cache_control() -> str:
+    return f"public, max-age={PUBLIC_CACHE_MAX_AGE}, stale-while-revalidate={PUBLIC_CACHE_STALE_WHILE_REVALIDATE}"
+
+
+def _opaque_tag(etag: str) -> str:
+    """Strip the weak prefix, quotes and any content-coding suffix from an entity tag"""
+    tag = etag.strip()
+    if tag.startswith('W/'):
+        tag = tag[2:]
+    tag = tag.strip('"')
+    for suffix in ('-gzip', '-br'):
+        if tag.endswith(suffix):
+            tag = tag[:-len(suffix)]
+    return tag
+
+
+def accepted_encodings(accept_encoding: str) -> set:
+    """Parse an Accept-Encoding header into the set of codings with q > 0"""
+    accepted = set()
+    for part in accept_encoding.lower().split(','):
+        coding, _, params = part.strip().partition(';')
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if q > 0:
+            accepted.add(coding.strip())
+    return accepted
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against our ETag (RFC 9110 13.1.2)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    wanted = _opaque_tag(etag)
+    return any(_opaque_tag(candidate) == wanted for candidate in if_none_match.split(','))
+
+
+def cached_json_response(request: Request, body: bytes, etag: str,
+                         content_encoding: Optional[str] = None,
+                         media_type: str = "application/json",
+                         cache_control: Optional[str] = None) -> Response:
+    """Return body with validators, or an empty 304 if the client already has it.
+
+    cache_control overrides the public max-age policy, e.g. "no-cache" for
+    data that must be revalidated on every use.
+    """
+    if content_encoding:
+        # Each content-coding is a distinct representation and needs its own strong ETag
+        etag = etag[:-1] + '-' + content_encoding + '"'
+
+    headers: Dict[str, str] = {
+        "ETag": etag,
+        "Cache-Control": cache_control or public_cache_control(),
+        "Vary": "Accept-Encoding",
+    }
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    if content_encoding:
+        headers["Content-Encoding"] = content_encoding
+    return Response(content=body, media_type=media_type, headers=headers)
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Index registry: every index the app's queries rely on, by collection.
+
+ensure_indexes() creates the registered indexes a database is missing and is
+safe to run on every startup. check_indexes() compares the registry with the
+database and reports missing, extra, conflicting (same name, different keys
+or options) and still-building indexes.
+
+Run: python indexes.py [--apply] [--drop-extra] [--collection NAME ...]
+Without flags it only reports; the exit status is 1 while anything is
+missing or conflicting.
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from pagination import KEYSET_SORT
+
+logger = logging.getLogger(__name__)
+
+
+def _index(keys, name: str, **options) -> IndexModel:
+    return IndexModel(keys, name=name, **options)
+
+
+def _unique_id(name: str) -> IndexModel:
+    return _index("id", name, unique=True)
+
+
+# Lists newest-first and the admin keyset pages (see pagination.KEYSET_SORT)
+def _keyset_indexes() -> List[IndexModel]:
+    return [
+        _index(KEYSET_SORT, "created_at_id"),
+        _index([("status", ASCENDING)] + KEYSET_SORT, "status_created_at_id"),
+    ]
+
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    # Catalog: stages with their services in a flattened collection
+    "stages": [_unique_id("stage_id_unique")],
+    "services": [
+        _index("service_id", "service_id_unique", unique=True),
+        _index([("stage_id", ASCENDING), ("position", ASCENDING)], "stage_position"),
+    ],
+
+    "contact_inquiries": [_unique_id("inquiry_id_unique")] + _keyset_indexes(),
+    "bookings": [
+        _unique_id("booking_id_unique"),
+        # Scans for confirmed bookings due a reminder (see booking_reminders.due_query)
+        _index([("status", ASCENDING), ("reminder_sent_at", ASCENDING), ("date", ASCENDING), ("time", ASCENDING)],
+               "reminder_due"),
+    ] + _keyset_indexes(),
+    "timeslots": [
+        # Not unique: it predates the registry and older slots may share ids
+        _index("id", "timeslot_id"),
+        # Generated and hand-made slots never collide
+        _index([("date", ASCENDING), ("time", ASCENDING)], "timeslot_date_time_unique", unique=True),
+        # Available-slot listings and the month calendar aggregation
+        _index([("is_available", ASCENDING), ("date", ASCENDING), ("time", ASCENDING)], "available_date_time"),
+    ],
+
+    "admins": [_index("username", "admin_username_unique", unique=True)],
+    "settings": [_unique_id("settings_id_unique")],
+    "analytics": [_index([("created_at", ASCENDING), ("event_type", ASCENDING)], "created_at_event_type")],
+
+    # Content: public lists filter on `published`, admin lists take everything
+    "blogs": [
+        _unique_id("blog_id_unique"),
+        _index("slug", "blog_slug"),
+        _index([("published", ASCENDING), ("created_at", DESCENDING)], "published_created_at"),
+        _index([("created_at", DESCENDING)], "created_at"),
+    ],
+    "faqs": [
+        _unique_id("faq_id_unique"),
+        _index([("published", ASCENDING), ("order", ASCENDING)], "published_order"),
+        _index("order", "order"),
+    ],
+    "testimonials": [
+        _unique_id("testimonial_id_unique"),
+        _index([("published", ASCENDING), ("created_at", DESCENDING)], "published_created_at"),
+        _index([("created_at", DESCENDING)], "created_at"),
+    ],
+    "packages": [
+        _unique_id("package_id_unique"),
+        _index([("published", ASCENDING), ("created_at", DESCENDING)], "published_created_at"),
+        _index([("created_at", DESCENDING)], "created_at"),
+    ],
+    "email_templates": [
+        _unique_id("template_id_unique"),
+        _index("template_type", "template_type"),
+    ],
+
+    # Partners and their clients; client lists match any of the three partner fields
+    "partners": [
+        _unique_id("partner_id_unique"),
+        _index("username", "partner_username_unique", unique=True),
+        _index([("category", ASCENDING), ("created_at", DESCENDING)], "category_created_at"),
+        _index(KEYSET_SORT, "created_at_id"),
+    ],
+    "clients": [
+        # Created by add_unique_index.py before the registry existed
+        _index([("partner_id", ASCENDING), ("id", ASCENDING)], "unique_client_per_partner", unique=True),
+        _index("id", "client_id"),
+        _index([("partner_id", ASCENDING), ("created_at", DESCENDING)], "partner_created_at"),
+        _index([("execution_partner_id", ASCENDING), ("created_at", DESCENDING)], "execution_partner_created_at"),
+        _index([("referral_partner_id", ASCENDING), ("created_at", DESCENDING)], "referral_partner_created_at"),
+        _index(KEYSET_SORT, "created_at_id"),
+    ],
+
+    # Email delivery
+    "email_outbox": [
+        _index("id", "outbox_id_unique", unique=True),
+        _index([("status", ASCENDING), ("next_attempt_at", ASCENDING)], "status_next_attempt"),
+    ],
+    "email_campaigns": [
+        _index("id", "campaign_id_unique", unique=True),
+        _index("status", "campaign_status"),
+    ],
+    "email_campaign_recipients": [
+        _index([("campaign_id", ASCENDING), ("email", ASCENDING)], "campaign_recipient_unique", unique=True),
+        _index([("campaign_id", ASCENDING), ("status", ASCENDING)], "campaign_recipient_status"),
+    ],
+
+    # Weekly availability rules that timeslots are generated from
+    "availability_rules": [_index("id", "availability_rule_id_unique", unique=True)],
+    "availability_blackouts": [_index("date", "blackout_date_unique", unique=True)],
+}
+
+# Index options compared between the registry and the database
+_COMPARED_OPTIONS = ("unique", "sparse", "partialFilterExpression", "expireAfterSeconds")
+
+
+def _registered(collections: Optional[Iterable[str]]) -> Dict[str, List[IndexModel]]:
+    if collections is None:
+        return INDEXES
+    unknown = [name for name in collections if name not in INDEXES]
+    if unknown:
+        raise KeyError(f"No registered indexes for: {', '.join(unknown)}")
+    return {name: INDEXES[name] for name in collections}
+
+
+def _key_list(keys) -> List[tuple]:
+    return [(field, direction) for field, direction in keys.items()] if hasattr(keys, "items") else list(keys)
+
+
+def _matches(model: IndexModel, info: Dict[str, Any]) -> bool:
+    """Whether an existing index (from index_information()) is the registered one"""
+    document = model.document
+    if _key_list(document["key"]) != [(field, int(direction)) for field, direction in info["key"]]:
+        return False
+    return all(bool(document.get(option)) == bool(info.get(option)) if option in ("unique", "sparse")
+               else document.get(option) == info.get(option)
+               for option in _COMPARED_OPTIONS)
+
+
+async def ensure_indexes(db, collections: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Create the registered indexes that `db` lacks.
+
+    Each index is created on its own, so one that cannot be built (duplicate
+    values under a unique index, or a same-named index with other options)
+    is logged and skipped without holding up the rest. Returns the created
+    index names and the failures, both as "collection.index".
+    """
+    created: List[str] = []
+    failed: Dict[str, str] = {}
+    for collection_name, models in _registered(collections).items():
+        collection = db[collection_name]
+        existing = await collection.index_information()
+        for model in models:
+            name = model.document["name"]
+            if name in existing:
+                continue
+            try:
+                await collection.create_indexes([model])
+                created.append(f"{collection_name}.{name}")
+            except Exception as e:
+                failed[f"{collection_name}.{name}"] = str(e)
+                logger.error(f"Failed to create index {collection_name}.{name}: {str(e)}")
+    if created:
+        logger.info(f"Created indexes: {', '.join(created)}")
+    return {"created": created, "failed": failed}
+
+
+async def _building_indexes(db) -> Optional[List[str]]:
+    """Index builds in progress on `db` as "collection.index", or None when
+    the server does not let us see them ($currentOp needs inprog rights)"""
+    pipeline = [
+        {"$currentOp": {"allUsers": True}},
+        {"$match": {"command.createIndexes": {"$exists": True}, "ns": {"$regex": f"^{db.name}\\."}}},
+    ]
+    try:
+        operations = await db.client.admin.aggregate(pipeline).to_list(length=None)
+    except Exception as e:
+        logger.warning(f"Cannot list index builds: {str(e)}")
+        return None
+    return [
+        f"{op['command']['createIndexes']}.{index.get('name')}"
+        for op in operations
+        for index in op["command"].get("indexes", [])
+    ]
+
+
+async def check_indexes(db, collections: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Compare `db` with the registry.
+
+    Returns "collection.index" names: `missing` (registered, not in the
+    database), `extra` (in the database, not registered; only for the given
+    collections when they are named), `conflicting` (same name, different
+    keys or options) and `building` (None when it cannot be read).
+    """
+    registered = _registered(collections)
+    names = list(registered) if collections is not None else sorted(
+        set(registered) | set(await db.list_collection_names())
+    )
+    report: Dict[str, Any] = {"missing": [], "extra": [], "conflicting": [], "building": None}
+    for collection_name in names:
+        if collection_name.startswith("system."):
+            continue
+        existing = await db[collection_name].index_information()
+        models = {model.document["name"]: model for model in registered.get(collection_name, [])}
+        for name, model in models.items():
+            if name not in existing:
+                report["missing"].append(f"{collection_name}.{name}")
+            elif not _matches(model, existing[name]):
+                report["conflicting"].append(f"{collection_name}.{name}")
+        report["extra"].extend(
+            f"{collection_name}.{name}" for name in existing if name != "_id_" and name not in models
+        )
+    report["building"] = await _building_indexes(db)
+    return report
+
+
+async def drop_extra_indexes(db, collections: Optional[Iterable[str]] = None) -> List[str]:
+    """Drop the indexes check_indexes() reports as extra; returns their names"""
+    dropped = []
+    for qualified in (await check_indexes(db, collections))["extra"]:
+        collection_name, name = qualified.split(".", 1)
+        await db[collection_name].drop_index(name)
+        dropped.append(qualified)
+    return dropped
+
+
+def _print_report(report: Dict[str, Any]):
+    for key in ("missing", "conflicting", "extra"):
+        names = report[key]
+        print(f"{key}: {len(names)}")
+        for name in names:
+            print(f"  {name}")
+    building = report["building"]
+    if building is None:
+        print("building: unknown (no permission to read $currentOp)")
+    else:
+        print(f"building: {len(building)}")
+        for name in building:
+            print(f"  {name}")
+
+
+async def main(args) -> bool:
+    from database import database
+
+    await database.connect()
+    try:
+        collections = args.collection or None
+        if args.apply:
+            result = await ensure_indexes(database.db, collections)
+            print(f"created: {len(result['created'])}")
+            for name in result["created"]:
+                print(f"  {name}")
+            for name, error in result["failed"].items():
+                print(f"  FAILED {name}: {error}")
+        if args.drop_extra:
+            for name in await drop_extra_indexes(database.db, collections):
+                print(f"dropped {name}")
+        report = await check_indexes(database.db, collections)
+        _print_report(report)
+        return not report["missing"] and not report["conflicting"]
+    finally:
+        await database.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--apply", action="store_true", help="create missing indexes")
+    parser.add_argument("--drop-extra", action="store_true", help="drop indexes that are not registered")
+    parser.add_argument("--collection", action="append", help="limit to a collection (repeatable)")
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(0 if asyncio.run(main(parser.parse_args())) else 1)
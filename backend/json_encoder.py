@@ -0,0 +1,101 @@
+"""
+Shared JSON encoder for API responses: one pass from MongoDB documents to bytes
+"""
+import asyncio
+import functools
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Callable
+from uuid import UUID
+
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import APIRoute, request_response
+from starlette.concurrency import run_in_threadpool
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib encoder is the fallback
+    orjson = None
+
+
+def _decimal(value: Decimal) -> Any:
+    # Same rule as FastAPI's jsonable_encoder
+    return int(value) if value.as_tuple().exponent >= 0 else float(value)
+
+
+def _default(value: Any) -> Any:
+    """Types neither encoder handles natively"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal128):
+        return _decimal(value.to_decimal())
+    if isinstance(value, Decimal):
+        return _decimal(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    # Pydantic models, enums, sets and anything else FastAPI knows how to encode
+    return jsonable_encoder(value, custom_encoder={ObjectId: str})
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps(payload: Any) -> bytes:
+        """Render a payload to compact UTF-8 JSON"""
+        return orjson.dumps(payload, default=_default, option=_ORJSON_OPTIONS)
+else:
+    def dumps(payload: Any) -> bytes:
+        """Render a payload to compact UTF-8 JSON"""
+        return json.dumps(
+            payload,
+            separators=(',', ':'),
+            ensure_ascii=False,
+            default=_default,
+        ).encode('utf-8')
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with the shared encoder (no jsonable_encoder pass)"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class FastJSONRoute(APIRoute):
+    """APIRoute whose endpoint results go straight to FastJSONResponse.
+
+    FastAPI runs jsonable_encoder over every return value that is not already
+    a Response, building a second copy of the document tree before rendering.
+    Routes without a response_model have nothing to validate, so their result
+    is wrapped in a FastJSONResponse directly.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        super().__init__(path, endpoint, **kwargs)
+        if self.response_model is not None:
+            return
+
+        call = self.dependant.call
+        is_coroutine = asyncio.iscoroutinefunction(call)
+        status_code = self.status_code
+
+        @functools.wraps(call)
+        async def render_endpoint(*args: Any, **kwargs: Any) -> Any:
+            if is_coroutine:
+                result = await call(*args, **kwargs)
+            else:
+                result = await run_in_threadpool(call, *args, **kwargs)
+            if isinstance(result, Response):
+                return result
+            if status_code is None:
+                return FastJSONResponse(result)
+            return FastJSONResponse(result, status_code=status_code)
+
+        self.dependant.call = render_endpoint
+        self.app = request_response(self.get_route_handler())
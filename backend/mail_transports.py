@@ -0,0 +1,55 @@
+"""
+Non-SMTP email transports: a maildir writer and a latency/failure injector.
+
+A transport has send(message) and close(), like SMTPConnectionPool.
+"""
+import mailbox
+import os
+import random
+import smtplib
+import threading
+import time
+from email.message import Message
+from typing import List, Optional
+
+
+class MaildirTransport:
+    """Writes each message as a file in a maildir (tmp/ then renamed into new/)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        # Maildir(create=True) skips the subdirectories when `path` already exists
+        for subdir in ('tmp', 'new', 'cur'):
+            os.makedirs(os.path.join(path, subdir), exist_ok=True)
+        self._maildir = mailbox.Maildir(path, create=False)
+        self._lock = threading.Lock()
+
+    def send(self, message: Message, from_addr: Optional[str] = None, to_addrs: Optional[List[str]] = None):
+        with self._lock:
+            self._maildir.add(message)
+
+    def close(self):
+        pass
+
+
+class FaultInjectingTransport:
+    """Wraps a transport, sleeping `latency` (+ up to `jitter`) seconds before
+    each send and failing a `failure_rate` fraction of sends with an SMTP error.
+    """
+
+    def __init__(self, transport, latency: float = 0.0, jitter: float = 0.0, failure_rate: float = 0.0):
+        self.transport = transport
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+
+    def send(self, message: Message, from_addr: Optional[str] = None, to_addrs: Optional[List[str]] = None):
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise smtplib.SMTPResponseException(451, b"Injected temporary failure")
+        self.transport.send(message, from_addr, to_addrs)
+
+    def close(self):
+        self.transport.close()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Migration script to move services embedded in `stages.services` into the
+flattened `services` collection (one document per service, keyed by a unique
+service_id and linked back to its stage by stage_id).
+
+Safe to re-run: services are upserted by service_id and the embedded array is
+only removed from a stage once all of its services have been copied.
+
+Run: python migrate_services_collection.py [--dry-run]
+"""
+
+import argparse
+import asyncio
+import sys
+from collections import Counter
+from pathlib import Path
+
+from pymongo import ReplaceOne, UpdateOne
+
+# Add parent directory to path so we can import database
+sys.path.insert(0, str(Path(__file__).parent))
+
+from database import database
+import logging
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+async def migrate_services(dry_run: bool = False) -> bool:
+    """Copy embedded services into the services collection and unset the arrays"""
+    try:
+        await database.connect()
+        logger.info("Connected to MongoDB")
+
+        stages = await database.db.stages.find(
+            {"services": {"$exists": True}},
+            {"_id": 0, "id": 1, "services": 1}
+        ).to_list(length=None)
+        logger.info(f"Found {len(stages)} stages with embedded services")
+
+        if not stages:
+            logger.info("Nothing to migrate")
+            await database.ensure_catalog_indexes()
+            return True
+
+        # A service_id must be unique across the whole catalog once flattened
+        counts = Counter(
+            service.get('service_id')
+            for stage in stages
+            for service in stage.get('services') or []
+        )
+        duplicates = [service_id for service_id, count in counts.items() if service_id and count > 1]
+        if duplicates:
+            logger.error(f"Cannot migrate: duplicate service_id values: {duplicates}")
+            logger.error("Give each service a unique service_id, then re-run this script")
+            return False
+
+        service_ops = []
+        stage_ops = []
+        for stage in stages:
+            for position, service in enumerate(stage.get('services') or []):
+                # Normalise on the way in, as the write path now does
+                service = database._sanitize_service(dict(service))
+                doc = {**service, "stage_id": stage['id'], "position": position}
+                service_ops.append(ReplaceOne({"service_id": service['service_id']}, doc, upsert=True))
+            stage_ops.append(UpdateOne({"id": stage['id']}, {"$unset": {"services": ""}}))
+
+        logger.info(f"{len(service_ops)} services to copy, {len(stage_ops)} stages to flatten")
+        if dry_run:
+            logger.info("Dry run: no changes written")
+            return True
+
+        await database.ensure_catalog_indexes()
+
+        result = await database.db.services.bulk_write(service_ops, ordered=False)
+        logger.info(f"✓ Services upserted: {result.upserted_count}, replaced: {result.modified_count}")
+
+        result = await database.db.stages.bulk_write(stage_ops, ordered=False)
+        logger.info(f"✓ Stages flattened: {result.modified_count}")
+
+        logger.info("Migration complete!")
+        return True
+
+    except Exception as e:
+        logger.error(f"Migration failed: {str(e)}")
+        raise
+
+    finally:
+        await database.close()
+        logger.info("Disconnected from MongoDB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move embedded stage services into the services collection")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    args = parser.parse_args()
+
+    success = asyncio.run(migrate_services(dry_run=args.dry_run))
+    sys.exit(0 if success else 1)
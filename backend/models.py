@@ -129,6 +129,46 @@ class TimeSlotCreate(BaseModel):
     time: str
 
 
+class TimeWindow(BaseModel):
+    start: str  # HH:MM
+    end: str  # HH:MM, exclusive
+
+
+class AvailabilityRule(BaseModel):
+    """Weekly availability; slots are generated from it on demand"""
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    weekday: int  # 0 = Monday ... 6 = Sunday
+    windows: List[TimeWindow]
+    slot_minutes: int = 60
+    valid_from: Optional[str] = None  # YYYY-MM-DD
+    valid_to: Optional[str] = None  # YYYY-MM-DD, inclusive
+    active: bool = True
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class AvailabilityRuleCreate(BaseModel):
+    weekday: int
+    windows: List[TimeWindow]
+    slot_minutes: int = 60
+    valid_from: Optional[str] = None
+    valid_to: Optional[str] = None
+    active: bool = True
+
+
+class AvailabilityRuleUpdate(BaseModel):
+    weekday: Optional[int] = None
+    windows: Optional[List[TimeWindow]] = None
+    slot_minutes: Optional[int] = None
+    valid_from: Optional[str] = None
+    valid_to: Optional[str] = None
+    active: Optional[bool] = None
+
+
+class BlackoutDate(BaseModel):
+    date: str  # YYYY-MM-DD; no generated slots on this day
+    reason: Optional[str] = None
+
+
 class ConsultationBooking(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     full_name: str
@@ -334,6 +374,42 @@ class TemplateUpdate(BaseModel):
     variables: Optional[List[str]] = None
 
 
+# Email Campaign Models
+class CampaignAudience(BaseModel):
+    source: str = "clients"  # clients, contact_inquiries, bookings, partners
+    status: Optional[str] = None  # inquiry/booking status filter
+    date_from: Optional[str] = None  # YYYY-MM-DD, on created_at
+    date_to: Optional[str] = None
+
+
+class CampaignCreate(BaseModel):
+    name: str
+    template_id: str
+    audience: CampaignAudience = CampaignAudience()
+    rate_limit: Optional[float] = None  # messages per second
+    concurrency: Optional[int] = None  # SMTP connections
+
+
+class EmailCampaign(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    name: str
+    template_id: str
+    audience: CampaignAudience
+    rate_limit: float
+    concurrency: int
+    status: str = "draft"  # draft, running, paused, completed, cancelled, failed
+    sent: int = 0
+    failed: int = 0
+    skipped: int = 0  # duplicate addresses
+    elapsed_seconds: float = 0.0
+    messages_per_second: float = 0.0
+    last_error: Optional[str] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
 # Settings Model
 class Settings(BaseModel):
     id: str = "settings"
@@ -0,0 +1,60 @@
+"""
+Keyset pagination helpers: opaque page cursors and date-range filters
+"""
+import base64
+import json
+from datetime import date, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+# Newest first; id breaks ties between documents created in the same instant
+KEYSET_SORT = [("created_at", -1), ("id", -1)]
+
+
+def encode_page_cursor(created_at: Any, doc_id: Any) -> str:
+    """Opaque token pointing just after the given (created_at, id)"""
+    raw = json.dumps([created_at, doc_id], separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_page_cursor(token: str) -> Tuple[Optional[str], str]:
+    """Inverse of encode_page_cursor; raises ValueError for a malformed token.
+
+    A valid payload is [created_at, id] with a string id and a string (or
+    null, for documents without one) created_at, so nothing else from the
+    client ends up in a query.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not (isinstance(payload, list) and len(payload) == 2
+            and (payload[0] is None or isinstance(payload[0], str)) and isinstance(payload[1], str)):
+        raise ValueError("Invalid cursor")
+    created_at, doc_id = payload
+    return created_at, doc_id
+
+
+def after_cursor_query(token: str) -> Dict[str, Any]:
+    """Filter matching the documents that sort after the cursor under KEYSET_SORT"""
+    created_at, doc_id = decode_page_cursor(token)
+    return {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "id": {"$lt": doc_id}},
+    ]}
+
+
+def created_at_range_query(date_from: Optional[str], date_to: Optional[str]) -> Dict[str, Any]:
+    """created_at filter for an inclusive YYYY-MM-DD range; raises ValueError for bad dates.
+
+    created_at is stored as an ISO string, so the range is compared as strings.
+    """
+    bounds: Dict[str, str] = {}
+    try:
+        if date_from:
+            bounds["$gte"] = date.fromisoformat(date_from).isoformat()
+        if date_to:
+            bounds["$lt"] = (date.fromisoformat(date_to) + timedelta(days=1)).isoformat()
+    except ValueError:
+        raise ValueError("Dates must be in YYYY-MM-DD format")
+    return {"created_at": bounds} if bounds else {}
@@ -9,11 +9,13 @@ from models import (
     ClientServiceCreate
 )
 from database import database
+from json_encoder import FastJSONResponse, FastJSONRoute
+from bson_json import RAW_BSON_LISTS, stream_json_list
 from partner_auth import verify_session, create_session
 
 logger = logging.getLogger(__name__)
 
-partner_router = APIRouter(prefix="/api/partner", tags=["Partner"])
+partner_router = APIRouter(prefix="/api/partner", tags=["Partner"], default_response_class=FastJSONResponse, route_class=FastJSONRoute)
 
 
 async def verify_partner_token(authorization: Optional[str] = Header(None)):
@@ -145,8 +147,9 @@ async def update_partner_profile(partner_update: PartnerUpdate, session: dict =
 async def list_clients(session: dict = Depends(verify_partner_token)):
     try:
         partner_id = session["partner_id"]
-        clients = await database.get_clients_by_partner(partner_id)
-        return {"success": True, "data": clients}
+        return await stream_json_list(
+            await database.get_clients_by_partner(partner_id, raw=RAW_BSON_LISTS, stream=True)
+        )
     except Exception as e:
         logger.error(f"Error listing clients: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -289,8 +289,9 @@ async def seed_stages_and_services():
         }
     ]
     
-    # Clear existing stages
+    # Clear existing stages and their services
     await db.db.stages.delete_many({})
+    await db.db.services.delete_many({})
     logger.info("Cleared existing stages")
     
     # Insert new stages
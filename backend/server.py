@@ -9,7 +9,8 @@ import uuid
 from pathlib import Path
 from typing import List, Optional
 from datetime import datetime
-from bson import ObjectId
+from pydantic import ValidationError
+from pymongo.errors import DuplicateKeyError
 
 from models import (
     Stage, Service, ContactInquiry, TimeSlot, ConsultationBooking,
@@ -17,24 +18,20 @@ from models import (
     ContactInquiryCreate, TimeSlotCreate, ConsultationBookingCreate
 )
 from database import database
+from availability import AvailabilityError, availability
+from catalog_cache import FieldsetError, catalog_cache, parse_fieldset
+from http_cache import cached_json_response, compute_etag
+from json_encoder import FastJSONResponse, FastJSONRoute, dumps
+from bson_json import RAW_BSON_LISTS, json_list_response, stream_json_list
+from compression import CompressionMiddleware
 from email_service import email_service
+from email_campaigns import campaign_runner
+from email_outbox import email_outbox
+from booking_reminders import booking_reminders
+from email_templates import email_template_cache
 from admin_routes import admin_router
 from partner_routes import partner_router
-
-def serialize_mongo(document):
-    if isinstance(document, list):
-        return [serialize_mongo(doc) for doc in document]
-
-    if isinstance(document, dict):
-        new_doc = {}
-        for k, v in document.items():
-            if isinstance(v, ObjectId):
-                new_doc[k] = str(v)
-            else:
-                new_doc[k] = serialize_mongo(v) if isinstance(v, (dict, list)) else v
-        return new_doc
-
-    return document
+from sitemap import sitemap_router
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -43,7 +40,7 @@ load_dotenv(ROOT_DIR / '.env')
 app = FastAPI(title="HD MONKS API", version="1.0.0")
 
 # Create a router with the /api prefix
-api_router = APIRouter(prefix="/api")
+api_router = APIRouter(prefix="/api", default_response_class=FastJSONResponse, route_class=FastJSONRoute)
 
 # Configure logging
 logging.basicConfig(
@@ -52,6 +49,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Settings fields only the admin API returns
+PRIVATE_SETTINGS = ('smtp_host', 'smtp_port', 'smtp_user', 'smtp_password', 'recipient_email')
+
 
 # ===== PUBLIC ROUTES =====
 
@@ -75,49 +75,84 @@ async def debug_origin(request: Request):
 
 
 @api_router.get("/stages")
-async def get_stages():
+async def get_stages(
+    request: Request,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. title,services.name"),
+    exclude: Optional[str] = Query(None, description="Comma-separated fields to omit, e.g. services.content_sections"),
+):
     """Get all stages with services"""
     try:
-        stages = await database.get_all_stages()
-        stages = serialize_mongo(stages)
-        return {"success": True, "data": stages}
+        snapshot = await catalog_cache.get_snapshot()
+        encoded = snapshot.stages_list(parse_fieldset(fields), parse_fieldset(exclude))
+        body, encoding = encoded.negotiate(request.headers.get("accept-encoding", ""))
+        return cached_json_response(request, body, encoded.etag, encoding)
+    except FieldsetError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching stages: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @api_router.get("/stages/{stage_id}")
-async def get_stage(stage_id: int):
+async def get_stage(
+    stage_id: int,
+    request: Request,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. title,services.name"),
+    exclude: Optional[str] = Query(None, description="Comma-separated fields to omit, e.g. services.content_sections"),
+):
     """Get a specific stage by ID"""
     try:
-        stage = await database.get_stage_by_id(stage_id)
-        stage = serialize_mongo(stage)
-        if not stage:
+        snapshot = await catalog_cache.get_snapshot()
+        encoded = snapshot.stage(stage_id, parse_fieldset(fields), parse_fieldset(exclude))
+        if not encoded:
             raise HTTPException(status_code=404, detail="Stage not found")
-        return {"success": True, "data": stage}
+        return cached_json_response(request, encoded.body, encoded.etag)
     except HTTPException:
         raise
+    except FieldsetError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching stage: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @api_router.get("/services/{service_id}")
-async def get_service(service_id: str):
+async def get_service(
+    service_id: str,
+    request: Request,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. name,price,duration"),
+    exclude: Optional[str] = Query(None, description="Comma-separated fields to omit, e.g. content_sections,features"),
+):
     """Get a specific service by service_id"""
     try:
-        service = await database.get_service_by_service_id(service_id)
-        service = serialize_mongo(service)
-        if not service:
+        snapshot = await catalog_cache.get_snapshot()
+        encoded = snapshot.service(service_id, parse_fieldset(fields), parse_fieldset(exclude))
+        if not encoded:
             raise HTTPException(status_code=404, detail="Service not found")
-        return {"success": True, "data": service}
+        return cached_json_response(request, encoded.body, encoded.etag)
     except HTTPException:
         raise
+    except FieldsetError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching service: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@api_router.get("/search")
+async def search_catalog(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(10, ge=1, le=50)
+):
+    """Search stages and services by name, description, details, features and content"""
+    try:
+        results = await catalog_cache.search(q, limit)
+        return {"success": True, "query": q, "data": results}
+    except Exception as e:
+        logger.error(f"Error searching catalog: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @api_router.post("/contact")
 async def submit_contact_inquiry(inquiry: ContactInquiryCreate):
     """Submit a contact inquiry"""
@@ -135,10 +170,15 @@ async def submit_contact_inquiry(inquiry: ContactInquiryCreate):
         
         # Save to database
         created_inquiry = await database.create_contact_inquiry(inquiry_data)
-        created_inquiry = serialize_mongo(created_inquiry)
         
-        # Send email notification
-        email_service.send_contact_inquiry_notification(created_inquiry)
+        # Queue email notification; the outbox worker delivers it
+        try:
+            templates = await email_template_cache.get_snapshot()
+            await email_outbox.enqueue(
+                email_service.build_contact_inquiry_messages(created_inquiry, templates), kind="contact_inquiry"
+            )
+        except Exception as email_error:
+            logger.error(f"Queueing inquiry emails failed: {email_error}")
         
         logger.info(f"Contact inquiry created: {created_inquiry['id']}")
         return {
@@ -157,24 +197,43 @@ async def submit_contact_inquiry(inquiry: ContactInquiryCreate):
 async def get_available_timeslots(date: Optional[str] = Query(None)):
     """Get available time slots"""
     try:
-        timeslots = await database.get_available_timeslots(date)
-        timeslots = serialize_mongo(timeslots)
-        return {"success": True, "data": timeslots}
+        # Create any rule-generated slots for the requested window first
+        await availability.materialize_for(date)
+        return await stream_json_list(await database.get_available_timeslots(date, stream=True))
+    except AvailabilityError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching timeslots: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@api_router.get("/timeslots/calendar")
+async def get_timeslot_calendar(request: Request, month: str = Query(..., description="YYYY-MM")):
+    """Open-slot count per day of a month, from today onwards"""
+    try:
+        body, etag = await availability.calendar_month(month)
+        # Counts change with every booking: clients revalidate (cheaply, via ETag) each time
+        return cached_json_response(request, body, etag, cache_control="no-cache")
+    except AvailabilityError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error fetching timeslot calendar: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @api_router.get("/settings")
-async def get_settings():
+async def get_settings(request: Request):
     """Get site settings"""
     try:
         settings = await database.get_settings()
-        return {"success": True, "data": settings}
+        if settings:
+            # SMTP credentials are live configuration; never expose them publicly
+            settings = {k: v for k, v in settings.items() if k not in PRIVATE_SETTINGS}
+        payload = {"success": True, "data": settings}
     except Exception as e:
         logger.error(f"Error fetching settings: {str(e)}")
         # Return default settings if not found
-        return {
+        payload = {
             "success": True,
             "data": {
                 "company_name": "HD MONKS",
@@ -187,6 +246,9 @@ async def get_settings():
             }
         }
 
+    body = dumps(payload)
+    return cached_json_response(request, body, compute_etag(body))
+
 
 #@api_router.post("/booking")
 #async def book_consultation(booking: ConsultationBookingCreate):
@@ -246,45 +308,53 @@ async def get_settings():
 @api_router.post("/booking")
 async def book_consultation(booking: ConsultationBookingCreate):
     """Book a consultation"""
+    created_booking = None
     try:
-        # 1️⃣ Check if timeslot exists
-        timeslot = await database.get_timeslot_by_id(booking.timeslot_id)
-        if not timeslot:
-            raise HTTPException(status_code=404, detail="Time slot not found")
-
-        # 2️⃣ Check availability
-        if not timeslot.get('is_available'):
-            raise HTTPException(status_code=400, detail="Time slot is no longer available")
-
-        # 3️⃣ Prepare booking data
+        # 1️⃣ Prepare booking data
         booking_dict = booking.dict()
 
-        if "name" in booking_dict and "full_name" not in booking_dict:
+        if not booking_dict.get("full_name") and booking_dict.get("name"):
             booking_dict["full_name"] = booking_dict.pop("name")
 
-        booking_obj = ConsultationBooking(
-            **booking_dict,
-            date=timeslot['date'],
-            time=timeslot['time']
-        )
+        if not booking_dict.get("full_name"):
+            raise HTTPException(status_code=400, detail="Missing full_name")
 
-        booking_data = booking_obj.dict()
+        booking_id = str(uuid.uuid4())
 
-        # 4️⃣ Save booking
-        created_booking = await database.create_booking(booking_data)
-        created_booking = serialize_mongo(created_booking)
+        # 2️⃣ Claim the slot atomically; concurrent requests for it get None
+        timeslot = await database.claim_timeslot(booking.timeslot_id, booking_id)
+        if not timeslot:
+            if not await database.get_timeslot_by_id(booking.timeslot_id):
+                raise HTTPException(status_code=404, detail="Time slot not found")
+            raise HTTPException(status_code=400, detail="Time slot is no longer available")
+        availability.slots_changed()
 
-        # 5️⃣ Mark slot unavailable (safe)
+        # 3️⃣ Save booking; give the slot back if that fails
         try:
-            await database.mark_timeslot_unavailable(booking.timeslot_id)
-        except Exception as slot_error:
-            logger.error(f"Timeslot update failed: {slot_error}")
-
-        # 6️⃣ Send email (safe)
+            booking_obj = ConsultationBooking(
+                **booking_dict,
+                id=booking_id,
+                date=timeslot['date'],
+                time=timeslot['time']
+            )
+            created_booking = await database.create_booking(booking_obj.dict())
+        except Exception as e:
+            await database.release_timeslot(booking.timeslot_id, booking_id)
+            availability.slots_changed()
+            if isinstance(e, ValidationError):
+                raise HTTPException(status_code=400, detail=str(e))
+            logger.error(f"Error saving booking: {str(e)}")
+            raise HTTPException(status_code=500, detail="Booking could not be saved")
+
+        # 4️⃣ Queue email (safe); the outbox worker delivers it
         try:
-            email_service.send_booking_confirmation(created_booking)
+            templates = await email_template_cache.get_snapshot()
+            await email_outbox.enqueue(
+                email_service.build_booking_confirmation_messages(created_booking, templates),
+                kind="booking_confirmation"
+            )
         except Exception as email_error:
-            logger.error(f"Email sending failed: {email_error}")
+            logger.error(f"Queueing booking emails failed: {email_error}")
 
         logger.info(f"Consultation booked successfully: {created_booking['id']}")
 
@@ -298,13 +368,15 @@ async def book_consultation(booking: ConsultationBookingCreate):
         raise
 
     except Exception as e:
-        # 🔥 CRITICAL: DO NOT FAIL USER IF BOOKING WAS SAVED
         logger.exception(f"Unexpected error in booking API: {e}")
+        if created_booking is None:
+            raise HTTPException(status_code=500, detail=str(e))
 
+        # 🔥 CRITICAL: DO NOT FAIL USER IF BOOKING WAS SAVED
         return {
             "success": True,
             "message": "Consultation booked successfully (email may be delayed).",
-            "data": created_booking if 'created_booking' in locals() else None
+            "data": created_booking
         }
 
 
@@ -324,9 +396,12 @@ async def create_stage(stage: StageCreate):
         stage_data = stage_obj.dict()
         
         created_stage = await database.create_stage(stage_data)
-        created_stage = serialize_mongo(created_stage)
+        catalog_cache.invalidate()
         logger.info(f"Stage created: {created_stage['id']}")
         return {"success": True, "data": created_stage}
+    except DuplicateKeyError as e:
+        logger.warning(f"Duplicate stage or service id: {str(e)}")
+        raise HTTPException(status_code=400, detail="A stage or service with this id already exists")
     except Exception as e:
         logger.error(f"Error creating stage: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -345,10 +420,10 @@ async def update_stage(stage_id: int, stage_update: StageUpdate):
         
         if not success:
             raise HTTPException(status_code=404, detail="Stage not found")
+        catalog_cache.invalidate()
         
         # Fetch and return the updated stage
         updated_stage = await database.get_stage_by_id(stage_id)
-        updated_stage = serialize_mongo(updated_stage)
         logger.info(f"Stage updated: {stage_id}")
         return {
             "success": True,
@@ -369,6 +444,7 @@ async def delete_stage(stage_id: int):
         success = await database.delete_stage(stage_id)
         if not success:
             raise HTTPException(status_code=404, detail="Stage not found")
+        catalog_cache.invalidate()
         
         logger.info(f"Stage deleted: {stage_id}")
         return {"success": True, "message": "Stage deleted successfully"}
@@ -385,37 +461,27 @@ async def add_service(stage_id: int, service: ServiceCreate):
     try:
         service_data = service.dict()
         
-        # Generate IDs if not provided
-        if not service_data.get('service_id'):
-            service_data['service_id'] = str(uuid.uuid4())
-        # Generate a unique id for the service (used as React key)
-        if not service_data.get('id'):
-            service_data['id'] = f"{service_data['service_id']}-{str(uuid.uuid4())[:8]}"
-        
-        # Ensure relevant_for is always a valid list
-        if not service_data.get('relevant_for') or (isinstance(service_data.get('relevant_for'), list) and len(service_data['relevant_for']) == 0):
-            service_data['relevant_for'] = ['startup', 'msme']
-        elif not isinstance(service_data['relevant_for'], list):
-            service_data['relevant_for'] = list(service_data['relevant_for']) if service_data['relevant_for'] else ['startup', 'msme']
-        
         # Add timestamps
         service_data['created_at'] = datetime.utcnow().isoformat()
         service_data['updated_at'] = datetime.utcnow().isoformat()
         
         logger.info(f"Adding service to stage {stage_id}: {service_data}")
         
-        success = await database.add_service_to_stage(stage_id, service_data)
-        if not success:
+        created_service = await database.add_service_to_stage(stage_id, service_data)
+        if not created_service:
             raise HTTPException(status_code=404, detail="Stage not found")
+        catalog_cache.invalidate()
         
-        logger.info(f"Service added to stage {stage_id}: {service_data['service_id']}")
+        logger.info(f"Service added to stage {stage_id}: {created_service['service_id']}")
         return {
             "success": True,
             "message": "Service added successfully",
-            "data": service_data
+            "data": created_service
         }
     except HTTPException:
         raise
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="A service with this service_id already exists")
     except Exception as e:
         logger.error(f"Error adding service: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -429,14 +495,6 @@ async def update_service(stage_id: int, service_id: str, service_update: Service
         if not update_data:
             raise HTTPException(status_code=400, detail="No update data provided")
         
-        # Ensure relevant_for is always a valid list if provided
-        if 'relevant_for' in update_data:
-            if not isinstance(update_data['relevant_for'], list):
-                update_data['relevant_for'] = list(update_data['relevant_for']) if update_data['relevant_for'] else ['startup', 'msme']
-            elif len(update_data['relevant_for']) == 0:
-                # If empty list was provided, set default
-                update_data['relevant_for'] = ['startup', 'msme']
-        
         update_data['updated_at'] = datetime.utcnow().isoformat()
         logger.info(f"Updating service {service_id} in stage {stage_id}: {update_data}")
         
@@ -444,10 +502,10 @@ async def update_service(stage_id: int, service_id: str, service_update: Service
         
         if not success:
             raise HTTPException(status_code=404, detail="Service not found")
+        catalog_cache.invalidate()
         
         # Fetch and return the updated service
         updated_service = await database.get_service_by_service_id(service_id)
-        updated_service = serialize_mongo(updated_service)
         
         logger.info(f"Service updated: {service_id} in stage {stage_id}")
         return {
@@ -469,6 +527,7 @@ async def delete_service(stage_id: int, service_id: str):
         success = await database.delete_service_from_stage(stage_id, service_id)
         if not success:
             raise HTTPException(status_code=404, detail="Service not found")
+        catalog_cache.invalidate()
         
         logger.info(f"Service deleted: {service_id} from stage {stage_id}")
         return {"success": True, "message": "Service deleted successfully"}
@@ -480,12 +539,23 @@ async def delete_service(stage_id: int, service_id: str):
 
 
 @api_router.get("/admin/inquiries")
-async def get_all_inquiries(skip: int = 0, limit: int = 100):
-    """Get all contact inquiries (Admin)"""
+async def get_all_inquiries(
+    status: Optional[str] = None,
+    date_from: Optional[str] = Query(None, description="Earliest created_at date, YYYY-MM-DD"),
+    date_to: Optional[str] = Query(None, description="Latest created_at date (inclusive), YYYY-MM-DD"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500)
+):
+    """Get contact inquiries, newest first, one page at a time (Admin)"""
     try:
-        inquiries = await database.get_all_inquiries(skip, limit)
-        inquiries = serialize_mongo(inquiries)
-        return {"success": True, "data": inquiries}
+        page = await database.get_inquiries_page(status, date_from, date_to, cursor, skip, limit, raw=RAW_BSON_LISTS)
+        extra = {"next_cursor": page["next_cursor"], "estimated_total": page["estimated_total"]}
+        if RAW_BSON_LISTS:
+            return json_list_response(page["items"], extra)
+        return {"success": True, "data": page["items"], **extra}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching inquiries: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -516,9 +586,11 @@ async def create_timeslot(timeslot: TimeSlotCreate):
         timeslot_data = timeslot_obj.dict()
         
         created_timeslot = await database.create_timeslot(timeslot_data)
-        created_timeslot = serialize_mongo(created_timeslot)
+        availability.slots_changed()
         logger.info(f"Timeslot created: {created_timeslot['id']}")
         return {"success": True, "data": created_timeslot}
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="A time slot already exists at that date and time")
     except Exception as e:
         logger.error(f"Error creating timeslot: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -540,10 +612,10 @@ async def update_timeslot(timeslot_id: str, timeslot_update: dict):
         
         if not success:
             raise HTTPException(status_code=404, detail="Timeslot not found")
+        availability.slots_changed()
         
         # Fetch and return the updated timeslot
         updated_timeslot = await database.get_timeslot_by_id(timeslot_id)
-        updated_timeslot = serialize_mongo(updated_timeslot)
         logger.info(f"Timeslot updated: {timeslot_id}")
         return {
             "success": True,
@@ -564,6 +636,7 @@ async def delete_timeslot(timeslot_id: str):
         success = await database.delete_timeslot(timeslot_id)
         if not success:
             raise HTTPException(status_code=404, detail="Timeslot not found")
+        availability.slots_changed()
         
         logger.info(f"Timeslot deleted: {timeslot_id}")
         return {"success": True, "message": "Timeslot deleted successfully"}
@@ -575,12 +648,23 @@ async def delete_timeslot(timeslot_id: str):
 
 
 @api_router.get("/admin/bookings")
-async def get_all_bookings(skip: int = 0, limit: int = 100):
-    """Get all consultation bookings (Admin)"""
+async def get_all_bookings(
+    status: Optional[str] = None,
+    date_from: Optional[str] = Query(None, description="Earliest created_at date, YYYY-MM-DD"),
+    date_to: Optional[str] = Query(None, description="Latest created_at date (inclusive), YYYY-MM-DD"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500)
+):
+    """Get consultation bookings, newest first, one page at a time (Admin)"""
     try:
-        bookings = await database.get_all_bookings(skip, limit)
-        bookings = serialize_mongo(bookings)
-        return {"success": True, "data": bookings}
+        page = await database.get_bookings_page(status, date_from, date_to, cursor, skip, limit, raw=RAW_BSON_LISTS)
+        extra = {"next_cursor": page["next_cursor"], "estimated_total": page["estimated_total"]}
+        if RAW_BSON_LISTS:
+            return json_list_response(page["items"], extra)
+        return {"success": True, "data": page["items"], **extra}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching bookings: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -617,6 +701,10 @@ else:
 
 logger.info(f"CORS allowed origins: {allow_origins}")
 
+# Registered first so it sits innermost: log_origin below re-streams every
+# body, and compressing before that keeps whole bodies (and the ETag cache) intact
+app.add_middleware(CompressionMiddleware)
+
 @app.middleware("http")
 async def log_origin(request: Request, call_next):
     origin = request.headers.get("origin")
@@ -668,6 +756,7 @@ app.add_middleware(
 app.include_router(api_router)
 app.include_router(admin_router)
 app.include_router(partner_router)
+app.include_router(sitemap_router)
 
 
 @app.on_event("startup")
@@ -680,11 +769,52 @@ async def startup_db_client():
         logger.error(f"Failed to initialize database on startup: {str(e)}")
         raise
 
+    try:
+        result = await database.ensure_indexes()
+        if result["failed"]:
+            # Usually duplicates blocking a unique index, e.g. service_ids left over
+            # from the embedded layout (run migrate_services_collection.py)
+            logger.error(f"{len(result['failed'])} indexes could not be created; run indexes.py for a report")
+    except Exception as e:
+        logger.error(f"Failed to create indexes: {str(e)}")
+
+    try:
+        unmigrated = await database.count_unmigrated_stages()
+        if unmigrated:
+            # Reads fall back to the embedded arrays, but writes only touch the services collection
+            logger.error(f"{unmigrated} stages still embed their services; run migrate_services_collection.py")
+    except Exception as e:
+        logger.error(f"Failed to check the services migration: {str(e)}")
+
+    try:
+        await email_service.refresh_settings(force=True)
+    except Exception as e:
+        logger.error(f"Failed to load email settings: {str(e)}")
+
+    try:
+        await email_outbox.start()
+    except Exception as e:
+        logger.error(f"Failed to start email outbox: {str(e)}")
+
+    try:
+        await campaign_runner.resume_running()
+    except Exception as e:
+        logger.error(f"Failed to resume email campaigns: {str(e)}")
+
+    try:
+        await booking_reminders.start()
+    except Exception as e:
+        logger.error(f"Failed to start booking reminders: {str(e)}")
+
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
     """Close database connection on application shutdown"""
     try:
+        await booking_reminders.stop()
+        await campaign_runner.stop()
+        await email_outbox.stop()
+        email_service.close()
         await database.close()
         logger.info("Database connection closed on shutdown")
     except Exception as e:
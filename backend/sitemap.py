@@ -0,0 +1,215 @@
+"""
+sitemap.xml and robots.txt generated from the live catalog and published blogs
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
+
+from catalog_cache import catalog_cache
+from database import database
+from http_cache import cached_json_response, compute_etag
+
+logger = logging.getLogger(__name__)
+
+SITE_URL = os.environ.get('SITE_URL', 'https://www.hdmonks.com').rstrip('/')
+# Frontend path of a blog post; {slug} is replaced with the URL-quoted slug.
+# Empty leaves blogs out: the frontend has no public blog route yet.
+SITEMAP_BLOG_PATH = os.environ.get('SITEMAP_BLOG_PATH', '')
+# The sitemap protocol allows at most 50,000 URLs per file
+SITEMAP_MAX_URLS = int(os.environ.get('SITEMAP_MAX_URLS', '50000'))
+SITEMAP_TTL = float(os.environ.get('SITEMAP_TTL', '3600'))
+
+XML_MEDIA_TYPE = "application/xml"
+
+sitemap_router = APIRouter(tags=["SEO"])
+
+
+def _lastmod(*values: Any) -> Optional[str]:
+    """Latest of the given timestamps as a W3C date, or None if none are set"""
+    dates = []
+    for value in values:
+        if isinstance(value, datetime):
+            dates.append(value.date().isoformat())
+        elif isinstance(value, str) and len(value) >= 10:
+            dates.append(value[:10])
+    return max(dates) if dates else None
+
+
+def _url_entry(loc: str, lastmod: Optional[str], changefreq: str, priority: str) -> str:
+    parts = [f"  <url>\n    <loc>{escape(loc)}</loc>\n"]
+    if lastmod:
+        parts.append(f"    <lastmod>{lastmod}</lastmod>\n")
+    parts.append(f"    <changefreq>{changefreq}</changefreq>\n    <priority>{priority}</priority>\n  </url>\n")
+    return ''.join(parts)
+
+
+def _urlset(entries: List[str]) -> bytes:
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        + ''.join(entries)
+        + '</urlset>\n'
+    ).encode('utf-8')
+
+
+def _sitemap_index(pages: List[Tuple[bytes, Optional[str]]]) -> bytes:
+    entries = []
+    for number, (_, lastmod) in enumerate(pages, start=1):
+        entry = f"  <sitemap>\n    <loc>{escape(SITE_URL)}/sitemap-{number}.xml</loc>\n"
+        if lastmod:
+            entry += f"    <lastmod>{lastmod}</lastmod>\n"
+        entries.append(entry + "  </sitemap>\n")
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        + ''.join(entries)
+        + '</sitemapindex>\n'
+    ).encode('utf-8')
+
+
+class SitemapCache:
+    """Rendered sitemap files, rebuilt only when the catalog or the blogs change.
+
+    The catalog is tracked through the content hash of the cached /api/stages
+    body; blog admin routes call ``invalidate_blogs()``. ``SITEMAP_TTL`` bounds
+    staleness for blog changes made by other processes.
+    """
+
+    def __init__(self):
+        self.blog_version = 0
+        self._lock = asyncio.Lock()
+        self._key: Optional[Tuple[str, int]] = None
+        self._built_at = 0.0
+        self._root: Optional[Tuple[bytes, str]] = None
+        self._pages: List[Tuple[bytes, str]] = []
+
+    def invalidate_blogs(self):
+        self.blog_version += 1
+
+    async def _build_entries(self, stages: List[Dict[str, Any]]) -> List[Tuple[str, Optional[str]]]:
+        entries: List[Tuple[str, Optional[str]]] = []
+
+        service_entries = []
+        for stage in stages:
+            for service in stage.get('services') or []:
+                if not service.get('service_id'):
+                    continue
+                lastmod = _lastmod(service.get('updated_at'), service.get('created_at'))
+                loc = f"{SITE_URL}/service/{quote(str(service['service_id']))}"
+                service_entries.append((_url_entry(loc, lastmod, "monthly", "0.8"), lastmod))
+
+        blog_entries = []
+        blogs = await database.get_published_blog_sitemap_entries() if SITEMAP_BLOG_PATH else []
+        for blog in blogs:
+            if not blog.get('slug'):
+                continue
+            lastmod = _lastmod(blog.get('updated_at'), blog.get('created_at'))
+            loc = SITE_URL + SITEMAP_BLOG_PATH.format(slug=quote(str(blog['slug'])))
+            blog_entries.append((_url_entry(loc, lastmod, "weekly", "0.6"), lastmod))
+
+        # The homepage lists every stage and service, so it changes whenever they do
+        home_lastmod = _lastmod(
+            *(stage.get('updated_at') for stage in stages),
+            *(lastmod for _, lastmod in service_entries)
+        )
+        entries.append((_url_entry(f"{SITE_URL}/", home_lastmod, "weekly", "1.0"), home_lastmod))
+        entries.extend(service_entries)
+        entries.extend(blog_entries)
+        return entries
+
+    async def _ensure_built(self):
+        snapshot = await catalog_cache.get_snapshot()
+        key = (snapshot.stages.etag, self.blog_version)
+        expired = SITEMAP_TTL > 0 and time.monotonic() - self._built_at > SITEMAP_TTL
+        if key == self._key and not expired:
+            return
+
+        async with self._lock:
+            expired = SITEMAP_TTL > 0 and time.monotonic() - self._built_at > SITEMAP_TTL
+            if key == self._key and not expired:
+                return
+
+            stages = await catalog_cache.get_all_stages()
+            entries = await self._build_entries(stages)
+
+            pages = []
+            for start in range(0, len(entries), SITEMAP_MAX_URLS):
+                chunk = entries[start:start + SITEMAP_MAX_URLS]
+                lastmod = _lastmod(*(lastmod for _, lastmod in chunk))
+                pages.append((_urlset([entry for entry, _ in chunk]), lastmod))
+
+            if len(pages) > 1:
+                root = _sitemap_index(pages)
+            else:
+                root = pages[0][0]
+
+            self._root = (root, compute_etag(root))
+            self._pages = [(body, compute_etag(body)) for body, _ in pages]
+            self._key = key
+            self._built_at = time.monotonic()
+            logger.info(f"Sitemap rebuilt: {len(entries)} URLs in {len(pages)} file(s)")
+
+    async def get_root(self) -> Tuple[bytes, str]:
+        """sitemap.xml: the urlset itself, or a sitemap index when split across files"""
+        await self._ensure_built()
+        return self._root
+
+    async def get_page(self, number: int) -> Optional[Tuple[bytes, str]]:
+        """sitemap-N.xml (1-based) when the sitemap is split"""
+        await self._ensure_built()
+        if len(self._pages) < 2 or not 1 <= number <= len(self._pages):
+            return None
+        return self._pages[number - 1]
+
+
+# Singleton instance
+sitemap_cache = SitemapCache()
+
+
+@sitemap_router.get("/sitemap.xml")
+async def get_sitemap(request: Request):
+    """Sitemap (or sitemap index) for the public site"""
+    try:
+        body, etag = await sitemap_cache.get_root()
+        return cached_json_response(request, body, etag, media_type=XML_MEDIA_TYPE)
+    except Exception as e:
+        logger.error(f"Error generating sitemap: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@sitemap_router.get("/sitemap-{number}.xml")
+async def get_sitemap_page(number: int, request: Request):
+    """One file of a sitemap split by SITEMAP_MAX_URLS"""
+    try:
+        page = await sitemap_cache.get_page(number)
+        if not page:
+            raise HTTPException(status_code=404, detail="Sitemap not found")
+        body, etag = page
+        return cached_json_response(request, body, etag, media_type=XML_MEDIA_TYPE)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error generating sitemap page: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@sitemap_router.get("/robots.txt")
+async def get_robots_txt():
+    """robots.txt pointing crawlers at the generated sitemap"""
+    body = (
+        "User-agent: *\n"
+        "Allow: /\n"
+        "Disallow: /admin\n"
+        "Disallow: /partner\n"
+        "\n"
+        f"Sitemap: {SITE_URL}/sitemap.xml\n"
+    )
+    return Response(content=body, media_type="text/plain")
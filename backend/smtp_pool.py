@@ -0,0 +1,139 @@
+"""
+Pool of authenticated SMTP connections shared by all email sends
+"""
+import logging
+import smtplib
+import threading
+import time
+from email.message import Message
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Errors after which the connection cannot be trusted and is thrown away
+_CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError)
+
+
+class _PooledConnection:
+    __slots__ = ('smtp', 'created_at', 'last_used', 'messages_sent')
+
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.messages_sent = 0
+
+
+class SMTPConnectionPool:
+    """Keeps up to `max_size` logged-in SMTP sessions open and reuses them.
+
+    Connecting, STARTTLS and LOGIN happen once per connection instead of once
+    per message. Idle connections are closed after `idle_timeout` seconds
+    (before the server drops them), a connection is recycled after
+    `max_messages_per_connection` messages, and a send that fails because the
+    connection went away is retried once on a fresh connection. Thread-safe:
+    sends run in worker threads.
+    """
+
+    def __init__(self, host: str, port: int, username: str = '', password: str = '',
+                 starttls: bool = True, max_size: int = 2, idle_timeout: float = 60.0,
+                 timeout: float = 30.0, max_messages_per_connection: int = 100):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.max_size = max(1, max_size)
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.max_messages_per_connection = max_messages_per_connection
+
+        self._idle: List[_PooledConnection] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_size)
+        self._closed = False
+        self.connections_opened = 0
+
+    def _connect(self) -> _PooledConnection:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+        except Exception:
+            self._quit(smtp)
+            raise
+        self.connections_opened += 1
+        return _PooledConnection(smtp)
+
+    @staticmethod
+    def _quit(smtp: smtplib.SMTP):
+        try:
+            smtp.quit()
+        except Exception:
+            smtp.close()
+
+    def _acquire(self) -> _PooledConnection:
+        if not self._slots.acquire(timeout=self.timeout):
+            raise smtplib.SMTPException("Timed out waiting for a pooled SMTP connection")
+        try:
+            now = time.monotonic()
+            while True:
+                with self._lock:
+                    connection = self._idle.pop() if self._idle else None
+                if connection is None:
+                    return self._connect()
+                if now - connection.last_used < self.idle_timeout:
+                    return connection
+                self._quit(connection.smtp)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, connection: _PooledConnection, reusable: bool = True):
+        try:
+            connection.last_used = time.monotonic()
+            if (reusable and not self._closed
+                    and connection.messages_sent < self.max_messages_per_connection):
+                with self._lock:
+                    self._idle.append(connection)
+            else:
+                self._quit(connection.smtp)
+        finally:
+            self._slots.release()
+
+    def send(self, message: Message, from_addr: Optional[str] = None, to_addrs: Optional[List[str]] = None):
+        """Send one message on a pooled connection; raises smtplib errors on failure"""
+        for attempt in (1, 2):
+            connection = self._acquire()
+            # Never released before means it was opened just now
+            fresh = connection.last_used == connection.created_at
+            try:
+                connection.smtp.send_message(message, from_addr, to_addrs)
+            except _CONNECTION_ERRORS as e:
+                self._release(connection, reusable=False)
+                if attempt == 2 or fresh:
+                    # Only a stale idle connection is worth retrying on a new one
+                    raise
+                logger.info(f"SMTP connection lost ({str(e)}), retrying on a new connection")
+                continue
+            except smtplib.SMTPException:
+                # Refused sender/recipient etc.: the session itself is still usable
+                try:
+                    connection.smtp.rset()
+                    self._release(connection)
+                except Exception:
+                    self._release(connection, reusable=False)
+                raise
+            connection.messages_sent += 1
+            self._release(connection)
+            return
+
+    def close(self):
+        """Close idle connections; connections in use are closed when released"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            self._quit(connection.smtp)
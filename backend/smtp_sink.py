@@ -0,0 +1,135 @@
+"""
+In-process SMTP sink for benchmarks and local development: accepts any login,
+keeps every message in memory, and can be made slow or failing.
+"""
+import email
+import socketserver
+import threading
+import time
+from email.message import Message
+from typing import List, Tuple
+
+# Failure modes
+SINK_OK = "ok"
+SINK_REJECT = "reject"  # 451 temporary failure at end of DATA
+SINK_DISCONNECT = "disconnect"  # drop the connection after the greeting
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Speaks just enough SMTP (no TLS) for smtplib clients"""
+
+    def reply(self, line: str):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.wfile.write(line.encode('ascii') + b'\r\n')
+
+    def handle(self):
+        with self.server.lock:
+            self.server.connections += 1
+        if self.server.failure == SINK_DISCONNECT:
+            return
+        self.reply("220 sink ESMTP ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip().split(' ', 1)[0].upper()
+            if command in ('EHLO', 'HELO'):
+                self.reply("250-sink\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME")
+            elif command == 'AUTH':
+                self.reply("235 2.7.0 Authentication successful")
+            elif command == 'DATA':
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    data_line = self.rfile.readline()
+                    if data_line in (b'.\r\n', b''):
+                        break
+                    # Undo dot-stuffing
+                    lines.append(data_line[1:] if data_line.startswith(b'..') else data_line)
+                if self.server.failure == SINK_REJECT:
+                    self.reply("451 4.3.0 Temporary failure, try again later")
+                    continue
+                self.server.store(b''.join(lines))
+                self.reply("250 2.0.0 Ok: queued")
+            elif command == 'QUIT':
+                self.reply("221 2.0.0 Bye")
+                return
+            else:
+                # MAIL, RCPT, RSET, NOOP
+                self.reply("250 2.0.0 Ok")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """SMTP server on 127.0.0.1 (a free port by default) that stores what it receives.
+
+    `latency` (seconds) is slept before every reply to model a slow or
+    distant provider; `failure` is SINK_OK, SINK_REJECT or SINK_DISCONNECT.
+    Both may be changed while the sink is running. Use as a context manager
+    or call start() and shutdown().
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port: int = 0, latency: float = 0.0, failure: str = SINK_OK):
+        super().__init__(('127.0.0.1', port), SMTPSinkHandler)
+        self.latency = latency
+        self.failure = failure
+        self.lock = threading.Lock()
+        self.received = threading.Condition(self.lock)
+        self.connections = 0
+        self.messages: List[Tuple[float, Message]] = []
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def store(self, raw: bytes):
+        with self.received:
+            self.messages.append((time.monotonic(), email.message_from_bytes(raw)))
+            self.received.notify_all()
+
+    def wait_for(self, count: int, timeout: float) -> bool:
+        """Block until at least `count` messages arrived; False on timeout"""
+        with self.received:
+            return self.received.wait_for(lambda: len(self.messages) >= count, timeout)
+
+    def reset(self):
+        with self.lock:
+            self.connections = 0
+            self.messages = []
+
+    def start(self) -> 'SMTPSink':
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __enter__(self) -> 'SMTPSink':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a local SMTP sink (set SMTP_STARTTLS=false in the app)")
+    parser.add_argument("--port", type=int, default=1025)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--failure", choices=[SINK_OK, SINK_REJECT, SINK_DISCONNECT], default=SINK_OK)
+    args = parser.parse_args()
+
+    sink = SMTPSink(args.port, args.latency_ms / 1000, args.failure)
+    print(f"SMTP sink listening on 127.0.0.1:{sink.port}")
+    try:
+        count = 0
+        sink.start()
+        while True:
+            sink.wait_for(count + 1, timeout=None)
+            for _, message in sink.messages[count:]:
+                print(f"{message['To']}: {message['Subject']}")
+            count = len(sink.messages)
+    except KeyboardInterrupt:
+        sink.shutdown()
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import axios from 'axios';
-import { Calendar, Clock, CheckCircle2, X } from 'lucide-react';
+import { Calendar, Clock, CheckCircle2, X, ChevronLeft, ChevronRight } from 'lucide-react';
 import { Button } from '../components/ui/button';
 import { Card } from '../components/ui/card';
 import { Dialog, DialogContent, DialogHeader, DialogTitle } from '../components/ui/dialog';
@@ -9,8 +9,20 @@ import { toast } from 'sonner';
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+const currentMonth = () => new Date().toISOString().slice(0, 7);
+
+const shiftMonth = (month, delta) => {
+  const [year, m] = month.split('-').map(Number);
+  const date = new Date(Date.UTC(year, m - 1 + delta, 1));
+  return date.toISOString().slice(0, 7);
+};
+
 const BookingCalendar = ({ isOpen, onClose }) => {
+  const [month, setMonth] = useState(currentMonth());
+  const [openDays, setOpenDays] = useState({});
+  const [selectedDate, setSelectedDate] = useState(null);
   const [timeslots, setTimeslots] = useState([]);
+  const [loadingDay, setLoadingDay] = useState(false);
   const [selectedSlot, setSelectedSlot] = useState(null);
   const [formData, setFormData] = useState({
     full_name: '',
@@ -25,34 +37,57 @@ const BookingCalendar = ({ isOpen, onClose }) => {
 
   useEffect(() => {
     if (isOpen) {
-      fetchTimeslots();
+      fetchCalendar(month);
     }
-  }, [isOpen]);
+  }, [isOpen, month]);
 
-  const fetchTimeslots = async () => {
+  // Per-day open-slot counts for the month; the slots themselves are fetched per day
+  const fetchCalendar = async (targetMonth) => {
     try {
       setLoading(true);
-      const response = await axios.get(`${API}/timeslots?t=${Date.now()}`);
+      const response = await axios.get(`${API}/timeslots/calendar`, { params: { month: targetMonth } });
       if (response.data.success) {
-        setTimeslots(response.data.data);
+        setOpenDays(response.data.data.days);
       }
     } catch (error) {
-      console.error('Error fetching timeslots:', error);
+      console.error('Error fetching calendar:', error);
       toast.error('Failed to load available time slots');
     } finally {
       setLoading(false);
     }
   };
 
-  const groupSlotsByDate = () => {
-    const grouped = {};
-    timeslots.forEach(slot => {
-      if (!grouped[slot.date]) {
-        grouped[slot.date] = [];
+  const fetchTimeslots = async (date) => {
+    try {
+      setLoadingDay(true);
+      const response = await axios.get(`${API}/timeslots`, { params: { date } });
+      if (response.data.success) {
+        setTimeslots(response.data.data);
       }
-      grouped[slot.date].push(slot);
-    });
-    return grouped;
+    } catch (error) {
+      console.error('Error fetching timeslots:', error);
+      toast.error('Failed to load available time slots');
+    } finally {
+      setLoadingDay(false);
+    }
+  };
+
+  const handleDateSelect = (date) => {
+    setSelectedDate(date);
+    setSelectedSlot(null);
+    fetchTimeslots(date);
+  };
+
+  const handleMonthChange = (delta) => {
+    setMonth(prev => shiftMonth(prev, delta));
+    setSelectedDate(null);
+    setSelectedSlot(null);
+    setTimeslots([]);
+  };
+
+  const formatMonth = (monthStr) => {
+    const [year, m] = monthStr.split('-').map(Number);
+    return new Date(year, m - 1, 1).toLocaleDateString('en-US', { month: 'long', year: 'numeric' });
   };
 
   const formatDate = (dateStr) => {
@@ -112,6 +147,9 @@ const BookingCalendar = ({ isOpen, onClose }) => {
           toast.error('Network error - please check your connection and try again');
         } else if (error.response?.status === 400) {
           toast.error(error.response?.data?.detail || 'Invalid booking data');
+          // The slot may have just been taken; show what is left
+          fetchCalendar(month);
+          if (selectedDate) fetchTimeslots(selectedDate);
         } else if (error.response?.status === 404) {
         toast.error('Time slot is no longer available');
         } else {
@@ -120,8 +158,7 @@ const BookingCalendar = ({ isOpen, onClose }) => {
       }
     };
 
-  const groupedSlots = groupSlotsByDate();
-  const dates = Object.keys(groupedSlots).sort();
+  const dates = Object.keys(openDays).sort();
 
   return (
     <Dialog open={isOpen} onOpenChange={onClose}>
@@ -138,19 +175,53 @@ const BookingCalendar = ({ isOpen, onClose }) => {
           <div>
             <h3 className="font-semibold text-lg mb-4">Select Date & Time</h3>
             
+            <div className="flex items-center justify-between mb-3">
+              <button
+                type="button"
+                onClick={() => handleMonthChange(-1)}
+                disabled={month <= currentMonth()}
+                className="p-1 rounded hover:bg-gray-100 disabled:opacity-30"
+              >
+                <ChevronLeft className="h-5 w-5" />
+              </button>
+              <span className="font-medium text-gray-700">{formatMonth(month)}</span>
+              <button type="button" onClick={() => handleMonthChange(1)} className="p-1 rounded hover:bg-gray-100">
+                <ChevronRight className="h-5 w-5" />
+              </button>
+            </div>
+
             {loading ? (
               <div className="text-center py-8 text-gray-500">Loading available slots...</div>
             ) : dates.length === 0 ? (
-              <div className="text-center py-8 text-gray-500">No available slots at the moment</div>
+              <div className="text-center py-8 text-gray-500">No available slots this month</div>
             ) : (
               <div className="space-y-4 max-h-96 overflow-y-auto pr-2">
-                {dates.map(date => (
-                  <div key={date} className="space-y-2">
-                    <h4 className="font-medium text-gray-700 sticky top-0 bg-white py-2">
+                <div className="grid grid-cols-3 gap-2">
+                  {dates.map(date => (
+                    <button
+                      key={date}
+                      onClick={() => handleDateSelect(date)}
+                      className={`p-2 text-sm rounded-lg border transition-all duration-200 ${
+                        selectedDate === date
+                          ? 'bg-orange-500 text-white border-orange-500'
+                          : 'bg-white hover:border-orange-300 hover:bg-orange-50 border-gray-300'
+                      }`}
+                    >
                       {formatDate(date)}
+                      <span className="block text-xs opacity-75">{openDays[date]} open</span>
+                    </button>
+                  ))}
+                </div>
+                {selectedDate && (
+                  <div className="space-y-2">
+                    <h4 className="font-medium text-gray-700 sticky top-0 bg-white py-2">
+                      {formatDate(selectedDate)}
                     </h4>
+                    {loadingDay ? (
+                      <div className="text-center py-4 text-gray-500">Loading times...</div>
+                    ) : (
                     <div className="grid grid-cols-3 gap-2">
-                      {groupedSlots[date].map(slot => (
+                      {timeslots.map(slot => (
                         <button
                           key={slot.id}
                           onClick={() => handleSlotSelect(slot)}
@@ -165,8 +236,9 @@ const BookingCalendar = ({ isOpen, onClose }) => {
                         </button>
                       ))}
                     </div>
+                    )}
                   </div>
-                ))}
+                )}
               </div>
             )}
 
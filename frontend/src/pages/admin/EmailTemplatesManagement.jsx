@@ -108,7 +108,10 @@ const EmailTemplatesManagement = () => {
             <input type="text" placeholder="Email Subject" value={formData.subject} onChange={e => setFormData({...formData, subject: e.target.value})} className="w-full px-3 py-2 border rounded-lg" required />
             <select value={formData.template_type} onChange={e => setFormData({...formData, template_type: e.target.value})} className="w-full px-3 py-2 border rounded-lg">
               <option value="contact">Contact Inquiry</option>
+              <option value="contact_admin">Contact Inquiry (Admin Notification)</option>
               <option value="booking">Booking Confirmation</option>
+              <option value="booking_admin">Booking Confirmation (Admin Notification)</option>
+              <option value="reminder">Booking Reminder</option>
               <option value="newsletter">Newsletter</option>
             </select>
             <div>
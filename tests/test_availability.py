@@ -0,0 +1,16 @@
+from datetime import date
+
+import pytest
+
+from availability import AvailabilityError, parse_month
+
+
+def test_parse_month_bounds():
+    assert parse_month("2026-02") == (date(2026, 2, 1), date(2026, 2, 28))
+    assert parse_month("2026-12") == (date(2026, 12, 1), date(2026, 12, 31))
+
+
+@pytest.mark.parametrize("value", ["2026-13", "2026", "abc", "9999-12", "0-01"])
+def test_parse_month_rejects_invalid(value):
+    with pytest.raises(AvailabilityError):
+        parse_month(value)
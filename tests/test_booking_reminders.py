@@ -0,0 +1,29 @@
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+import booking_reminders
+from booking_reminders import due_query, reminder_window
+
+
+def test_window_uses_business_timezone_across_the_utc_date(monkeypatch):
+    monkeypatch.setattr(booking_reminders, "BUSINESS_TIMEZONE", ZoneInfo("Asia/Kolkata"))
+    monkeypatch.setattr(booking_reminders, "BOOKING_REMINDER_LEAD_HOURS", 24)
+
+    # 20:00 UTC on the 16th is 01:30 IST on the 17th
+    start, end = reminder_window(datetime(2026, 10, 16, 20, 0, tzinfo=timezone.utc))
+    assert (start.strftime('%Y-%m-%d %H:%M'), end.strftime('%Y-%m-%d %H:%M')) == (
+        "2026-10-17 01:30", "2026-10-18 01:30"
+    )
+    assert due_query(start, end)["$or"] == [
+        {"date": "2026-10-17", "time": {"$gte": "01:30"}},
+        {"date": {"$gt": "2026-10-17", "$lt": "2026-10-18"}},
+        {"date": "2026-10-18", "time": {"$lte": "01:30"}},
+    ]
+
+
+def test_naive_now_is_utc(monkeypatch):
+    monkeypatch.setattr(booking_reminders, "BUSINESS_TIMEZONE", ZoneInfo("Asia/Kolkata"))
+    monkeypatch.setattr(booking_reminders, "BOOKING_REMINDER_LEAD_HOURS", 2)
+
+    start, end = reminder_window(datetime(2026, 10, 16, 3, 0))
+    assert due_query(start, end)["$or"] == [{"date": "2026-10-16", "time": {"$gte": "08:30", "$lte": "10:30"}}]
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from catalog_cache import CatalogSnapshot, FieldsetError, normalize_projection, parse_fieldset, project_document
+
+STAGES = [{
+    "id": 1, "title": "Start", "subtitle": "s", "phase": "p", "extra": "stored only",
+    "services": [
+        {"service_id": "gst", "name": "GST", "price": "999", "features": ["a"]},
+        {"service_id": "roc", "name": "ROC", "price": "1999", "features": []},
+    ],
+}]
+
+
+def snapshot(stages=STAGES):
+    services = {service["service_id"]: service for stage in stages for service in stage["services"]}
+    return CatalogSnapshot(1, stages, {stage["id"]: stage for stage in stages}, services)
+
+
+def data(encoded):
+    return json.loads(encoded.body)["data"]
+
+
+def test_model_fields_are_valid_on_an_empty_catalog():
+    empty = snapshot([])
+    assert data(empty.stages_list(parse_fieldset("title,services.name"), None)) == []
+    assert data(empty.stages_list(None, parse_fieldset("services.content_sections"))) == []
+
+
+def test_fields_missing_from_every_document_are_still_valid():
+    body = data(snapshot().stages_list(None, parse_fieldset("services.content_sections,subtitle")))
+    assert "subtitle" not in body[0]
+    assert body[0]["services"][0]["name"] == "GST"
+
+
+def test_stored_extra_fields_are_accepted():
+    assert data(snapshot().stages_list(parse_fieldset("extra"), None)) == [{"extra": "stored only"}]
+
+
+@pytest.mark.parametrize("fields, exclude", [("nope", None), (None, "services.nope"), ("services.name.x", None)])
+def test_unknown_fields_are_rejected(fields, exclude):
+    with pytest.raises(FieldsetError):
+        snapshot().stages_list(parse_fieldset(fields), parse_fieldset(exclude))
+
+
+def test_service_paths_are_service_level():
+    catalog = snapshot()
+    assert data(catalog.service("gst", parse_fieldset("name,price"), None)) == {"name": "GST", "price": "999"}
+    with pytest.raises(FieldsetError):
+        catalog.service("gst", parse_fieldset("services.name"), None)
+
+
+def test_normalize_collapses_children_and_drops_unselected_exclusions():
+    known = {"title", "services", "services.name", "services.price"}
+    assert normalize_projection(("services", "services.name"), ("services.price", "title"), known) == (
+        ("services",), ("services.price",)
+    )
+    assert normalize_projection(None, None, known) == (None, None)
+
+
+def test_equivalent_projections_share_one_body():
+    catalog = snapshot()
+    first = catalog.stages_list(("services", "services.name"), ("title",))
+    assert catalog.stages_list(("services",), None) is first
+    assert catalog.stages_list(None, None) is catalog.stages
+    assert first.gzip_body is None and first.br_body is None
+
+
+def test_project_document_descends_into_lists():
+    projected = project_document(STAGES, ("services.name",), None)
+    assert projected == [{"services": [{"name": "GST"}, {"name": "ROC"}]}]
+    excluded = project_document(STAGES[0]["services"], None, ("features", "price"))
+    assert excluded == [{"service_id": "gst", "name": "GST"}, {"service_id": "roc", "name": "ROC"}]
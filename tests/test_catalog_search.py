@@ -0,0 +1,92 @@
+import copy
+
+import pytest
+
+from catalog_search import CatalogSearchIndex, tokenize
+
+CATALOG = [
+    {
+        "id": 1,
+        "title": "Ideation",
+        "subtitle": "Shape the business",
+        "services": [
+            {"service_id": "trademark", "name": "Trademark Registration",
+             "description": "Protect your brand name and logo", "features": ["Search", "Filing"]},
+            {"service_id": "pitch-deck", "name": "Pitch Deck",
+             "description": "Investor presentation covering your trademark strategy"},
+        ],
+    },
+    {
+        "id": 2,
+        "title": "Incorporation",
+        "subtitle": "Register the company",
+        "services": [
+            {"service_id": "pvt-ltd", "name": "Private Limited Company",
+             "description": "<p>Company registration with <b>directors</b> and shares</p>"},
+        ],
+    },
+]
+
+
+@pytest.fixture
+def index():
+    index = CatalogSearchIndex()
+    index.sync(copy.deepcopy(CATALOG))
+    return index
+
+
+def keys(results):
+    return [result.get("service_id") or f"stage:{result['id']}" for result in results]
+
+
+def test_tokenize_strips_tags_stopwords_and_plurals():
+    assert tokenize("<p>The Directors of your Services</p>") == ["director", "service"]
+
+
+def test_name_match_outranks_description_match(index):
+    results = index.search("trademark")
+    assert keys(results) == ["trademark", "pitch-deck"]
+    assert results[0]["score"] > results[1]["score"] > 0
+
+
+def test_every_query_term_adds_to_the_score(index):
+    results = index.search("company directors")
+    assert keys(results) == ["pvt-ltd", "stage:2"]
+    assert results[0]["score"] > index.search("company")[0]["score"]
+
+
+def test_results_carry_stage_context(index):
+    [result] = index.search("shares")
+    assert result["type"] == "service"
+    assert (result["stage_id"], result["stage_title"]) == (2, "Incorporation")
+
+
+def test_prefix_expansion_scores_below_exact_match(index):
+    assert keys(index.search("trade")) == ["trademark", "pitch-deck"]
+    assert index.search("trade")[0]["score"] < index.search("trademark")[0]["score"]
+    # Single characters only match whole terms
+    assert index.search("t") == []
+
+
+def test_sync_reindexes_only_changed_documents(index):
+    catalog = copy.deepcopy(CATALOG)
+    assert index.sync(catalog) == (0, 0)
+
+    catalog[1]["services"][0]["description"] = "One person company with a nominee"
+    catalog[0]["services"].pop()
+    assert index.sync(catalog) == (1, 1)
+    assert len(index) == 4
+    assert index.search("directors") == []
+    assert keys(index.search("nominee")) == ["pvt-ltd"]
+    assert "pitch-deck" not in keys(index.search("investor trademark"))
+
+
+def test_sync_picks_up_display_only_changes(index):
+    catalog = copy.deepcopy(CATALOG)
+    catalog[0]["services"][0]["icon"] = "shield"
+    assert index.sync(catalog) == (0, 0)
+    assert index.search("trademark")[0]["icon"] == "shield"
+
+
+def test_empty_index():
+    assert CatalogSearchIndex().search("anything") == []
@@ -0,0 +1,104 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+
+import compression
+from compression import CompressedBodyCache, CompressionMiddleware
+
+BODY = json.dumps([{"id": n, "name": f"Service {n}"} for n in range(200)]).encode()
+
+
+def json_app(body=BODY, headers=(), chunks=None):
+    """ASGI app sending `body` (or the `chunks` as a streamed body) with the given extra headers"""
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json")] + list(headers)})
+        if chunks is None:
+            await send({"type": "http.response.body", "body": body})
+            return
+        for n, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": n < len(chunks) - 1})
+    return app
+
+
+def request(app, accept_encoding="gzip"):
+    """Run one GET through `app`; returns (status, headers as a dict, body)"""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", accept_encoding.encode())]}
+    asyncio.run(app(scope, receive, send))
+    start = messages[0]
+    headers = {key.decode(): value.decode() for key, value in start["headers"]}
+    return start["status"], headers, b"".join(message.get("body", b"") for message in messages[1:])
+
+
+@pytest.fixture(autouse=True)
+def no_brotli(monkeypatch):
+    # Negotiate gzip so the tests do not depend on the optional brotli package
+    monkeypatch.setattr(compression, "brotli", None)
+
+
+def test_compresses_json_and_suffixes_etag():
+    app = CompressionMiddleware(json_app(headers=[(b"etag", b'"abc"'), (b"content-length", str(len(BODY)).encode())]))
+    status, headers, body = request(app)
+    assert status == 200
+    assert headers["content-encoding"] == "gzip"
+    assert headers["etag"] == '"abc-gzip"'
+    assert headers["vary"] == "Accept-Encoding"
+    assert headers["content-length"] == str(len(body))
+    assert gzip.decompress(body) == BODY
+
+
+def test_weak_etag_is_not_cached():
+    cache = CompressedBodyCache(1 << 20)
+    app = CompressionMiddleware(json_app(headers=[(b"etag", b'W/"abc"')]), cache=cache)
+    _, headers, _ = request(app)
+    assert headers["etag"] == 'W/"abc-gzip"'
+    assert cache.size == 0
+
+
+def test_strong_etag_body_is_cached():
+    cache = CompressedBodyCache(1 << 20)
+    app = CompressionMiddleware(json_app(headers=[(b"etag", b'"abc"')]), cache=cache)
+    _, _, first = request(app)
+    assert cache.get(('"abc"', "gzip")) == first
+    # Same ETag means same bytes, so the cached body is served
+    _, _, second = request(CompressionMiddleware(json_app(body=b"x" * 2048, headers=[(b"etag", b'"abc"')]), cache=cache))
+    assert second == first
+
+
+def test_already_encoded_response_passes_through():
+    precompressed = gzip.compress(BODY)
+    app = CompressionMiddleware(json_app(
+        body=precompressed,
+        headers=[(b"content-encoding", b"gzip"), (b"etag", b'"abc-gzip"'), (b"vary", b"Accept-Encoding")],
+    ))
+    _, headers, body = request(app)
+    assert body == precompressed
+    assert (headers["content-encoding"], headers["etag"]) == ("gzip", '"abc-gzip"')
+
+
+def test_small_body_and_identity_clients_get_vary():
+    _, headers, body = request(CompressionMiddleware(json_app(body=b"[]")))
+    assert "content-encoding" not in headers and body == b"[]"
+    assert headers["vary"] == "Accept-Encoding"
+
+    _, headers, body = request(CompressionMiddleware(json_app(headers=[(b"etag", b'"abc"')])), accept_encoding="")
+    assert "content-encoding" not in headers and body == BODY
+    assert (headers["etag"], headers["vary"]) == ('"abc"', "Accept-Encoding")
+
+
+def test_streamed_body_is_compressed_incrementally():
+    chunks = [BODY[:2000], BODY[2000:4000], BODY[4000:]]
+    _, headers, body = request(CompressionMiddleware(json_app(chunks=chunks)))
+    assert headers["content-encoding"] == "gzip"
+    assert "content-length" not in headers
+    assert gzip.decompress(body) == BODY
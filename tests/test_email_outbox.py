@@ -0,0 +1,119 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+import email_outbox
+from database import database
+from email_outbox import EmailOutbox, backoff_seconds
+from email_service import email_service
+
+MESSAGE = {"to_email": "client@example.com", "subject": "Hello", "body": "Hi"}
+
+
+@pytest.fixture
+def outbox(monkeypatch):
+    monkeypatch.setattr(database, "db", AsyncMongoMockClient()["outbox_test"])
+    monkeypatch.setattr(email_outbox, "EMAIL_OUTBOX_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(email_service, "is_configured", True)
+
+    async def refresh_settings(force=False):
+        pass
+
+    monkeypatch.setattr(email_service, "refresh_settings", refresh_settings)
+    return EmailOutbox()
+
+
+def fail_delivery(monkeypatch, error="550 rejected"):
+    def deliver(*args, **kwargs):
+        raise RuntimeError(error)
+
+    monkeypatch.setattr(email_service, "deliver", deliver)
+
+
+async def stored(outbox, message_id):
+    return await outbox.collection.find_one({"id": message_id}, {"_id": 0})
+
+
+async def make_due(outbox, message_id):
+    await outbox.collection.update_one({"id": message_id}, {"$set": {"next_attempt_at": datetime.utcnow().isoformat()}})
+
+
+def test_backoff_doubles_and_is_capped(monkeypatch):
+    monkeypatch.setattr(email_outbox, "EMAIL_OUTBOX_BACKOFF_BASE", 30)
+    monkeypatch.setattr(email_outbox, "EMAIL_OUTBOX_BACKOFF_MAX", 100)
+    assert 24 <= backoff_seconds(1) <= 36
+    assert 48 <= backoff_seconds(2) <= 72
+    assert 80 <= backoff_seconds(10) <= 120
+
+
+def test_failed_delivery_is_retried_later(outbox, monkeypatch):
+    fail_delivery(monkeypatch)
+
+    async def run():
+        [message_id] = await outbox.enqueue([MESSAGE], "test")
+        assert await outbox.process_due() == 1
+        # Backed off, so not due again straight away
+        assert await outbox.process_due() == 0
+        return await stored(outbox, message_id)
+
+    message = asyncio.run(run())
+    assert message["status"] == "pending"
+    assert message["attempts"] == 1
+    assert message["last_error"] == "550 rejected"
+    assert message["next_attempt_at"] > datetime.utcnow().isoformat()
+    assert "lease" not in message and "locked_until" not in message
+
+
+def test_dead_lettered_after_max_attempts(outbox, monkeypatch):
+    fail_delivery(monkeypatch)
+
+    async def run():
+        [message_id] = await outbox.enqueue([MESSAGE], "test")
+        statuses = []
+        for _ in range(email_outbox.EMAIL_OUTBOX_MAX_ATTEMPTS):
+            await make_due(outbox, message_id)
+            await outbox.process_due()
+            statuses.append((await stored(outbox, message_id))["status"])
+        await make_due(outbox, message_id)
+        assert await outbox.process_due() == 0
+        return statuses, await stored(outbox, message_id)
+
+    statuses, message = asyncio.run(run())
+    assert statuses == ["pending", "pending", "dead"]
+    assert message["attempts"] == 3
+
+
+def test_settings_failure_is_retried(outbox, monkeypatch):
+    async def refresh_settings(force=False):
+        raise RuntimeError("settings unavailable")
+
+    monkeypatch.setattr(email_service, "refresh_settings", refresh_settings)
+
+    async def run():
+        [message_id] = await outbox.enqueue([MESSAGE], "test")
+        await outbox.process_due()
+        return await stored(outbox, message_id)
+
+    message = asyncio.run(run())
+    assert (message["status"], message["last_error"]) == ("pending", "settings unavailable")
+
+
+def test_expired_lease_does_not_overwrite_new_owner(outbox, monkeypatch):
+    fail_delivery(monkeypatch)
+
+    async def run():
+        [message_id] = await outbox.enqueue([MESSAGE], "test")
+        stale = await outbox._claim()
+        # The lease lapsed and another worker claimed the message and sent it
+        await outbox.collection.update_one({"id": message_id}, {"$set": {"locked_until": "1970-01-01T00:00:00"}})
+        current = await outbox._claim()
+        assert current["lease"] != stale["lease"]
+        await outbox._finish(current, "sent")
+        await outbox._fail(stale, "timed out")
+        return await stored(outbox, message_id)
+
+    message = asyncio.run(run())
+    assert message["status"] == "sent"
+    assert message["last_error"] is None
@@ -0,0 +1,135 @@
+"""
+EmailService delivery against the in-process SMTP sink, plus the maildir
+and fault-injecting transports.
+"""
+import mailbox
+import smtplib
+import time
+
+import pytest
+
+from email_service import EmailService
+from mail_transports import FaultInjectingTransport, MaildirTransport
+from smtp_pool import SMTPConnectionPool
+from smtp_sink import SINK_DISCONNECT, SINK_OK, SINK_REJECT, SMTPSink
+
+INJECTION_VARIABLES = ("EMAIL_INJECT_LATENCY_MS", "EMAIL_INJECT_JITTER_MS", "EMAIL_INJECT_FAILURE_RATE")
+
+
+@pytest.fixture
+def sink():
+    with SMTPSink() as server:
+        yield server
+
+
+@pytest.fixture
+def service(sink, monkeypatch):
+    monkeypatch.setenv("SMTP_SERVER", "127.0.0.1")
+    monkeypatch.setenv("SMTP_PORT", str(sink.port))
+    monkeypatch.setenv("SMTP_USERNAME", "test")
+    monkeypatch.setenv("SMTP_PASSWORD", "test")
+    monkeypatch.setenv("SMTP_STARTTLS", "false")
+    monkeypatch.setenv("EMAIL_TRANSPORT", "smtp")
+    for name in INJECTION_VARIABLES:
+        monkeypatch.delenv(name, raising=False)
+    email_service = EmailService()
+    yield email_service
+    email_service.close()
+
+
+class RecordingTransport:
+    def __init__(self):
+        self.sent = []
+        self.closed = False
+
+    def send(self, message, from_addr=None, to_addrs=None):
+        self.sent.append(message)
+
+    def close(self):
+        self.closed = True
+
+
+def test_deliver_reuses_pooled_connection(service, sink):
+    for n in range(5):
+        service.deliver(f"user{n}@example.com", f"Subject {n}", "<p>Hello</p>", is_html=True)
+
+    assert sink.wait_for(5, timeout=5)
+    assert [message["To"] for _, message in sink.messages] == [f"user{n}@example.com" for n in range(5)]
+    assert [message["Subject"] for _, message in sink.messages] == [f"Subject {n}" for n in range(5)]
+    assert isinstance(service.transport, SMTPConnectionPool)
+    assert service.transport.connections_opened == 1
+    assert sink.connections == 1
+
+
+def test_rejected_message_raises_and_pool_recovers(service, sink):
+    sink.failure = SINK_REJECT
+    with pytest.raises(smtplib.SMTPResponseException) as excinfo:
+        service.deliver("user@example.com", "Rejected", "body")
+    assert excinfo.value.smtp_code == 451
+    assert service.send_email("user@example.com", "Rejected", "body") is False
+    assert sink.messages == []
+
+    sink.failure = SINK_OK
+    service.deliver("user@example.com", "Accepted", "body")
+    assert sink.wait_for(1, timeout=5)
+    assert sink.messages[0][1]["Subject"] == "Accepted"
+
+
+def test_disconnect_raises(service, sink):
+    sink.failure = SINK_DISCONNECT
+    with pytest.raises((smtplib.SMTPException, OSError)):
+        service.deliver("user@example.com", "Dropped", "body")
+    assert service.send_email("user@example.com", "Dropped", "body") is False
+    assert sink.messages == []
+
+
+def test_maildir_transport_writes_messages(tmp_path, monkeypatch):
+    maildir = tmp_path / "maildir"
+    maildir.mkdir()  # an existing, empty directory still gets tmp/new/cur
+    monkeypatch.setenv("EMAIL_TRANSPORT", "maildir")
+    monkeypatch.setenv("EMAIL_MAILDIR", str(maildir))
+    for name in INJECTION_VARIABLES:
+        monkeypatch.delenv(name, raising=False)
+    service = EmailService()
+
+    assert service.is_configured
+    assert isinstance(service.transport, MaildirTransport)
+    service.deliver("user@example.com", "Stored", "body")
+    service.deliver("other@example.com", "Stored too", "body")
+
+    messages = sorted(mailbox.Maildir(str(maildir), create=False), key=lambda message: message["To"])
+    assert [(message["To"], message["Subject"]) for message in messages] == [
+        ("other@example.com", "Stored too"), ("user@example.com", "Stored"),
+    ]
+
+
+def test_fault_injection_fails_without_sending():
+    inner = RecordingTransport()
+    transport = FaultInjectingTransport(inner, failure_rate=1.0)
+    with pytest.raises(smtplib.SMTPResponseException) as excinfo:
+        transport.send(object())
+    assert excinfo.value.smtp_code == 451
+    assert inner.sent == []
+
+    transport.close()
+    assert inner.closed
+
+
+def test_fault_injection_adds_latency():
+    inner = RecordingTransport()
+    transport = FaultInjectingTransport(inner, latency=0.05)
+    started = time.monotonic()
+    transport.send("message")
+    assert time.monotonic() - started >= 0.05
+    assert inner.sent == ["message"]
+
+
+def test_fault_injection_configured_from_environment(service, sink, monkeypatch):
+    monkeypatch.setenv("EMAIL_INJECT_FAILURE_RATE", "1")
+    failing = EmailService()
+    try:
+        assert isinstance(failing.transport, FaultInjectingTransport)
+        assert failing.send_email("user@example.com", "Injected", "body") is False
+    finally:
+        failing.close()
+    assert sink.connections == 0
@@ -0,0 +1,19 @@
+from email_service import EmailService
+from email_templates import DEFAULT_TEMPLATES, CompiledTemplate
+
+BOOKING = {
+    "id": "b1", "full_name": "Asha", "email": "asha@example.com", "phone": "9999999999",
+    "service_interest": "GST Registration", "date": "2026-10-16", "time": "15:00",
+}
+
+
+def test_default_reminder_names_the_date():
+    subject, body = DEFAULT_TEMPLATES['reminder'].render(EmailService.booking_context(BOOKING))
+    assert subject == "Reminder: Your consultation on 2026-10-16 at 15:00"
+    assert "tomorrow" not in body
+
+
+def test_reminder_templates_accept_every_booking_variable():
+    variables = sorted(EmailService.booking_context(BOOKING))
+    template = CompiledTemplate('reminder', "Hi {{ name }}", " ".join(f"{{{{ {v} }}}}" for v in variables), variables)
+    template.validate()
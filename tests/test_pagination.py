@@ -0,0 +1,44 @@
+import base64
+import json
+
+import pytest
+
+from pagination import after_cursor_query, decode_page_cursor, encode_page_cursor
+
+
+def token(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("created_at", ["2026-10-16T08:30:00.123456", None])
+def test_cursor_round_trip(created_at):
+    cursor = encode_page_cursor(created_at, "6f1c2b7e-booking")
+    assert "=" not in cursor
+    assert decode_page_cursor(cursor) == (created_at, "6f1c2b7e-booking")
+
+
+def test_after_cursor_query():
+    cursor = encode_page_cursor("2026-10-16T08:30:00", "b")
+    assert after_cursor_query(cursor) == {"$or": [
+        {"created_at": {"$lt": "2026-10-16T08:30:00"}},
+        {"created_at": "2026-10-16T08:30:00", "id": {"$lt": "b"}},
+    ]}
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "not base64!",
+    base64.urlsafe_b64encode(b"not json").decode(),
+    token({"created_at": "2026-10-16", "id": "a"}),
+    token(["2026-10-16"]),
+    token(["2026-10-16", "a", "b"]),
+    token(["2026-10-16", None]),
+    token(["2026-10-16", 5]),
+    token([{"$gt": ""}, "a"]),
+    token(["2026-10-16", {"$ne": None}]),
+])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_page_cursor(cursor)
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        after_cursor_query(cursor)